@@ -0,0 +1,572 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from InvertedIndex import InvertedIndex
+from Sketches import HyperLogLog, SpaceSaving
+
+# Stores the format the Creation Time of each record is counted under in the timeline, as it is stored in a CSV file.
+TIMELINE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Stores the period frequency of each size of time bucket records can be grouped into.
+TIME_BUCKETS = {"hour": "h", "day": "D", "week": "W", "month": "M"}
+
+"""
+This file contains the aggregation engine used to build the counts an AnalysedDataSet is made from.
+
+All of the counts are found in one pass over the columns of a data frame, with vectorised operations instead of counting
+a row at a time. Columns holding several values per record (Hashtags and Mentions) are split up and exploded once, and
+each count is found by factorising the values and counting the codes.
+
+Every count is a Dictionary matching each value to its count, in the order the values first occur in the data, as the
+original row-by-row counting gave. Counts found for consecutive parts of a data set (such as chunks of a file) can be
+merged in order to give the same counts as the whole data set.
+
+Counts over time are grouped into time buckets (hours, days, weeks or months) found from a TimeIndex of the records'
+Creation Times, with each bucket being a pandas Period so that the same month in different years is kept separate.
+
+Approximate counts can be found instead, which summarise each count with a sketch so that they can be stored and merged
+in a bounded amount of memory.
+"""
+
+
+"""
+This class stores the counts found from a data set, or from part of one.
+"""
+
+
+class Aggregates:
+
+    def __init__(self):
+        # Stores the number of records, retweets and replies
+        self.record_count = 0
+        self.retweet_count = 0
+        self.reply_count = 0
+
+        # Stores whether any records have no User or Source, as these are counted as a user or app of their own
+        self.missing_user = False
+        self.missing_app = False
+
+        # Stores the earliest and latest Creation Times, or None if no records have one
+        self.first_time = None
+        self.last_time = None
+
+        # Stores the Dictionaries of
+        # Hashtag, Occurrence Count pairs
+        self.hashtags = {}
+        # User, Tweet Count pairs
+        self.users = {}
+        # Username replied to, Reply Count pairs
+        self.replied_to = {}
+        # Username retweeted, Retweet Count pairs
+        self.retweeted = {}
+        # Time, Tweet Count pairs
+        self.timeline = {}
+        # Application, Tweet Count pairs
+        self.apps = {}
+        # User, Reply Count pairs, and Username replied to, Reply Count pairs, counted from replies only
+        self.replying_users = {}
+        self.replied_to_by_replies = {}
+        # Month (Period), Dictionary pairs of Hashtag, Occurrence Count pairs and of User, Interaction Count pairs in
+        # each month, in chronological order
+        self.hashtags_by_month = {}
+        self.users_by_month = {}
+
+        # Stores the Dictionaries of Reply Status ID pairs of
+        # the number of records replying to that status and the position of the first of them (None if there are none)
+        self.reply_statuses = {}
+        # a Dictionary of Hashtag, Occurrence Count pairs from the records replying to that status
+        self.hashtags_by_status = {}
+
+    # Adds the counts of the following part of the data set to these counts
+    def merge(self, other):
+        # The positions of the first replies in the other counts follow on from the records already counted
+        for status, (count, first_reply) in other.reply_statuses.items():
+            stored_count, stored_first_reply = self.reply_statuses.get(status, (0, None))
+            if stored_first_reply is None and first_reply is not None:
+                stored_first_reply = first_reply + self.record_count
+            self.reply_statuses[status] = (stored_count + count, stored_first_reply)
+
+        for status, counts in other.hashtags_by_status.items():
+            merge_counts(self.hashtags_by_status.setdefault(status, {}), counts)
+
+        self.record_count += other.record_count
+        self.retweet_count += other.retweet_count
+        self.reply_count += other.reply_count
+        self.missing_user = self.missing_user or other.missing_user
+        self.missing_app = self.missing_app or other.missing_app
+        first_times = [time for time in [self.first_time, other.first_time] if time is not None]
+        last_times = [time for time in [self.last_time, other.last_time] if time is not None]
+        self.first_time = min(first_times) if first_times else None
+        self.last_time = max(last_times) if last_times else None
+
+        for name in ["hashtags", "users", "replied_to", "retweeted", "timeline", "apps", "replying_users",
+                     "replied_to_by_replies"]:
+            merge_counts(getattr(self, name), getattr(other, name))
+
+        for name in ["hashtags_by_month", "users_by_month"]:
+            by_month = getattr(self, name)
+            for month, counts in getattr(other, name).items():
+                merge_counts(by_month.setdefault(month, {}), counts)
+
+            # Months first found in the other counts may be earlier than those already stored
+            setattr(self, name, dict(sorted(by_month.items())))
+
+        return self
+
+    # Returns the months records were created in, as Periods in chronological order
+    def months(self):
+        return list(self.users_by_month)
+
+    # Returns a Dictionary matching each Hashtag used in replies to their number of occurrences, as
+    # count_hashtags_replied_to, found from the replies counted for each status
+    def hashtags_replied_to(self):
+        statuses = sorted((first_reply, status) for status, (count, first_reply) in self.reply_statuses.items()
+                          if count > 0)
+
+        counted = {}
+        for first_reply, status in statuses:
+            count = self.reply_statuses[status][0]
+            for hashtag, hashtag_count in self.hashtags_by_status.get(status, {}).items():
+                counted[hashtag] = counted.get(hashtag, 0) + count * hashtag_count
+
+        return counted
+
+
+"""
+This class stores the approximate counts found from a data set, or from part of one, in an amount of memory that depends
+on the requested error rather than on the number of distinct hashtags, users and apps.
+
+The numbers of distinct users, apps and users replied to are estimated with HyperLogLog sketches, and the most frequent
+hashtags, users and apps (overall and in each month) with Space-Saving summaries. The number of records created in each
+hour is stored in place of the time of each record.
+"""
+
+
+class ApproximateAggregates:
+
+    # error is the relative standard error of the distinct counts, and the most each frequent value's count can be over
+    # its true count, as a fraction of the number of values counted
+    def __init__(self, error=0.01):
+        self.error = error
+        self.capacity = math.ceil(1 / error)
+
+        # Stores the number of records, retweets and replies, and the earliest and latest Creation Times, exactly
+        self.record_count = 0
+        self.retweet_count = 0
+        self.reply_count = 0
+        self.missing_user = False
+        self.missing_app = False
+        self.first_time = None
+        self.last_time = None
+
+        # Stores the sketches of the distinct Users, Sources (apps) and Usernames replied to
+        self.users = HyperLogLog(error)
+        self.apps = HyperLogLog(error)
+        self.replied_users = HyperLogLog(error)
+
+        # Stores the summaries of the most frequent Hashtags, Usernames replied to, users retweeted and apps
+        self.hashtags = SpaceSaving(self.capacity)
+        self.replied_to = SpaceSaving(self.capacity)
+        self.retweeted = SpaceSaving(self.capacity)
+        self.top_apps = SpaceSaving(self.capacity)
+
+        # Stores the Dictionaries of Hour (Period), Tweet Count pairs, and of Month (Period), summary pairs of the most
+        # frequent Hashtags and users interacted with in each month, in chronological order
+        self.hours = {}
+        self.hashtags_by_month = {}
+        self.users_by_month = {}
+
+    # Adds the counts of the following part of the data set to these counts
+    def merge(self, other):
+        self.record_count += other.record_count
+        self.retweet_count += other.retweet_count
+        self.reply_count += other.reply_count
+        self.missing_user = self.missing_user or other.missing_user
+        self.missing_app = self.missing_app or other.missing_app
+        first_times = [time for time in [self.first_time, other.first_time] if time is not None]
+        last_times = [time for time in [self.last_time, other.last_time] if time is not None]
+        self.first_time = min(first_times) if first_times else None
+        self.last_time = max(last_times) if last_times else None
+
+        for name in ["users", "apps", "replied_users", "hashtags", "replied_to", "retweeted", "top_apps"]:
+            getattr(self, name).merge(getattr(other, name))
+
+        self.hours = dict(sorted(merge_counts(self.hours, other.hours).items()))
+
+        for name in ["hashtags_by_month", "users_by_month"]:
+            by_month = getattr(self, name)
+            for month, summary in getattr(other, name).items():
+                by_month.setdefault(month, SpaceSaving(self.capacity)).merge(summary)
+
+            setattr(self, name, dict(sorted(by_month.items())))
+
+        return self
+
+    # Returns the months records were created in, as Periods in chronological order
+    def months(self):
+        return sorted(set(hour.asfreq("M") for hour in self.hours))
+
+
+# Finds the approximate counts of a data frame of refined records, with the same arguments as aggregate. Each count is
+# found exactly for the data frame first, and then summarised.
+def approximate_aggregate(df, hashtag_table, error=0.01, time_index=None, mention_table=None):
+    aggregates = ApproximateAggregates(error)
+    capacity = aggregates.capacity
+
+    aggregates.record_count = len(df)
+    aggregates.retweet_count = df['Is RT'].sum()
+    aggregates.reply_count = df['Is Reply'].sum()
+    aggregates.missing_user = bool(df['User'].isna().any())
+    aggregates.missing_app = bool(df['Source'].isna().any())
+    if df['Creation Time'].notna().any():
+        aggregates.first_time = df['Creation Time'].min()
+        aggregates.last_time = df['Creation Time'].max()
+
+    aggregates.users.update(df['User'])
+    aggregates.apps.update(df['Source'])
+    aggregates.replied_users.update(df['Reply Username'])
+
+    aggregates.hashtags = SpaceSaving(capacity, count_values(hashtag_table['Hashtag']))
+    aggregates.replied_to = SpaceSaving(capacity, count_values(df['Reply Username']))
+    aggregates.retweeted = SpaceSaving(capacity, count_values(df['RT To']))
+    aggregates.top_apps = SpaceSaving(capacity, count_values(df['Source']))
+
+    if time_index is None:
+        time_index = TimeIndex(df['Creation Time'])
+
+    aggregates.hours = time_index.count_records("hour")
+
+    user_rows, users = interacted_users(df, mention_table)
+    hashtags_by_month = time_index.count_by_bucket(hashtag_table['Hashtag'], hashtag_table['Row'], "month")
+    users_by_month = time_index.count_by_bucket(users, user_rows, "month")
+    aggregates.hashtags_by_month = {month: SpaceSaving(capacity, counts) for month, counts in hashtags_by_month.items()}
+    aggregates.users_by_month = {month: SpaceSaving(capacity, counts) for month, counts in users_by_month.items()}
+
+    return aggregates
+
+
+# Finds the counts of a data frame of refined records. hashtag_table is the table of Row, Hashtag pairs of the records
+# (with Row being each record's position in the data frame and the hashtags in lowercase). The TimeIndex of the records'
+# Creation Times can be passed in if it has already been built, and the table of Row, Mention pairs of the records if it
+# was found from a mention entity table.
+def aggregate(df, hashtag_table, time_index=None, mention_table=None):
+    aggregates = Aggregates()
+
+    aggregates.record_count = len(df)
+    aggregates.retweet_count = df['Is RT'].sum()
+    aggregates.reply_count = df['Is Reply'].sum()
+    aggregates.missing_user = bool(df['User'].isna().any())
+    aggregates.missing_app = bool(df['Source'].isna().any())
+    if df['Creation Time'].notna().any():
+        aggregates.first_time = df['Creation Time'].min()
+        aggregates.last_time = df['Creation Time'].max()
+
+    aggregates.hashtags = count_values(hashtag_table['Hashtag'])
+    aggregates.users = count_values(df['User'])
+    aggregates.replied_to = count_values(df['Reply Username'])
+    aggregates.retweeted = count_values(df['RT To'])
+    aggregates.apps = count_values(df['Source'])
+    aggregates.timeline = count_times(df['Creation Time'])
+
+    replies = df['Is Reply'].to_numpy(dtype=bool)
+    aggregates.replying_users = count_values(df['User'][replies])
+    aggregates.replied_to_by_replies = count_values(df['Reply Username'][replies])
+
+    if time_index is None:
+        time_index = TimeIndex(df['Creation Time'])
+
+    user_rows, users = interacted_users(df, mention_table)
+    aggregates.hashtags_by_month = time_index.count_by_bucket(hashtag_table['Hashtag'], hashtag_table['Row'], "month")
+    aggregates.users_by_month = time_index.count_by_bucket(users, user_rows, "month")
+
+    aggregates.reply_statuses, aggregates.hashtags_by_status = tally_replies(ReplyIndex(df['Reply Status ID']), replies,
+                                                                             hashtag_table)
+
+    return aggregates
+
+
+"""
+This class is an index of the time bucket each record was created in, for each size of bucket in TIME_BUCKETS.
+
+The Creation Times are parsed once when the data is loaded, and the buckets of each size are only found the first time
+they are used.
+"""
+
+
+class TimeIndex:
+
+    # Builds the index from a column of Creation Times (as datetimes)
+    def __init__(self, creation_times):
+        self.times = pd.DatetimeIndex(creation_times)
+
+        # Stores the code of each record's bucket and the buckets in chronological order, for each size used so far
+        self.buckets = {}
+        # Stores the inverted index from each bucket to the positions of its records, for each size used so far
+        self.indexes = {}
+
+    # Returns the code of the bucket of the given size each record was created in (-1 if it has no Creation Time) and
+    # the buckets, as Periods in chronological order
+    def bucket_codes(self, size):
+        if size not in self.buckets:
+            self.buckets[size] = pd.factorize(self.times.to_period(TIME_BUCKETS[size]), sort=True)
+
+        return self.buckets[size]
+
+    # Returns a Dictionary matching each bucket of the given size to the number of records created in it
+    def count_records(self, size):
+        codes, buckets = self.bucket_codes(size)
+
+        return dict(zip(buckets, np.bincount(codes[codes >= 0], minlength=len(buckets)).tolist()))
+
+    # Returns the sorted positions of the records created in a bucket of the given size
+    def rows(self, bucket, size):
+        if size not in self.indexes:
+            codes, buckets = self.bucket_codes(size)
+            self.indexes[size] = InvertedIndex(pd.Categorical.from_codes(codes, buckets), np.arange(len(codes)))
+
+        return self.indexes[size].rows(pd.Period(bucket, TIME_BUCKETS[size]))
+
+    # Counts values belonging to records (such as the hashtags used in them) in each bucket of the given size. rows is
+    # the position of the record each value belongs to. Returns a Dictionary matching every bucket records were created
+    # in to a Dictionary of the values in that bucket and their counts, in the order the values first occur in it.
+    def count_by_bucket(self, values, rows, size):
+        codes, buckets = self.bucket_codes(size)
+        value_buckets = codes[np.asarray(rows, dtype=np.int64)]
+        values = np.asarray(values, dtype=object)[value_buckets >= 0]
+        value_buckets = value_buckets[value_buckets >= 0]
+
+        # Grouping the values by bucket, keeping them in order within each, so that the pairs of bucket and value are
+        # factorised in the order the values first occur in each bucket
+        order = np.argsort(value_buckets, kind="stable")
+        value_codes, uniques = pd.factorize(values[order])
+        counted_values = value_codes >= 0
+        pair_codes, pairs = pd.factorize(value_buckets[order][counted_values] * len(uniques)
+                                         + value_codes[counted_values])
+        counts = np.bincount(pair_codes, minlength=len(pairs))
+
+        buckets, uniques = list(buckets), list(uniques)
+        counted = {bucket: {} for bucket in buckets}
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            counted[buckets[pair // len(uniques)]][uniques[pair % len(uniques)]] = count
+
+        return counted
+
+
+"""
+This class is a hash index from each Reply Status ID to the positions of the records replying to that status.
+
+The IDs are factorised once, so each record's status is stored as a code, and the positions of the records with each
+code are stored together (sorted by code) so the records replying to a status can be found without scanning the data.
+"""
+
+
+class ReplyIndex:
+
+    # Builds the index from a column of Reply Status IDs. Records without a Reply Status ID aren't indexed.
+    def __init__(self, reply_status_ids):
+        codes, status_ids = pd.factorize(reply_status_ids)
+
+        # Stores the code of each record's Reply Status ID (-1 if it has none), and the IDs in the order they first
+        # occur
+        self.codes = codes
+        self.status_ids = pd.Index(status_ids)
+
+        # Stores the positions of the records grouped by code, and where each code's group starts and ends
+        indexed = np.flatnonzero(codes >= 0)
+        self.positions = indexed[np.argsort(codes[indexed], kind="stable")]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[indexed], minlength=len(status_ids)))])
+
+    # Returns the positions of the records replying to a status, in order
+    def rows(self, status_id):
+        try:
+            code = self.status_ids.get_loc(status_id)
+        except KeyError:
+            return np.empty(0, dtype=np.int64)
+
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    # Returns the number of records replying to each status, in the order of status_ids
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def __contains__(self, status_id):
+        return status_id in self.status_ids
+
+    def __len__(self):
+        return len(self.status_ids)
+
+
+# Counts the hashtags of the replies to each status, once for every reply to that status that is marked as a reply, so
+# each hashtag is counted as many times as the status it replies to has been replied to. Returns a Dictionary matching
+# each hashtag to its count, in the order they would be counted going through the replies in order.
+def count_hashtags_replied_to(reply_index, is_reply, hashtag_table):
+    codes = reply_index.codes
+    is_reply = np.asarray(is_reply, dtype=bool)
+    replied = is_reply & (codes >= 0)
+
+    # Finding how many replies each status has, and the position of its first reply, which its hashtags are counted at
+    reply_counts = np.bincount(codes[replied], minlength=len(reply_index))
+    first_replies = np.full(len(reply_index), len(codes), dtype=np.int64)
+    np.minimum.at(first_replies, codes[replied], np.flatnonzero(replied))
+
+    # Each hashtag is weighted by the number of replies to its record's status, or 0 if its record doesn't reply to one
+    hashtag_codes = codes[hashtag_table['Row'].to_numpy()]
+    weights = np.zeros(len(hashtag_codes), dtype=np.int64)
+    weights[hashtag_codes >= 0] = reply_counts[hashtag_codes[hashtag_codes >= 0]]
+    counted = weights > 0
+
+    # Ordering the hashtags by the first reply to their status, keeping them in order within each status
+    order = np.argsort(first_replies[hashtag_codes[counted]], kind="stable")
+    hashtags = hashtag_table['Hashtag'].to_numpy(dtype=object)[counted][order]
+
+    hashtag_codes, uniques = pd.factorize(hashtags)
+    counts = np.bincount(hashtag_codes, weights=weights[counted][order], minlength=len(uniques))
+
+    return dict(zip(uniques, counts.astype(np.int64).tolist()))
+
+
+# Tallies the replies to each status and the hashtags of the records replying to it, which can be merged across parts of
+# a data set and used to count the hashtags replied to once every part has been tallied. Returns a Dictionary matching
+# each Reply Status ID to its number of replies and the position of the first (None if none are marked as replies),
+# and a Dictionary matching each Reply Status ID to the counts of the hashtags of the records replying to it.
+def tally_replies(reply_index, is_reply, hashtag_table):
+    codes = reply_index.codes
+    is_reply = np.asarray(is_reply, dtype=bool)
+    replied = is_reply & (codes >= 0)
+
+    reply_counts = np.bincount(codes[replied], minlength=len(reply_index))
+    first_replies = np.full(len(reply_index), len(codes), dtype=np.int64)
+    np.minimum.at(first_replies, codes[replied], np.flatnonzero(replied))
+
+    reply_statuses = {status: (count, first_reply if count > 0 else None) for status, count, first_reply
+                      in zip(reply_index.status_ids, reply_counts.tolist(), first_replies.tolist())}
+
+    hashtag_codes = codes[hashtag_table['Row'].to_numpy(dtype=np.int64)]
+    has_status = hashtag_codes >= 0
+    status_ids = reply_index.status_ids.tolist()
+    hashtags_by_status = {}
+    for code, hashtag in zip(hashtag_codes[has_status].tolist(),
+                             hashtag_table['Hashtag'].to_numpy(dtype=object)[has_status].tolist()):
+        counts = hashtags_by_status.setdefault(status_ids[code], {})
+        counts[hashtag] = counts.get(hashtag, 0) + 1
+
+    return reply_statuses, hashtags_by_status
+
+
+# Finds the users each record interacted with, in the order they are counted: the user retweeted, then each user
+# mentioned, then the user replied to. Returns the position of each interaction's record and the user interacted with.
+# mention_table is the table of Row, Mention pairs of the records, which is split from the Mentions column if not given.
+def interacted_users(df, mention_table=None):
+    retweeted = df['RT To'].to_numpy(dtype=object)
+    replied_to = df['Reply Username'].to_numpy(dtype=object)
+    retweet_rows = np.flatnonzero(df['RT To'].notna().to_numpy())
+    reply_rows = np.flatnonzero(df['Reply Username'].notna().to_numpy())
+
+    if mention_table is None:
+        mention_table = split_mentions(df['Mentions'])
+    mention_rows = mention_table['Row'].to_numpy(dtype=np.int64)
+    mention_users = mention_table['Mention'].to_numpy(dtype=object)
+    mention_positions = mention_table.groupby('Row', sort=False).cumcount().to_numpy()
+
+    rows = np.concatenate([retweet_rows, mention_rows, reply_rows])
+    parts = np.concatenate([np.zeros(len(retweet_rows), dtype=np.int64), np.ones(len(mention_rows), dtype=np.int64),
+                            np.full(len(reply_rows), 2, dtype=np.int64)])
+    positions = np.concatenate([np.zeros(len(retweet_rows), dtype=np.int64), mention_positions,
+                                np.zeros(len(reply_rows), dtype=np.int64)])
+    users = np.concatenate([retweeted[retweet_rows], mention_users, replied_to[reply_rows]])
+
+    order = np.lexsort((positions, parts, rows))
+
+    return rows[order], pd.Series(users[order], dtype=object)
+
+
+# Creates a table matching each hashtag in a column of ; separated Hashtags (converted to lowercase to prevent counting
+# differently capitalised versions separately) to the position of the record it was used in, in the order they appear.
+def split_hashtags(hashtags):
+    # Validating against each value's datatype to avoid NaN values
+    hashtags = pd.Series(hashtags.to_numpy(dtype=object))
+    hashtags = hashtags[hashtags.map(type) == str].str.split(";").explode()
+
+    return pd.DataFrame({'Row': hashtags.index.to_numpy(dtype=np.int64), 'Hashtag': hashtags.str.lower().to_numpy()})
+
+
+# Creates a table as split_hashtags from a hashtag entity table, where the Row of each hashtag is the position of its
+# record in the refined file. index is the index of the data frame of records, which is the records' rows in the file.
+# Hashtags of records that aren't in the data frame are left out.
+def index_entity_hashtags(hashtags, index):
+    rows = index.get_indexer(hashtags['Row'])
+
+    return pd.DataFrame({'Row': rows[rows >= 0], 'Hashtag': hashtags['Hashtag'][rows >= 0].str.lower().to_numpy()})
+
+
+# Creates a table matching each user mentioned in a column of ; separated Mentions (with any : characters and
+# surrounding whitespace removed) to the position of the record mentioning them, in the order they appear.
+def split_mentions(mentions):
+    mentions = pd.Series(mentions.to_numpy(dtype=object))
+    mentions = mentions[mentions.notna()].str.split(";").explode()
+
+    return pd.DataFrame({'Row': mentions.index.to_numpy(dtype=np.int64),
+                         'Mention': mentions.str.replace(':', '', regex=False).str.strip().to_numpy(dtype=object)})
+
+
+# Creates a table as split_mentions from a mention entity table, as index_entity_hashtags does for hashtags
+def index_entity_mentions(mentions, index):
+    rows = index.get_indexer(mentions['Row'])
+
+    return pd.DataFrame({'Row': rows[rows >= 0], 'Mention': mentions['Screen Name'][rows >= 0].to_numpy(dtype=object)})
+
+
+# Counts the occurrences of each value, returning a Dictionary matching each value to its count in the order the values
+# first occur. Missing values aren't counted.
+def count_values(values):
+    codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    return dict(zip(uniques, counts.tolist()))
+
+
+# Counts the occurrences of each Creation Time, as count_values, with each time formatted as it is in a CSV file.
+# The times are counted before they are formatted so that each distinct time is only formatted once.
+def count_times(times):
+    codes, uniques = pd.factorize(times)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    return dict(zip(pd.DatetimeIndex(uniques).strftime(TIMELINE_FORMAT), counts.tolist()))
+
+
+# Joins Dictionaries of values with the same kind of keys (such as the counts of each user) in linear time, by looking
+# up each key of the first Dictionary in a hash index of the keys of each of the others. Returns the keys of the first
+# Dictionary that are in all of them, in order, and an array of the values of each Dictionary for those keys.
+def join_keyed(first, *others):
+    keys = pd.Index(list(first), dtype=object)
+    joined = np.ones(len(keys), dtype=bool)
+
+    positions = []
+    for other in others:
+        positions.append(pd.Index(list(other), dtype=object).get_indexer(keys))
+        joined &= positions[-1] >= 0
+
+    values = [np.fromiter(first.values(), dtype=np.float64, count=len(first))[joined]]
+    for other, position in zip(others, positions):
+        values.append(np.fromiter(other.values(), dtype=np.float64, count=len(other))[position[joined]])
+
+    return keys[joined], values
+
+
+# Divides the values of one Dictionary by the values of another with the same keys, returning a Dictionary matching each
+# key in both (with a non-zero denominator) to its ratio, in the order of the numerators.
+def keyed_ratio(numerators, denominators):
+    keys, (numerator_values, denominator_values) = join_keyed(numerators, denominators)
+    divisible = denominator_values != 0
+
+    return dict(zip(keys[divisible], (numerator_values[divisible] / denominator_values[divisible]).tolist()))
+
+
+# Adds the counts of one Dictionary to another, adding any values it doesn't have yet to the end in order
+def merge_counts(counts, other):
+    for value, count in other.items():
+        counts[value] = counts.get(value, 0) + count
+
+    return counts
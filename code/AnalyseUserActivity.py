@@ -1,24 +1,26 @@
-from datetime import datetime
+import os
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from Instrumentation import profiled
+from RefinedData import read_refined
+
 # Stores the default path for a CSV file
 DEFAULT_FILE_PATH = "../data/CometLanding_REFINED.csv"
 
 # Stores the filepath to the images directory
 IMAGE_DIRECTORY = "../images/"
 
-# Stores the DTypes that have to be assigned on loading the file to prevent loss of information in ID's
-SPECIFIED_DTYPE = {"ID": object, "Reply User ID": object, "User ID": object, "Reply Status ID": object}
-
 """
 This class is used to do the necessary calculations required to analyse the patterns in user activity.
 """
 class AnalyseUserActivity:
 
     # Gets the csv file and calls helper functions to prepare the dataset for the analysis
+    @profiled
     def __init__(self, file_path, name):
-        self.df = pd.read_csv(file_path, dtype=SPECIFIED_DTYPE)
+        # All columns are loaded as the user's records are saved to a new file. Parquet files only read the user's rows.
+        self.df = read_refined(file_path, filters=[("User", "==", name)])
         self.name = name
         self.file_path = file_path
 
@@ -41,23 +43,18 @@ class AnalyseUserActivity:
         self.output_data()
 
     # Writes the stored data frame to a CSV file with an updated name
+    @profiled
     def write_data_frame(self):
         # Names the file
-        new_file_path = self.file_path[:-4] + "_" + self.name + ".csv"
+        new_file_path = os.path.splitext(self.file_path)[0] + "_" + self.name + ".csv"
         # creates the file
         self.df.to_csv(new_file_path, index=True)
         print("Data saved to", new_file_path)
 
     # Sorts the rows so that they are chronologically ordered
+    @profiled
     def filter_out_data(self):
-        # Accesses each value in Creation Time and converts it to a datetime type so that it can be ordered
-        for num in range(len(self.df)):
-            # Accesses the Creation Time column
-            currentDate = self.df.loc[num].at['Creation Time']
-            if type(currentDate) == str:
-                # Converts it into datetime
-                convertedDate = datetime.strptime(currentDate, "%Y-%m-%d %H:%M:%S")
-                self.df.at[num, 'Creation Time'] = convertedDate
+        # Creation Time is already loaded as a datetime type, so it can be ordered without converting each value
 
         # Sets User as the index so that a row can be removed by using the value in User
         self.df.set_index('User', inplace=True)
@@ -68,6 +65,7 @@ class AnalyseUserActivity:
         self.df = self.df.sort_values(by='Creation Time', ascending=True)
 
     # Gets the number of replies as a list that is chronologically ordered to be used to plot the chart
+    @profiled
     def generate_reply_count_list(self):
         # list for storing the reply count overtime
         reply_count_list = []
@@ -84,6 +82,7 @@ class AnalyseUserActivity:
         return reply_count_list
 
     # Gets the number of retweets as a list that is chronologically ordered to be used to plot the chart
+    @profiled
     def generate_retweet_count_list(self):
         # list for storing the retweet count overtime
         retweet_count_list = []
@@ -100,6 +99,7 @@ class AnalyseUserActivity:
         return retweet_count_list
 
     # Gets the number of tweets as a list that is chronologically ordered to be used to plot the chart
+    @profiled
     def generate_tweet_count_list(self):
         # list for storing the tweet count overtime
         tweet_count_list = []
@@ -120,6 +120,7 @@ class AnalyseUserActivity:
         return tweet_count_list
 
     # Plots the chart
+    @profiled
     def activity_over_time(self):
         fig = plt.figure(figsize=(20, 8))
         ax = fig.add_axes([0, 0, 1, 1])
@@ -152,6 +153,7 @@ class AnalyseUserActivity:
         print("Number of Retweets:", self.retweet_count)
         print("Number of Replies:", self.reply_count)
 
+    @profiled
     def output_graph(self):
         # Gets the plotted chart
         activity_graph = self.activity_over_time()
@@ -1,17 +1,61 @@
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+from itertools import repeat
+
+import numpy as np
 import pandas as pd
-import calendar
-import math
+
+from AggregationEngine import TIME_BUCKETS, Aggregates, ApproximateAggregates, ReplyIndex, TimeIndex, aggregate, \
+    approximate_aggregate, count_hashtags_replied_to, count_times, count_values, index_entity_hashtags, \
+    index_entity_mentions, interacted_users, keyed_ratio, split_hashtags, split_mentions
+from CsvShards import count_rows, find_row_boundaries, open_byte_range
+from EntityTables import EntityTableReader, entity_table_paths, has_entity_tables, read_entity_tables
+from Instrumentation import profiled
+from InvertedIndex import InvertedIndex, intersect
+from RankedCounter import RankedCounter
+from RefinedData import CSV_DTYPES, apply_schema, count_columnar_records, file_format_of, read_columnar_chunks, \
+    read_refined, read_refined_chunks
+from StageCache import code_version
 
 # Stores the default path for a CSV file
 DEFAULT_FILE_PATH = "../data/CometLanding_REFINED.csv"
 
-# Stores the DTypes that have to be assigned on loading the file to prevent loss of information in ID's
-SPECIFIED_DTYPE = {"ID": object, "Reply User ID": object, "User ID": object, "Reply Status ID": object}
+# Stores the columns used in the analysis, so that only these are loaded from the file
+ANALYSED_COLUMNS = ["User", "Creation Time", "Reply Username", "Reply Status ID", "Source", "Is RT", "Is Reply",
+                    "Hashtags", "Mentions", "RT To"]
+
+# Stores the columns loaded only to identify and filter the records, which aren't read when a data set is streamed
+RECORD_COLUMNS = ["ID", "User Language"]
+
+# Stores the default number of records read at a time when a data set is streamed
+DEFAULT_CHUNK_SIZE = 100000
+
+# Stores the default error of the counts when a data set is analysed approximately
+DEFAULT_ERROR = 0.01
+
+# Stores the names of the results kept in the result cache, and of the settings needed to output them
+CACHED_RESULTS = ["hashtags_data", "user_inter_data", "user_rt_data", "hashtags_trend", "users_trend", "hashtag_repl",
+                  "user_ratio", "timeline_data", "app_data", "record_count", "retweet_count", "reply_count",
+                  "tweet_count", "user_count", "app_count", "u_reply_count", "tweet_avg", "tweet_app_avg",
+                  "retweet_avg", "reply_avg", "reply_per_avg", "error"]
+
+# Stores the modules the results are found with, so that cached results are found again when any of them change
+ANALYSIS_MODULES = ["AnalysedDataSet", "AggregationEngine", "Sketches", "RankedCounter", "InvertedIndex", "RefinedData",
+                    "EntityTables", "CsvShards"]
+
+# Stores the settings of a data set that don't change its results, so they aren't part of the key of cached results
+UNCACHED_SETTINGS = ["chunk_size", "workers"]
 
 """
-This class is used to encapsulate the process of reading in a post-refinement CSV data set and running analysis on it.
+This class is used to encapsulate the process of reading in a post-refinement data set and running analysis on it.
+The data set can be a CSV file or a columnar (Parquet or Feather) file.
+
+Relevant results are stored in the class for later use. Each result is only found the first time it is used, so only
+the analysis that is needed is run, and is then stored until invalidate is called.
 
-Relevant results are stored in the class for later use.
+The counts the results are made from are found with the vectorised methods of the aggregation engine.
 
 There are helper methods used to assist in analysis and getting useful output from the data.
 """
@@ -19,351 +63,403 @@ There are helper methods used to assist in analysis and getting useful output fr
 
 class AnalysedDataSet:
 
-    # Loads in the data and runs the required analysis on it, storing the results. A default data filepath is provided.
+    # Stores whether the results are approximate, in which case only those that can be found from sketches are output
+    approximate = False
+
+    # Loads in the data to be analysed, storing it. A default data filepath is provided.
+    @profiled
     def __init__(self, file_path=DEFAULT_FILE_PATH):
-        # Reading in the data file and assigning ID values to be Strings to prevent loss of data.
-        self.df = pd.read_csv(file_path, dtype=SPECIFIED_DTYPE)
-
-        # Stores the dictionary of Hashtags, Occurrence Count pairs from the data set
-        self.hashtags_data = self.analyse_hashtags()
-
-        # Stores the dictionaries of
-        # of User, Reply Count pairs from the data set
-        self.user_inter_data = self.analyse_user_inter()
-        # of Users, Retweet Count pairs from the data set
-        self.user_rt_data = self.analyse_user_rt()
-        # of Hashtags, Occurrence Count per month pairs from the data set
-        self.hashtags_trend = self.analyse_trending_hashtags_in_month()
-        # of Users, Interactions (Retweet/Reply) Count pairs per month from the data set
-        self.users_trend = self.analyse_trending_users_in_month()
-        # of Hashtags, No of replies pairs from the data set
-        self.hashtag_repl = self.analyse_top_n_hashtags_replied_to()
-        # of Users, Replied/Reply ratio pairs from the data set
-        self.user_ratio = self.analyse_top_n_replies_to_replies_ratio()
-
-        # Stores the dictionary of Time, Tweet Count pairs from the data set
-        self.timeline_data = self.tweets_per_day()
-
-        # Stores the dictionary of Application, Tweet Count pairs from the data set
-        self.app_data = self.tweets_per_app()
-
-        # Stores the number of records in the data set. 1 is subtracted as headers are counted.
-        self.record_count = len(self.df) - 1
-
-        # Stores the count for tweets, retweets and replies as calculated from the data.
-        self.retweet_count = self.df['Is RT'].sum()
-        self.reply_count = self.df['Is Reply'].sum()
-        self.tweet_count = self.record_count - self.retweet_count - self.reply_count
-
-        # Stores the count of users, found by counting the number of unique usernames.
-        self.user_count = len(self.df['User'].unique())
-        self.app_count = len(self.df['Source'].unique())
-        self.u_reply_count = len(self.user_inter_data)
-
-        # Stores the per user average for tweets, retweets and replies as calculated from the above data.
-        self.tweet_avg = self.tweet_count / self.user_count
-        self.tweet_app_avg = self.tweet_count / self.app_count
-        self.retweet_avg = self.retweet_count / self.user_count
-        self.reply_avg = self.reply_count / self.user_count
-        self.reply_per_avg = self.reply_count / self.u_reply_count
-
-    # Processes the String of Hashtags stored in each record in the data set to create a Dictionary matching
+        # Reading in the columns used from the data file, with ID values as Strings to prevent loss of data.
+        self.df = read_refined(file_path, columns=ANALYSED_COLUMNS + RECORD_COLUMNS)
+
+        # Stores the entity tables saved alongside the file during refinement, or None if there aren't any.
+        self.entity_tables = read_entity_tables(file_path)
+
+    # Clears every stored result and index, so that they are found again from the data frame when next used. This must
+    # be called after the data frame is filtered or changed. The data frame's index must be kept when filtering it, as
+    # the entity tables are matched to its records by their index.
+    def invalidate(self):
+        for cls in type(self).__mro__:
+            for name, value in vars(cls).items():
+                if isinstance(value, cached_property):
+                    self.__dict__.pop(name, None)
+
+    # Returns a Dictionary of every result in CACHED_RESULTS, finding any that haven't been found yet, so that they can
+    # be stored in the result cache. Results that can't be found for the data set are left out.
+    def results(self):
+        results = {}
+        for name in CACHED_RESULTS:
+            if hasattr(type(self), name) or name in vars(self):
+                try:
+                    results[name] = getattr(self, name)
+                except ValueError:
+                    pass
+
+        return results
+
+    # Returns a column of the data set
+    def column(self, name):
+        return self.df[name]
+
+    # Returns the number of records in the data set
+    def size(self):
+        return len(self.df)
+
+    # Returns a view of the records in the data set matching the given filters, whose results are found from only those
+    # records without copying the data frame. language and app can each be a value or a list of values, and a record
+    # matches if it was created at or after since and before until (Timestamps or Strings such as "2014-11-12"). Any of
+    # these that aren't given aren't checked. Each view is stored, so filtering by the same values again returns the
+    # same view with any results it has already found.
+    @profiled
+    def where(self, language=None, since=None, until=None, app=None):
+        query = (filter_values(language), filter_time(since), filter_time(until), filter_values(app))
+
+        if query not in self.views:
+            self.views[query] = self.view(self.filter_rows(*query))
+
+        return self.views[query]
+
+    # Returns the sorted positions of the records matching the filters of a query, as where
+    def filter_rows(self, languages, since, until, apps):
+        matched = np.ones(self.size(), dtype=bool)
+
+        if languages is not None:
+            matched &= self.column('User Language').isin(languages).to_numpy()
+        if apps is not None:
+            matched &= self.column('Source').isin(apps).to_numpy()
+        if since is not None:
+            matched &= self.time_index.times >= since
+        if until is not None:
+            matched &= self.time_index.times < until
+
+        return np.flatnonzero(matched)
+
+    # Returns a view of the records at the given sorted positions
+    def view(self, rows):
+        return DataSetView(self, rows)
+
+    # Stores the views of the data set found by where, against the filters used to find them
+    @cached_property
+    def views(self):
+        return {}
+
+    # Stores the table of Row, Hashtag pairs so the hashtags of each record only have to be found once.
+    @cached_property
+    @profiled
+    def hashtag_table(self):
+        return self.hashtag_rows()
+
+    # Stores the table of Row, Mention pairs so the users mentioned by each record only have to be found once.
+    @cached_property
+    @profiled
+    def mention_table(self):
+        return self.mention_rows()
+
+    # Stores the index from each Reply Status ID to the records replying to it, for use in reply-based analysis.
+    @cached_property
+    @profiled
+    def reply_index(self):
+        return ReplyIndex(self.column('Reply Status ID'))
+
+    # Stores the index of the hour, day, week and month each record was created in, for analysis over time.
+    @cached_property
+    @profiled
+    def time_index(self):
+        return TimeIndex(self.column('Creation Time'))
+
+    # Stores the position of the record and the user of each interaction (retweet, mention or reply) in the data set.
+    @cached_property
+    @profiled
+    def interactions(self):
+        return interacted_users(self.df, self.mention_table)
+
+    # Stores the inverted indexes from each Hashtag, user mentioned and user retweeted to the records they occur in, so
+    # the records matching a query can be found without splitting the Hashtags or Mentions of every record again.
+    @cached_property
+    @profiled
+    def hashtag_index(self):
+        return InvertedIndex(self.hashtag_table['Hashtag'], self.hashtag_table['Row'])
+
+    @cached_property
+    @profiled
+    def mention_index(self):
+        return InvertedIndex(self.mention_table['Mention'], self.mention_table['Row'])
+
+    @cached_property
+    @profiled
+    def retweet_index(self):
+        return InvertedIndex(self.column('RT To'), np.arange(self.size()))
+
+    # Each Dictionary of counts or ratios is stored as a RankedCounter, so its highest values can be found quickly.
+
+    # Stores the dictionary of Hashtags, Occurrence Count pairs from the data set
+    @cached_property
+    def hashtags_data(self):
+        return RankedCounter(self.analyse_hashtags())
+
+    # Stores the dictionaries of
+    # of User, Reply Count pairs from the data set
+    @cached_property
+    def user_inter_data(self):
+        return RankedCounter(self.analyse_user_inter())
+
+    # of Users, Retweet Count pairs from the data set
+    @cached_property
+    def user_rt_data(self):
+        return RankedCounter(self.analyse_user_rt())
+
+    # of Hashtags, Occurrence Count per month pairs from the data set, with months from different years kept apart
+    @cached_property
+    def hashtags_trend(self):
+        return {month: RankedCounter(counts) for month, counts in self.analyse_trending_hashtags_in_month().items()}
+
+    # of Users, Interactions (Retweet/Reply) Count pairs per month from the data set
+    @cached_property
+    def users_trend(self):
+        return {month: RankedCounter(counts) for month, counts in self.analyse_trending_users_in_month().items()}
+
+    # of Hashtags, No of replies pairs from the data set
+    @cached_property
+    def hashtag_repl(self):
+        return RankedCounter(self.analyse_top_n_hashtags_replied_to())
+
+    # of Users, Replied/Reply ratio pairs from the data set
+    @cached_property
+    def user_ratio(self):
+        return RankedCounter(self.analyse_top_n_replies_to_replies_ratio())
+
+    # Stores the dictionary of Time, Tweet Count pairs from the data set
+    @cached_property
+    def timeline_data(self):
+        return self.tweets_per_day()
+
+    # Stores the dictionary of Application, Tweet Count pairs from the data set
+    @cached_property
+    def app_data(self):
+        return RankedCounter(self.tweets_per_app())
+
+    # Stores the number of records in the data set. 1 is subtracted as headers are counted.
+    @cached_property
+    def record_count(self):
+        return self.size() - 1
+
+    # Stores the count for tweets, retweets and replies as calculated from the data.
+    @cached_property
+    def retweet_count(self):
+        return self.column('Is RT').sum()
+
+    @cached_property
+    def reply_count(self):
+        return self.column('Is Reply').sum()
+
+    @cached_property
+    def tweet_count(self):
+        return self.record_count - self.retweet_count - self.reply_count
+
+    # Stores the count of users, found by counting the number of unique usernames, and likewise for apps.
+    @cached_property
+    def user_count(self):
+        return len(self.column('User').unique())
+
+    @cached_property
+    def app_count(self):
+        return len(self.column('Source').unique())
+
+    @cached_property
+    def u_reply_count(self):
+        return len(self.user_inter_data)
+
+    # Stores the per user average for tweets, retweets and replies as calculated from the above data.
+    @cached_property
+    def tweet_avg(self):
+        return self.tweet_count / self.user_count
+
+    @cached_property
+    def tweet_app_avg(self):
+        return self.tweet_count / self.app_count
+
+    @cached_property
+    def retweet_avg(self):
+        return self.retweet_count / self.user_count
+
+    @cached_property
+    def reply_avg(self):
+        return self.reply_count / self.user_count
+
+    @cached_property
+    def reply_per_avg(self):
+        return self.reply_count / self.u_reply_count
+
+    # Creates a table matching each hashtag used (converted to lowercase to prevent counting differently capitalised
+    # versions separately) to the row of the record it was used in, in the order they appear in the data set.
+    # The hashtag entity table is used if one was saved during refinement, otherwise the String of Hashtags stored in
+    # each record is split into individual hashtags.
+    def hashtag_rows(self):
+        if self.entity_tables is not None:
+            return index_entity_hashtags(self.entity_tables['hashtags'], self.df.index)
+
+        return split_hashtags(self.column('Hashtags'))
+
+    # Creates a table matching each user mentioned to the row of the record mentioning them, in the order they appear in
+    # the data set, from the mention entity table if one was saved during refinement as hashtag_rows does.
+    def mention_rows(self):
+        if self.entity_tables is not None:
+            return index_entity_mentions(self.entity_tables['mentions'], self.df.index)
+
+        return split_mentions(self.column('Mentions'))
+
+    # Returns the sorted positions of the records matching a query. A record matches if it uses any of the given
+    # hashtags (without the #, in any case), mentions any of the given users and is a retweet of any of the given users,
+    # or if match_all is set, uses all of the hashtags and mentions all of the users. Any of these that aren't given
+    # aren't checked. If a bucket is given (a Period or a String such as "2014-11"), only records created in that bucket
+    # of the given size match.
+    @profiled
+    def find_rows(self, hashtags=None, mentions=None, retweets=None, bucket=None, size="month", match_all=False):
+        row_arrays = []
+
+        if hashtags is not None:
+            hashtags = [hashtag.lstrip("#").lower() for hashtag in hashtags]
+            row_arrays.append(self.hashtag_index.all_of(hashtags) if match_all else self.hashtag_index.any_of(hashtags))
+        if mentions is not None:
+            row_arrays.append(self.mention_index.all_of(mentions) if match_all else self.mention_index.any_of(mentions))
+        if retweets is not None:
+            row_arrays.append(self.retweet_index.any_of(retweets))
+        if bucket is not None:
+            row_arrays.append(self.time_index.rows(bucket, size))
+
+        if not row_arrays:
+            return np.arange(self.size())
+
+        return intersect(row_arrays)
+
+    # Returns the records matching a query, as find_rows
+    def find_tweets(self, *args, **kwargs):
+        return self.df.iloc[self.find_rows(*args, **kwargs)]
+
+    # Processes the table of Hashtags used in each record in the data set to create a Dictionary matching
     # each to their number of occurrences
+    @profiled
     def analyse_hashtags(self):
-        hashtag_data = {}
-
-        for row in self.df['Hashtags']:
-            # Validating against the value's datatype to avoid NaN values
-            if type(row) is str:
-                # Splitting the row into individual hashtags
-                for hashtag in row.split(";"):
-                    # Converting hashtags to lowercase to prevent counting differently capitalised versions separately
-                    hashtag = hashtag.lower()
-
-                    # If the hashtag is already stored, increment its count. Otherwise, add it to the dictionary.
-                    if hashtag in hashtag_data:
-                        hashtag_data[hashtag] += 1
-                    else:
-                        hashtag_data[hashtag] = 1
-
-        # Returning the finished dictionary
-        return hashtag_data
+        return count_values(self.hashtag_table['Hashtag'])
 
+    # Returns the months the records in the data set were created in, as Periods in chronological order
     def get_months(self):
-        months = pd.to_datetime(self.df['Creation Time'], dayfirst=True, errors='coerce').dt.month.unique().astype(int)
-        months = sorted([x for x in months if not math.isnan(x) and x >= 0])
-        return months
-
-    # Processes the String of Hashtags stored in each record in the data set to create a Dictionary matching
-    # each to their number of occurrences in each month
+        return list(self.time_index.count_records("month"))
+
+    # Returns the earliest and latest Creation Times of the records, or None for both if no records have one
+    def time_range(self):
+        times = self.column('Creation Time')
+        if times.notna().any():
+            return times.min(), times.max()
+
+        return None, None
+
+    # Returns a Dictionary matching each time bucket of the given size ("hour", "day", "week" or "month") to the number
+    # of records created in it, in chronological order
+    @profiled
+    def tweets_per_bucket(self, size):
+        return self.time_index.count_records(size)
+
+    # Creates a Dictionary matching each time bucket of the given size to a Dictionary matching each Hashtag used in
+    # that bucket to their number of occurrences
+    @profiled
+    def trending_hashtags(self, size):
+        return self.time_index.count_by_bucket(self.hashtag_table['Hashtag'], self.hashtag_table['Row'], size)
+
+    # Creates a Dictionary matching each time bucket of the given size to a Dictionary matching each user interacted
+    # with (retweeted, mentioned or replied to) in that bucket to their number of interactions
+    @profiled
+    def trending_users(self, size):
+        rows, users = self.interactions
+        return self.time_index.count_by_bucket(users, rows, size)
+
+    # Creates a Dictionary matching each month to a Dictionary matching each Hashtag used in that month to their number
+    # of occurrences
+    @profiled
     def analyse_trending_hashtags_in_month(self):
-        hashtag_data = {}
-
-        months = self.get_months()
-
-        self.df = self.df.reset_index()
-        for month in months:
-            month_data = {}
-            filtered = self.df[
-                pd.to_datetime(self.df['Creation Time'], dayfirst=True, errors='coerce').dt.month == month]
-            for row in filtered['Hashtags']:
-                # Validating against the value's datatype to avoid NaN values
-                if type(row) is str and row != "n/a":
-                    # Splitting the row into individual hashtags
-                    for hashtag in row.split(";"):
-                        # Converting hashtags to lowercase to prevent counting differently capitalised versions separately
-                        hashtag = hashtag.lower()
-
-                        # If the hashtag is already stored, increment its count. Otherwise, add it to the dictionary.
-                        if hashtag in month_data:
-                            month_data[hashtag] += 1
-                        else:
-                            month_data[hashtag] = 1
-            hashtag_data[month] = month_data
-        # Returning the finished dictionary
-
-        return hashtag_data
-
-    # Processes the user interactions stored in each record in the data set to create a Dictionary matching
-    # each to their number of occurrences in each month
+        return self.trending_hashtags("month")
+
+    # Creates a Dictionary matching each month to a Dictionary matching each user interacted with in that month to their
+    # number of interactions
+    @profiled
     def analyse_trending_users_in_month(self):
-        user_data = {}
-        months = self.get_months()
-
-        self.df = self.df.reset_index()
-        for month in months:
-            u_month_data = {}
-            filtered = self.df[(pd.to_datetime(self.df['Creation Time'], dayfirst=True, errors='coerce').dt.month == month)]
-            for index, row in filtered.iterrows():
-                if type(row['RT To']) is str and row['RT To'] != "n/a":
-                    if row['RT To'] in u_month_data:
-                        u_month_data[row['RT To']] += 1
-                    else:
-                        u_month_data[row['RT To']] = 1
-
-                if type(row['Mentions']) is str and row['Mentions'] != "n/a":
-                    for mention in row['Mentions'].split(";"):
-                        mention = mention.replace(':', '')
-                        mention = mention.strip()
-                        if mention in u_month_data:
-                            u_month_data[mention] += 1
-                        else:
-                            u_month_data[mention] = 1
-
-                if type(row['Reply Username']) is str and row['Reply Username'] != "n/a":
-                    if row['Reply Username'] in u_month_data:
-                        u_month_data[row['Reply Username']] += 1
-                    else:
-                        u_month_data[row['Reply Username']] = 1
-            user_data[month] = u_month_data
-        # Returning the finished dictionary
-
-        return user_data
-
-    # Processes the user replies stored in each record in the data set to create a Dictionary matching
-    # each to their number of occurrences
-    # Then calculating the ratio of the replied occurrences to reply
+        return self.trending_users("month")
+
+    # Counts the replies made by each user and the replies made to each user to create a Dictionary matching users to
+    # the ratio of the replied occurrences to reply, for each user who has both replied and been replied to
+    @profiled
     def analyse_top_n_replies_to_replies_ratio(self):
-        user_data_replied = {}
-        user_data_replied_to = {}
-
-        filtered = self.df[
-            (self.df['Is Reply'] == True)]
-        for row in filtered['User']:
-            if type(row) is str and row != "n/a":
-                if row in user_data_replied:
-                    user_data_replied[row] += 1
-                else:
-                    user_data_replied[row] = 1
-
-        for row in filtered['Reply Username']:
-            if type(row) is str and row != "n/a":
-                if row in user_data_replied_to:
-                    user_data_replied_to[row] += 1
-                else:
-                    user_data_replied_to[row] = 1
-
-        user_data = zipup(user_data_replied_to, user_data_replied)
-        # Returning the finished dictionary
-        return user_data
-
-    # Processes the hashtag interactions stored in each record in the data set to create a Dictionary matching
-    # each to their number of occurrences
+        replies = self.column('Is Reply').to_numpy(dtype=bool)
+
+        return keyed_ratio(count_values(self.column('Reply Username')[replies]),
+                           count_values(self.column('User')[replies]))
+
+    # Uses the index of replies to each status to create a Dictionary matching each Hashtag used in replies to their
+    # number of occurrences, counting the hashtags of every reply to a status once for each reply made to it
     # So what hashtags have been replied to the most
+    @profiled
     def analyse_top_n_hashtags_replied_to(self):
-        hashtag_data = {}
-
-        filtered = self.df[
-                (self.df['Is Reply'] == True)]
-        for row in filtered['Reply Status ID']:
-            filteredToSTID = self.df[
-                (self.df['Reply Status ID'] == row)]
-            for row in filteredToSTID['Hashtags']:
-                # Validating against the value's datatype to avoid NaN values
-                if type(row) is str and row != "n/a":
-                    # Splitting the row into individual hashtags
-                    for hashtag in row.split(";"):
-                        # Converting hashtags to lowercase to prevent counting differently capitalised versions separately
-                        hashtag = hashtag.lower()
-
-                        # If the hashtag is already stored, increment its count. Otherwise, add it to the dictionary.
-                        if hashtag in hashtag_data:
-                            hashtag_data[hashtag] += 1
-                        else:
-                            hashtag_data[hashtag] = 1
-        # Returning the finished dictionary
-        return hashtag_data
-
-    # Sorts the dictionary of Hashtag Data and returns the top n values as a list of tuples.
-    def top_n_hashtags(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.hashtags_data):
-            n = len(self.hashtags_data) - 1
+        return count_hashtags_replied_to(self.reply_index, self.column('Is Reply'), self.hashtag_table)
 
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.hashtags_data.items(), key=lambda item: item[1], reverse=True)[:n]
+    # Returns the top n Hashtags by their number of occurrences as a list of tuples.
+    def top_n_hashtags(self, n):
+        return self.hashtags_data.top(n)
 
-    # Sorts the dictionary of Hashtag reply Data and returns the top n values as a list of tuples.
+    # Returns the top n Hashtags by their number of replies as a list of tuples.
     def top_n_hashtags_replied_to(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.hashtag_repl):
-            n = len(self.hashtag_repl) - 1
-
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.hashtag_repl.items(), key=lambda item: item[1], reverse=True)[:n]
+        return self.hashtag_repl.top(n)
 
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.hashtag_rt.items(), key=lambda item: item[1], reverse=True)[:n]
-
-    # Sorts the dictionary of ratios and returns the top n values as a list of tuples.
+    # Returns the top n users by their Replied/Reply ratio as a list of tuples.
     def top_n_users_ratioed_to(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.user_ratio):
-            n = len(self.user_ratio) - 1
-
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.user_ratio.items(), key=lambda item: item[1], reverse=True)[:n]
+        return self.user_ratio.top(n)
 
-    # Sorts the dictionary of Hashtag Data and returns the top n values as a list of tuples.
+    # Outputs the top n Hashtags of each month by their number of occurrences.
     def print_trending_hashtags_in_month(self, n):
         for month in self.hashtags_trend:
-            print("\nTop ", n, " trending hashtags in ", calendar.month_abbr[month])
-
-            # If n is greater than the length of the list, its value is reduced to prevent overflows.
-            if n >= len(self.hashtags_trend[month]):
-                n = len(self.hashtags_trend[month]) - 1
+            print("\nTop ", n, " trending hashtags in ", month.strftime("%b %Y"))
 
-            # Sorts the dictionary values based upon their count values in descending order and returns the first n
-            # values.
-            pairs = sorted(self.hashtags_trend[month].items(), key=lambda item: item[1], reverse=True)[:n]
-            for pair in pairs:
+            for pair in self.hashtags_trend[month].top(n):
                 print("\t", pair[0], ":", pair[1])
 
-    # Sorts the dictionary of user interaction Data and returns the top n values as a list of tuples.
+    # Outputs the top n users of each month by their number of interactions.
     def print_trending_users_in_month(self, n):
         for month in self.users_trend:
-            print("\nTop ", n, " trending users in ", calendar.month_abbr[month])
+            print("\nTop ", n, " trending users in ", month.strftime("%b %Y"))
 
-            # If n is greater than the length of the list, its value is reduced to prevent overflows.
-            if n >= len(self.users_trend[month]):
-                n = len(self.users_trend[month]) - 1
-
-            # Sorts the dictionary values based upon their count values in descending order and returns the first n
-            # values.
-            pairs = sorted(self.users_trend[month].items(), key=lambda item: item[1], reverse=True)[:n]
-            for pair in pairs:
+            for pair in self.users_trend[month].top(n):
                 print("\t", pair[0], ":", pair[1])
 
-    # Sorts the dictionary of user interaction Data and returns the top n values as a list of tuples.
+    # Returns the top n users by their number of replies as a list of tuples.
     def top_n_user_interactions(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.user_inter_data):
-            n = len(self.user_inter_data) - 1
-
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.user_inter_data.items(), key=lambda item: item[1], reverse=True)[:n]
+        return self.user_inter_data.top(n)
 
-    # Sorts the dictionary of users retweeted Data and returns the top n values as a list of tuples.
+    # Returns the top n users by their number of retweets as a list of tuples.
     def top_n_user_rt(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.user_rt_data):
-            n = len(self.user_rt_data) - 1
-
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.user_rt_data.items(), key=lambda item: item[1], reverse=True)[:n]
+        return self.user_rt_data.top(n)
 
-    # Sorts the dictionary of applications used Data and returns the top n values as a list of tuples.
+    # Returns the top n applications by their number of tweets as a list of tuples.
     def top_n_apps(self, n):
-        # If n is greater than the length of the list, its value is reduced to prevent overflows.
-        if n >= len(self.app_data):
-            n = len(self.app_data) - 1
+        return self.app_data.top(n)
 
-        # Sorts the dictionary values based upon their count values in descending order and returns the first n values.
-        return sorted(self.app_data.items(), key=lambda item: item[1], reverse=True)[:n]
-
-    # Processes the datetime stored in each row to create a Dictionary matching datetimes to the amount of activity then
+    # Returns the Dictionary matching datetimes to the amount of activity then
+    @profiled
     def tweets_per_day(self):
-        date_data = {}
-
-        for date in self.df['Creation Time']:
-            # Validating against the value's datatype to avoid NaN values
-            if type(date) is str:
-                # If the datetime is already stored, increment its count. Otherwise, add it to the dictionary.
-                if date in date_data:
-                    date_data[date] += 1
-                else:
-                    date_data[date] = 1
-
-        # Returning the finished dictionary
-        return date_data
+        return count_times(self.column('Creation Time'))
 
-    # Processes the Sources stored in each row in the data set to create a Dictionary matching
-    # each to their number of occurrences
+    # Returns the Dictionary matching the Sources (apps) used in the data set to their number of occurrences
+    @profiled
     def tweets_per_app(self):
-        app_data = {}
-
-        for app in self.df['Source']:
-            if type(app) is str:
-
-                if app in app_data:
-                    app_data[app] += 1
-                else:
-                    app_data[app] = 1
+        return count_values(self.column('Source'))
 
-            # Returning the finished dictionary
-        return app_data
-
-    # Processes the Usernames replied to stored in each row in the data set to create a Dictionary matching
-    # each to their number of occurrences
+    # Returns the Dictionary matching the Usernames replied to in the data set to their number of occurrences
+    @profiled
     def analyse_user_inter(self):
-        user_inter_data = {}
-
-        for row in self.df['Reply Username']:
-            if type(row) is str and row != "n/a":
-                # If the username is already stored, increment its count. Otherwise, add it to the dictionary.
-                if row in user_inter_data:
-                    user_inter_data[row] += 1
-                else:
-                    user_inter_data[row] = 1
+        return count_values(self.column('Reply Username'))
 
-        # Returning the finished dictionary
-        return user_inter_data
-
-    # Processes the user retweeted to stored in each row in the data set to create a Dictionary matching
-    # each to their number of occurrences
+    # Returns the Dictionary matching the users retweeted in the data set to their number of occurrences
+    @profiled
     def analyse_user_rt(self):
-        user_rt_data = {}
-
-        for row in self.df['RT To']:
-            if type(row) is str:
-                # If the hashtag is already stored, increment its count. Otherwise, add it to the dictionary.
-                if row in user_rt_data and row != "n/a":
-                    user_rt_data[row] += 1
-                else:
-                    user_rt_data[row] = 1
-
-        # Returning the finished dictionary
-        return user_rt_data
+        return count_values(self.column('RT To'))
 
     # Outputs the results stored in the instance of the DataSet
     def output_results(self):
@@ -409,6 +505,10 @@ class AnalysedDataSet:
         # Finds the top 10 trending users in each month and outputs them alongside their counts
         self.print_trending_users_in_month(10)
 
+        # The hashtags replied to and the reply ratios need every reply to be counted exactly
+        if self.approximate:
+            return
+
         # Finds the top 10 Hashtags and outputs them alongside their counts
         print("\nTop 10 Hashtags replied to: ")
         for pair in self.top_n_hashtags_replied_to(10):
@@ -424,25 +524,540 @@ class AnalysedDataSet:
         for pair in self.top_n_users_ratioed_to(10):
             print("\t" + pair[0], ":", pair[1])
 
-# A function which traverses two dictionaries and divides the values of the matching keys
-# Returning a new dictionary with the keys and their resulting values
-def zipup(dict1, dict2):
-    # extracting keys and values
-    keys1 = list(dict1.keys())
-    keys2 = list(dict1.keys())
-    vals2 = list(dict2.values())
-    vals1 = list(dict1.values())
-
-    # assigning new values
-    res = dict()
-    for idx in range(len(keys1)):
-        if keys1[idx] in keys2:
-            for idy in range(len(keys2)):
-                try:
-                    if keys1[idx] == keys2[idy]:
-                        res[keys1[idx]] = vals2[idy]/vals1[idx]
-                except IndexError:
-                    # Error handling for case where the method attempts to access indexes beyond what is stored
-                    pass
 
-    return res
+"""
+This class is a view of some of the records of an AnalysedDataSet, as returned by its where method, and is analysed in
+the same way.
+
+The view stores only the positions of its records in the data set. Each column it uses is taken from the data set's
+data frame at those positions when first needed, and the hashtags, interactions and times of its records are selected
+from the data set's indexes rather than found again, so the data frame is never copied or read again. A data frame of
+just its records is only made if the records themselves are asked for.
+
+The view is of the data set as it was when the view was made, so where must be called again after the data set is
+invalidated.
+"""
+
+
+class DataSetView(AnalysedDataSet):
+
+    # Stores the data set the view is of and the sorted positions of its records in it. A view of a view is made a view
+    # of the original data set, so that columns are only ever taken from its data frame.
+    @profiled
+    def __init__(self, data_set, rows):
+        self.data_set = data_set
+        self.rows = rows
+        self.entity_tables = None
+
+        # Stores each column used so far, taken at the positions of the view's records
+        self.columns = {}
+
+    def column(self, name):
+        if name not in self.columns:
+            self.columns[name] = self.data_set.column(name).take(self.rows)
+
+        return self.columns[name]
+
+    def size(self):
+        return len(self.rows)
+
+    def view(self, rows):
+        return DataSetView(self.data_set, self.rows[rows])
+
+    # Stores the data frame of the view's records, which is only made when the records themselves are needed
+    @cached_property
+    def df(self):
+        return self.data_set.df.take(self.rows)
+
+    # Stores the position of each of the data set's records in the view, or -1 for those that aren't in it
+    @cached_property
+    def positions(self):
+        positions = np.full(self.data_set.size(), -1, dtype=np.int64)
+        positions[self.rows] = np.arange(len(self.rows))
+
+        return positions
+
+    # Returns whether each of the given positions of records in the data set is in the view, and the positions of those
+    # that are in the view's records
+    def select_rows(self, rows):
+        positions = self.positions[np.asarray(rows, dtype=np.int64)]
+        selected = positions >= 0
+
+        return selected, positions[selected]
+
+    # The indexes of the view are selected from those of the data set, keeping their order
+    @cached_property
+    @profiled
+    def hashtag_table(self):
+        table = self.data_set.hashtag_table
+        selected, rows = self.select_rows(table['Row'])
+
+        return pd.DataFrame({'Row': rows, 'Hashtag': table['Hashtag'].to_numpy(dtype=object)[selected]})
+
+    @cached_property
+    @profiled
+    def mention_table(self):
+        table = self.data_set.mention_table
+        selected, rows = self.select_rows(table['Row'])
+
+        return pd.DataFrame({'Row': rows, 'Mention': table['Mention'].to_numpy(dtype=object)[selected]})
+
+    @cached_property
+    @profiled
+    def time_index(self):
+        return TimeIndex(self.data_set.time_index.times[self.rows])
+
+    @cached_property
+    @profiled
+    def interactions(self):
+        rows, users = self.data_set.interactions
+        selected, rows = self.select_rows(rows)
+
+        return rows, pd.Series(users.to_numpy(dtype=object)[selected], dtype=object)
+
+
+"""
+This class is used to analyse a post-refinement data set that is too large to be held in memory.
+
+The file is read a chunk of records at a time and the counts of each chunk are merged in turn, so only one chunk and the
+merged counts are held in memory at once. The results are found from the merged counts, and are the same as those of an
+AnalysedDataSet of the whole file, so they can be used and output in the same way.
+
+As the records themselves aren't kept, they can't be queried, and the trends are only counted by month.
+"""
+
+
+class StreamedDataSet(AnalysedDataSet):
+
+    # Reads in the data chunk_size records at a time, storing the merged counts of every chunk. If a number of workers
+    # is given, the file is split into partitions which are read by that many worker processes in parallel.
+    @profiled
+    def __init__(self, file_path=DEFAULT_FILE_PATH, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+        self.df = None
+        self.entity_tables = None
+
+        if workers is None:
+            self.aggregates = aggregate_in_chunks(file_path, chunk_size)
+        else:
+            self.aggregates = aggregate_in_partitions(file_path, workers, chunk_size)
+
+    # Stores the counts of records, retweets, replies, users and apps from the merged counts, as AnalysedDataSet does.
+    # Records without a User or Source are counted as a user or app of their own.
+    @cached_property
+    def record_count(self):
+        return self.aggregates.record_count - 1
+
+    @cached_property
+    def retweet_count(self):
+        return self.aggregates.retweet_count
+
+    @cached_property
+    def reply_count(self):
+        return self.aggregates.reply_count
+
+    @cached_property
+    def user_count(self):
+        return len(self.aggregates.users) + self.aggregates.missing_user
+
+    @cached_property
+    def app_count(self):
+        return len(self.aggregates.apps) + self.aggregates.missing_app
+
+    @profiled
+    def analyse_hashtags(self):
+        return self.aggregates.hashtags
+
+    @profiled
+    def analyse_user_inter(self):
+        return self.aggregates.replied_to
+
+    @profiled
+    def analyse_user_rt(self):
+        return self.aggregates.retweeted
+
+    @profiled
+    def analyse_top_n_replies_to_replies_ratio(self):
+        return keyed_ratio(self.aggregates.replied_to_by_replies, self.aggregates.replying_users)
+
+    @profiled
+    def analyse_top_n_hashtags_replied_to(self):
+        return self.aggregates.hashtags_replied_to()
+
+    @profiled
+    def tweets_per_day(self):
+        return self.aggregates.timeline
+
+    @profiled
+    def tweets_per_app(self):
+        return self.aggregates.apps
+
+    def get_months(self):
+        return self.aggregates.months()
+
+    def time_range(self):
+        return self.aggregates.first_time, self.aggregates.last_time
+
+    # The number of records in each bucket is found from the number of records created at each time
+    @profiled
+    def tweets_per_bucket(self, size):
+        counts = pd.Series(list(self.timeline_data.values()), dtype=np.int64,
+                           index=pd.to_datetime(list(self.timeline_data)).to_period(TIME_BUCKETS[size]))
+
+        return counts.groupby(level=0, sort=True).sum().to_dict()
+
+    @profiled
+    def trending_hashtags(self, size):
+        if size != "month":
+            raise ValueError("Only monthly trends are counted when a data set is streamed")
+
+        return self.aggregates.hashtags_by_month
+
+    @profiled
+    def trending_users(self, size):
+        if size != "month":
+            raise ValueError("Only monthly trends are counted when a data set is streamed")
+
+        return self.aggregates.users_by_month
+
+    def find_rows(self, *args, **kwargs):
+        raise ValueError("Records can't be queried when a data set is streamed")
+
+    def where(self, *args, **kwargs):
+        raise ValueError("Records can't be filtered when a data set is streamed")
+
+
+"""
+This class is used to analyse a post-refinement data set approximately, in an amount of memory that depends on the
+requested error rather than on the number of distinct hashtags, users and apps in the data.
+
+The data set is streamed as it is by StreamedDataSet, with the counts of each chunk summarised by sketches. The numbers
+of users and apps are estimated with HyperLogLog sketches, and the top n rankings and monthly trends are found from
+Space-Saving summaries, so the counts given for them may be over their true counts by up to error times the number of
+values counted. The hashtags replied to, the reply ratios and the time of each record aren't found, as they can only be
+counted exactly.
+"""
+
+
+class ApproximateDataSet(StreamedDataSet):
+
+    approximate = True
+
+    # Reads in the data as StreamedDataSet does, storing the merged sketches of every chunk
+    @profiled
+    def __init__(self, file_path=DEFAULT_FILE_PATH, error=DEFAULT_ERROR, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+        self.df = None
+        self.entity_tables = None
+
+        if workers is None:
+            self.aggregates = aggregate_in_chunks(file_path, chunk_size, error)
+        else:
+            self.aggregates = aggregate_in_partitions(file_path, workers, chunk_size, error)
+        self.error = error
+
+    # Stores the estimated number of users, apps and users replied to. Records without a User or Source are counted as
+    # a user or app of their own.
+    @cached_property
+    def user_count(self):
+        return self.aggregates.users.count() + self.aggregates.missing_user
+
+    @cached_property
+    def app_count(self):
+        return self.aggregates.apps.count() + self.aggregates.missing_app
+
+    @cached_property
+    def u_reply_count(self):
+        return self.aggregates.replied_users.count()
+
+    @profiled
+    def analyse_hashtags(self):
+        return self.aggregates.hashtags.counts
+
+    @profiled
+    def analyse_user_inter(self):
+        return self.aggregates.replied_to.counts
+
+    @profiled
+    def analyse_user_rt(self):
+        return self.aggregates.retweeted.counts
+
+    @profiled
+    def tweets_per_app(self):
+        return self.aggregates.top_apps.counts
+
+    @profiled
+    def trending_hashtags(self, size):
+        if size != "month":
+            raise ValueError("Only monthly trends are counted when a data set is streamed")
+
+        return {month: summary.counts for month, summary in self.aggregates.hashtags_by_month.items()}
+
+    @profiled
+    def trending_users(self, size):
+        if size != "month":
+            raise ValueError("Only monthly trends are counted when a data set is streamed")
+
+        return {month: summary.counts for month, summary in self.aggregates.users_by_month.items()}
+
+    # The number of records in each bucket is found from the number of records created in each hour
+    @profiled
+    def tweets_per_bucket(self, size):
+        counts = pd.Series(list(self.aggregates.hours.values()), dtype=np.int64,
+                           index=pd.PeriodIndex(list(self.aggregates.hours), freq="h").asfreq(TIME_BUCKETS[size]))
+
+        return counts.groupby(level=0, sort=True).sum().to_dict()
+
+    @profiled
+    def tweets_per_day(self):
+        raise ValueError("The time of each record isn't stored when a data set is analysed approximately")
+
+    @profiled
+    def analyse_top_n_replies_to_replies_ratio(self):
+        raise ValueError("Reply ratios can't be found when a data set is analysed approximately")
+
+    @profiled
+    def analyse_top_n_hashtags_replied_to(self):
+        raise ValueError("Hashtags replied to can't be found when a data set is analysed approximately")
+
+    # Outputs the results as AnalysedDataSet does, noting that they are approximate
+    def output_results(self):
+        print("Approximate results, with an error of", self.error, "\n")
+        super().output_results()
+
+
+"""
+This class is used to analyse several refined files together, such as overlapping collections of the same tweets.
+
+The files are loaded concurrently, each as an AnalysedDataSet, which are kept so the results of each file can be used
+on their own. The combined results are of the union of the files' records, with records whose ID has already occurred
+(in an earlier file, or earlier in the same file) left out, and are the same as those of an AnalysedDataSet of the
+union.
+
+The duplicates are found by hashing only the IDs of the records, and the counts of each file's unique records are found
+from a view of them and merged in the order of the files, as StreamedDataSet merges the counts of each chunk, so the
+files' data frames are never concatenated. As the records are kept in their own files' data sets, they can be queried
+there, but not through the combined data set.
+"""
+
+
+class CombinedDataSet(StreamedDataSet):
+
+    # Loads and counts the files concurrently, using at most workers threads, storing the data set of each file and the
+    # merged counts of their unique records
+    @profiled
+    def __init__(self, file_paths, workers=None):
+        self.df = None
+        self.entity_tables = None
+        self.file_paths = list(file_paths)
+
+        with ThreadPoolExecutor(workers) as executor:
+            self.data_sets = list(executor.map(AnalysedDataSet, self.file_paths))
+
+            # Stores the view of the records of each file that aren't duplicates of those before them
+            self.unique_records = [data.view(rows) for data, rows in zip(self.data_sets, unique_rows(self.data_sets))]
+
+            self.aggregates = Aggregates()
+            for aggregates in executor.map(aggregate_view, [view for view in self.unique_records if view.size() > 0]):
+                self.aggregates.merge(aggregates)
+
+    # Stores the number of records left out of the combined results as duplicates
+    @cached_property
+    def duplicate_count(self):
+        return sum(data.size() for data in self.data_sets) - self.aggregates.record_count
+
+    # Outputs the results of each file, then the combined results
+    def output_results(self):
+        for file_path, data in zip(self.file_paths, self.data_sets):
+            print("Results for", file_path, "\n")
+            data.output_results()
+            print()
+
+        print("Combined results for", len(self.file_paths), "files, without", self.duplicate_count,
+              "duplicate records\n")
+        super().output_results()
+
+
+# Finds the records of each data set whose ID hasn't occurred before, going through the data sets in order. Returns the
+# sorted positions of each data set's unique records. Records without an ID are always kept, as they can't be matched.
+@profiled
+def unique_rows(data_sets):
+    ids = pd.concat([data.column('ID').astype(object) for data in data_sets], ignore_index=True)
+    unique = (~ids.duplicated() | ids.isna()).to_numpy()
+
+    offsets = np.cumsum([0] + [data.size() for data in data_sets])
+
+    return [np.flatnonzero(unique[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+# Finds the counts of the records of a view, using the indexes it has selected from its data set
+def aggregate_view(view):
+    return aggregate(view.df, view.hashtag_table, view.time_index, view.mention_table)
+
+
+# Analyses a refined file with the given class of data set and settings, loading the results from a ResultCache instead
+# if the file, its entity tables, the analysis code and the settings haven't changed since they were stored. Otherwise
+# the results are found and stored in the cache. A data set loaded from the cache doesn't read in the records, so only
+# its stored results (those output by output_results) can be used.
+def analyse_cached(file_path, cache, data_set_class=AnalysedDataSet, **settings):
+    file_paths = [file_path]
+    if has_entity_tables(file_path):
+        file_paths += list(entity_table_paths(file_path).values())
+
+    result_settings = {name: value for name, value in settings.items() if name not in UNCACHED_SETTINGS}
+    key = cache.key(file_paths, analysis_version(), data_set_class.__name__ + repr(sorted(result_settings.items())))
+
+    results = cache.load(key)
+    if results is None:
+        data = data_set_class(file_path, **settings)
+        cache.save(key, data.results())
+        return data
+
+    data = data_set_class.__new__(data_set_class)
+    data.df = None
+    data.entity_tables = None
+    vars(data).update(results)
+
+    return data
+
+
+# Returns the version of the code the results are found with
+def analysis_version():
+    return code_version([importlib.import_module(name) for name in ANALYSIS_MODULES])
+
+
+# Returns the values a filter of where matches in a fixed order, so the same values always find the same view, or None
+# if the filter isn't given
+def filter_values(values):
+    if values is None:
+        return None
+    if isinstance(values, str):
+        return (values,)
+
+    return tuple(sorted(set(values)))
+
+
+# Returns the time a filter of where compares to, or None if it isn't given
+def filter_time(time):
+    if time is None:
+        return None
+
+    return pd.Timestamp(time)
+
+
+# Finds the merged counts of a refined file, reading it chunk_size records at a time. The hashtag and mention entity
+# tables are read alongside the file if they were saved during refinement, as they are by AnalysedDataSet. If an error
+# is given, approximate counts with that error are found instead.
+@profiled
+def aggregate_in_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, error=None):
+    if not has_entity_tables(file_path):
+        return aggregate_frames(read_refined_chunks(file_path, chunk_size, ANALYSED_COLUMNS), split_entities, error)
+
+    with EntityTableReader(file_path, "hashtags", chunk_size) as hashtags, \
+            EntityTableReader(file_path, "mentions", chunk_size) as mentions:
+        return aggregate_frames(read_refined_chunks(file_path, chunk_size, ANALYSED_COLUMNS), lambda df: (
+            index_entity_hashtags(hashtags.read_until(df.index[-1] + 1), df.index),
+            index_entity_mentions(mentions.read_until(df.index[-1] + 1), df.index)), error)
+
+
+# Finds the merged counts of a refined file by splitting it into a partition of records for each worker process, which
+# finds the counts of its partition chunk_size records at a time. CSV files are split into byte ranges of whole rows and
+# columnar files into ranges of records. The counts of the partitions are merged in order, so they are the same as those
+# of the whole file. If an error is given, approximate counts with that error are found instead.
+@profiled
+def aggregate_in_partitions(file_path, workers=os.cpu_count(), chunk_size=DEFAULT_CHUNK_SIZE, error=None):
+    file_format = file_format_of(file_path)
+    entity_tables = has_entity_tables(file_path)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if file_format == "csv":
+            boundaries = find_row_boundaries(file_path, workers)
+
+            # The position of the first record of each partition is only needed to match the hashtag entity table to
+            # the records, so the rows are only counted if there is one
+            if entity_tables:
+                counts = pool.map(count_rows, repeat(file_path), boundaries[:-1], boundaries[1:])
+                first_rows = np.cumsum([0] + list(counts))
+            else:
+                first_rows = np.zeros(len(boundaries), dtype=np.int64)
+            partitions = [(start, end, int(first_row)) for start, end, first_row
+                          in zip(boundaries[:-1], boundaries[1:], first_rows)]
+        else:
+            records = count_columnar_records(file_path, file_format)
+            bounds = [records * partition // workers for partition in range(workers + 1)]
+            partitions = [(start, end, start) for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+        # The hashtags and mentions of each partition's records are found from the entity tables here, so they are
+        # only read once
+        partition_tables = [None] * len(partitions)
+        if entity_tables:
+            tables = read_entity_tables(file_path)
+            ends = [partitions[partition + 1][2] for partition in range(len(partitions) - 1)] + [np.iinfo(np.int64).max]
+            partition_tables = [tuple(slice_rows(tables[name], first_row, end) for name in ("hashtags", "mentions"))
+                                for (start, stop, first_row), end in zip(partitions, ends)]
+
+        results = pool.map(aggregate_partition, repeat(file_path), partitions, partition_tables, repeat(chunk_size),
+                           repeat(error))
+
+        aggregates = Aggregates() if error is None else ApproximateAggregates(error)
+        for partial in results:
+            aggregates.merge(partial)
+
+    return aggregates
+
+
+# Finds the counts of a partition of a refined file, as found by aggregate_in_partitions. This is run in each worker
+# process. tables holds the partition's parts of the hashtag and mention entity tables, or is None if there aren't any.
+def aggregate_partition(file_path, partition, tables, chunk_size, error=None):
+    if tables is None:
+        return aggregate_frames(read_partition(file_path, partition, chunk_size), split_entities, error)
+
+    hashtags, mentions = tables
+    return aggregate_frames(read_partition(file_path, partition, chunk_size), lambda df: (
+        index_entity_hashtags(slice_rows(hashtags, df.index[0], df.index[-1] + 1), df.index),
+        index_entity_mentions(slice_rows(mentions, df.index[0], df.index[-1] + 1), df.index)), error)
+
+
+# Returns the entities of an entity table (which is ordered by Row) belonging to the records from start up to end
+def slice_rows(table, start, end):
+    rows = table['Row'].to_numpy()
+
+    return table.iloc[np.searchsorted(rows, start):np.searchsorted(rows, end)]
+
+
+# Returns the tables of Row, Hashtag and Row, Mention pairs of a data frame, split from its Hashtags and Mentions
+def split_entities(df):
+    return split_hashtags(df['Hashtags']), split_mentions(df['Mentions'])
+
+
+# Reads a partition of a refined file, yielding data frames of up to chunk_size records with the position of each record
+# in the file as their index. partition holds the start and end of the partition (as byte offsets for CSV files, and as
+# positions of records otherwise) and the position of its first record.
+def read_partition(file_path, partition, chunk_size):
+    start, end, first_row = partition
+    file_format = file_format_of(file_path)
+
+    if file_format != "csv":
+        for df in read_columnar_chunks(file_path, file_format, chunk_size, ANALYSED_COLUMNS, start, end):
+            yield apply_schema(df)
+        return
+
+    with open_byte_range(file_path, start, end) as shard:
+        for df in pd.read_csv(shard, usecols=ANALYSED_COLUMNS, dtype=CSV_DTYPES, chunksize=chunk_size):
+            df.index = df.index + first_row
+            yield apply_schema(df)
+
+
+# Finds the merged counts of data frames of consecutive records in turn. entities_of returns the tables of Row, Hashtag
+# and Row, Mention pairs of a data frame, as AnalysedDataSet.hashtag_rows and mention_rows. If an error is given,
+# approximate counts are found instead.
+def aggregate_frames(frames, entities_of, error=None):
+    aggregates = Aggregates() if error is None else ApproximateAggregates(error)
+
+    for df in frames:
+        if len(df) > 0:
+            hashtags, mentions = entities_of(df)
+            if error is None:
+                aggregates.merge(aggregate(df, hashtags, mention_table=mentions))
+            else:
+                aggregates.merge(approximate_aggregate(df, hashtags, error, mention_table=mentions))
+
+    return aggregates
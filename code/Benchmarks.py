@@ -0,0 +1,264 @@
+import contextlib
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from Instrumentation import PROFILER, peak_resident_memory, resident_memory
+from RefinedData import read_refined, refined_file_path
+from SyntheticTweets import write_synthetic_tweets
+
+# Stores the default directory the synthetic data sets are generated in and the file the results are stored in
+DEFAULT_DATA_DIRECTORY = "../benchmarks/data/"
+DEFAULT_RESULTS_PATH = "../benchmarks/results.jsonl"
+
+# Stores the default number of rows of the synthetic data set, the seed it is generated from and the number of times each
+# benchmark is run
+DEFAULT_ROWS = 10000
+DEFAULT_SEED = 0
+DEFAULT_REPEAT = 3
+
+# Stores the user whose activity is analysed, the most active user of the synthetic data sets
+BENCHMARK_USER = "user0"
+
+# Stores the most records the network is built from
+NETWORK_SIZE = 1000
+
+# Stores the modules each benchmark uses, which are imported before it is timed
+BENCHMARK_MODULES = {"refinement": ["UnrefinedDataFrame"], "analysis": ["AnalysedDataSet"],
+                     "user_activity": ["AnalyseUserActivity"], "networks": ["Networks"], "geomap": ["Geomap"]}
+
+# Figures are drawn without a display
+matplotlib.use("Agg")
+
+"""
+This file contains the benchmark suite, used to measure how the time and memory taken by refinement and analysis grow
+with the size of the data set, and to compare them between commits.
+
+Each benchmark is run on synthetic data sets of the requested sizes from SyntheticTweets, which are generated once and
+kept in the data directory. Every run of a benchmark is made in a new process, so the peak resident memory measured is
+that of the benchmark alone, and the fastest of the runs is kept as its time. The stages and metrics measured by
+PROFILER during the fastest run are kept too, so a change in the time of a benchmark can be traced to the step causing
+it.
+
+The results are appended to a JSON lines file with the commit they were measured at, so the results of two commits can
+be compared.
+"""
+
+
+# Refines the raw data set, writing the refined file
+def benchmark_refinement(raw_path, refined_path):
+    from UnrefinedDataFrame import UnrefinedDataFrame
+
+    UnrefinedDataFrame(raw_path).clean_data()
+
+
+# Loads the refined data set and finds every metric of the analysis
+def benchmark_analysis(raw_path, refined_path):
+    from AnalysedDataSet import AnalysedDataSet
+
+    AnalysedDataSet(refined_path).results()
+
+
+# Analyses the activity of the most active user, including building the activity figure
+def benchmark_user_activity(raw_path, refined_path):
+    import matplotlib.pyplot as plt
+    from AnalyseUserActivity import AnalyseUserActivity
+
+    plt.close(AnalyseUserActivity(refined_path, BENCHMARK_USER).activity_over_time())
+
+
+# Builds the network of user interactions from a sample of the records
+def benchmark_networks(raw_path, refined_path):
+    from Networks import Networks
+
+    networks = Networks(refined_path)
+    networks.build_graph(min(NETWORK_SIZE, len(networks.datas)))
+
+
+# Loads and parses the coordinates of the tweets, as the maps are built from
+def benchmark_geomap(raw_path, refined_path):
+    from Geomap import parse_coordinates
+
+    parse_coordinates(read_refined(refined_path, columns=['Coordinates'], keep_placeholders=True)['Coordinates'])
+
+
+# Stores each benchmark by name, in the order they are run. Refinement is run first as the others use its output.
+BENCHMARKS = {"refinement": benchmark_refinement, "analysis": benchmark_analysis,
+              "user_activity": benchmark_user_activity, "networks": benchmark_networks, "geomap": benchmark_geomap}
+
+
+# Runs a benchmark once, returning the time taken, the resident memory before it and the peak resident memory of the
+# process, and the summary of PROFILER's measurements. The output of the benchmark is hidden.
+# A benchmark whose modules need a package that isn't installed is reported as skipped.
+def run_benchmark(name, raw_path, refined_path):
+    try:
+        for module in BENCHMARK_MODULES[name]:
+            importlib.import_module(module)
+    except ImportError as error:
+        return {"skipped": str(error)}
+
+    baseline_memory = resident_memory()
+    PROFILER.start()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            began = time.perf_counter()
+            BENCHMARKS[name](raw_path, refined_path)
+            seconds = time.perf_counter() - began
+    finally:
+        PROFILER.stop()
+
+    return {"seconds": seconds, "baseline_memory": baseline_memory, "peak_memory": peak_resident_memory(),
+            "stages": PROFILER.summary()}
+
+
+# Runs a benchmark once in a new process, so its peak memory isn't affected by anything run before it
+def run_benchmark_in_process(name, raw_path, refined_path):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, name, raw_path, refined_path).result()
+
+
+# Returns the paths of the raw and refined synthetic data sets of the given size and seed, generating and refining them
+# if they haven't been already
+def prepare_data_set(data_directory, rows, seed):
+    os.makedirs(data_directory, exist_ok=True)
+    raw_path = os.path.join(data_directory, "synthetic_%d_%d.csv" % (rows, seed))
+    refined_path = refined_file_path(raw_path)
+
+    if not os.path.exists(raw_path):
+        print("Generating", rows, "rows to", raw_path)
+        write_synthetic_tweets(raw_path, rows, seed)
+    if not os.path.exists(refined_path):
+        run_benchmark_in_process("refinement", raw_path, refined_path)
+
+    return raw_path, refined_path
+
+
+# Runs the named benchmarks on a synthetic data set of each size, returning a result for each benchmark and size.
+# Each benchmark is run repeat times, keeping the fastest run and the highest peak memory.
+def run_benchmarks(names=tuple(BENCHMARKS), sizes=(DEFAULT_ROWS,), seed=DEFAULT_SEED, repeat=DEFAULT_REPEAT,
+                   data_directory=DEFAULT_DATA_DIRECTORY):
+    environment = benchmark_environment()
+    results = []
+
+    for rows in sizes:
+        raw_path, refined_path = prepare_data_set(data_directory, rows, seed)
+
+        for name in BENCHMARKS:
+            if name not in names:
+                continue
+
+            runs = [run_benchmark_in_process(name, raw_path, refined_path) for _ in range(repeat)]
+            result = dict(environment, benchmark=name, rows=rows, seed=seed)
+
+            if "skipped" in runs[0]:
+                result["skipped"] = runs[0]["skipped"]
+            else:
+                fastest = min(runs, key=lambda run: run["seconds"])
+                result.update(seconds=fastest["seconds"], runs=[run["seconds"] for run in runs],
+                              baseline_memory=fastest["baseline_memory"],
+                              peak_memory=max(run["peak_memory"] or 0 for run in runs) or None,
+                              stages=fastest["stages"])
+
+            print_result(result)
+            results.append(result)
+
+    return results
+
+
+# Returns the commit the code is at, whether it has uncommitted changes, when the benchmarks are run and the versions
+# of Python and the libraries they depend on
+def benchmark_environment():
+    return {"commit": git_output("rev-parse", "HEAD") or "unknown",
+            "dirty": bool(git_output("status", "--porcelain", "--untracked-files=no")),
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "cpus": os.cpu_count()}
+
+
+# Returns the output of a git command run in the code's directory, or None if it can't be run
+def git_output(*arguments):
+    try:
+        return subprocess.run(("git",) + arguments, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Appends results to a JSON lines file
+def save_results(results, file_path=DEFAULT_RESULTS_PATH):
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(file_path, "a") as file:
+        for result in results:
+            file.write(json.dumps(result) + "\n")
+
+
+# Loads the results stored in a JSON lines file, returning an empty List if there are none
+def load_results(file_path=DEFAULT_RESULTS_PATH):
+    try:
+        with open(file_path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+# Returns the latest result of each benchmark and size measured at a commit, which may be given as a prefix of its hash
+def commit_results(results, commit):
+    latest = {}
+    for result in results:
+        if result["commit"].startswith(commit) and "skipped" not in result:
+            latest[(result["benchmark"], result["rows"])] = result
+
+    return latest
+
+
+# Returns a comparison of each result with the result of the same benchmark and size at an earlier commit, as Tuples of
+# the benchmark, the rows, the earlier and new seconds and peak memory, and the ratio of the new time to the earlier
+def compare_results(results, earlier_results):
+    comparison = []
+    for result in results:
+        earlier = earlier_results.get((result["benchmark"], result["rows"]))
+        if earlier is None or "skipped" in result:
+            continue
+
+        comparison.append((result["benchmark"], result["rows"], earlier["seconds"], result["seconds"],
+                           earlier["peak_memory"], result["peak_memory"], result["seconds"] / earlier["seconds"]))
+
+    return comparison
+
+
+# Outputs the result of a benchmark
+def print_result(result):
+    if "skipped" in result:
+        print("%-14s %10d rows  skipped (%s)" % (result["benchmark"], result["rows"], result["skipped"]))
+    else:
+        print("%-14s %10d rows  %10.3f s  %10s peak" % (result["benchmark"], result["rows"], result["seconds"],
+                                                        format_memory(result["peak_memory"])))
+
+
+# Outputs a comparison from compare_results with the commit it is compared with
+def print_comparison(comparison, commit):
+    print("\nCompared with", commit)
+    print("%-14s %10s  %12s  %12s  %10s  %10s  %7s" % ("benchmark", "rows", "before (s)", "after (s)", "before",
+                                                        "after", "ratio"))
+    for benchmark, rows, seconds, new_seconds, memory, new_memory, ratio in comparison:
+        print("%-14s %10d  %12.3f  %12.3f  %10s  %10s  %6.2fx" % (benchmark, rows, seconds, new_seconds,
+                                                                   format_memory(memory), format_memory(new_memory),
+                                                                   ratio))
+
+
+# Returns an amount of memory in bytes as a String of megabytes
+def format_memory(memory):
+    return "n/a" if memory is None else "%.1f MB" % (memory / (1 << 20))
@@ -0,0 +1,191 @@
+import io
+import os
+
+import numpy as np
+
+# Stores the number of bytes read at a time while scanning a file for row boundaries.
+BLOCK_SIZE = 1 << 20
+
+"""
+This file contains the methods used to split a CSV file into shards of roughly equal byte ranges and to read each one.
+
+Shards always start and end on a row boundary. A newline only ends a row if it is outside of a quoted value, which is
+the case when an even number of quote characters come before it in the file (escaped quotes are doubled, so they don't
+change this). The quotes are counted a block at a time, so only the bytes just after each split point are scanned
+individually.
+"""
+
+
+# Finds the byte offsets to split a CSV file at to give the requested number of shards. The first offset is the end of
+# the header row and the last is the end of the file, so shard i covers boundaries[i] to boundaries[i + 1].
+# Fewer shards may be returned if the file has too few rows to split.
+def find_row_boundaries(file_path, shard_count):
+    size = os.path.getsize(file_path)
+
+    with open(file_path, "rb") as file:
+        header_end = next_row_start(file, 0, 0, size)
+        boundaries = [header_end]
+
+        # Stores how far through the file quotes have been counted, and how many were found
+        position, quotes = 0, 0
+
+        for shard in range(1, shard_count):
+            target = header_end + (size - header_end) * shard // shard_count
+
+            # If the previous shard's last row ran past this split point, there is nothing to split here
+            if target < boundaries[-1]:
+                continue
+
+            quotes += count_quotes(file, position, target)
+            position = target
+
+            boundary = next_row_start(file, target, quotes % 2, size)
+            if boundaries[-1] < boundary < size:
+                boundaries.append(boundary)
+
+        boundaries.append(size)
+
+    return boundaries
+
+
+# Finds the offset of the end of the last complete row between two offsets of a file, where start is a row boundary
+# (such as the end of the header). Any partly written row at the end is left out, so a file that is still being appended to
+# can be read up to this offset. Returns start if there are no complete rows.
+def last_row_boundary(file_path, start, end):
+    with open(file_path, "rb") as file:
+        quotes = count_quotes(file, start, end)
+
+        # Scanning backwards a block at a time for the last newline which is outside of a quoted value
+        position = end
+        while position > start:
+            block_start = max(start, position - BLOCK_SIZE)
+            file.seek(block_start)
+            block = file.read(position - block_start)
+
+            index = block.rfind(b"\n")
+            while index != -1:
+                if (quotes - block.count(b'"', index)) % 2 == 0:
+                    return block_start + index + 1
+                index = block.rfind(b"\n", 0, index)
+
+            quotes -= block.count(b'"')
+            position = block_start
+
+    return start
+
+
+# Counts the rows between two offsets of a CSV file that are row boundaries (found with find_row_boundaries). A newline
+# only ends a row if an even number of quotes come before it in the range, and a last row without a newline at its end
+# is counted too. The quotes and newlines are found a block at a time with numpy rather than a character at a time.
+def count_rows(file_path, start, end):
+    rows, quotes, last_byte = 0, 0, b"\n"
+
+    with open(file_path, "rb") as file:
+        file.seek(start)
+
+        while start < end:
+            block = file.read(min(BLOCK_SIZE, end - start))
+            if not block:
+                break
+
+            data = np.frombuffer(block, dtype=np.uint8)
+            quote_counts = np.cumsum(data == ord('"')) + quotes
+            rows += int(np.count_nonzero((data == ord("\n")) & (quote_counts % 2 == 0)))
+
+            quotes = int(quote_counts[-1])
+            last_byte = block[-1:]
+            start += len(block)
+
+    return rows + (last_byte != b"\n")
+
+
+# Finds the offset of the end of the header row of a CSV file
+def header_end(file_path):
+    with open(file_path, "rb") as file:
+        return next_row_start(file, 0, 0, os.path.getsize(file_path))
+
+
+# Counts the number of quote characters between two offsets of a file
+def count_quotes(file, start, end):
+    file.seek(start)
+    quotes = 0
+
+    while start < end:
+        block = file.read(min(BLOCK_SIZE, end - start))
+        if not block:
+            break
+
+        quotes += block.count(b'"')
+        start += len(block)
+
+    return quotes
+
+
+# Finds the offset of the start of the next row at or after an offset of a file, given whether an odd number of quotes
+# come before that offset (i.e. whether it is inside a quoted value). Returns the size of the file if there are no more.
+def next_row_start(file, start, parity, size):
+    file.seek(start)
+
+    while start < size:
+        block = file.read(BLOCK_SIZE)
+        if not block:
+            break
+
+        previous = 0
+        index = block.find(b"\n")
+        while index != -1:
+            parity = (parity + block.count(b'"', previous, index)) % 2
+            if parity == 0:
+                return start + index + 1
+
+            previous = index
+            index = block.find(b"\n", index + 1)
+
+        parity = (parity + block.count(b'"', previous)) % 2
+        start += len(block)
+
+    return size
+
+
+# Opens the rows between two offsets of a CSV file (found with find_row_boundaries) as a binary file, with the file's
+# header row added to the start, so that it can be read in with pandas like a file of its own.
+def open_byte_range(file_path, start, end):
+    with open(file_path, "rb") as file:
+        header = file.read(header_end(file_path))
+
+    return io.BufferedReader(ByteRange(file_path, header, start, end))
+
+
+"""
+This class is a read-only binary stream of a header followed by a byte range of a file, read from disk as needed.
+"""
+
+
+class ByteRange(io.RawIOBase):
+
+    def __init__(self, file_path, header, start, end):
+        super().__init__()
+        self.file = open(file_path, "rb")
+        self.file.seek(start)
+        self.header = header
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    # Fills the given buffer with the next bytes of the header, then of the file range, returning the number written
+    def readinto(self, buffer):
+        if self.header:
+            count = min(len(buffer), len(self.header))
+            buffer[:count] = self.header[:count]
+            self.header = self.header[count:]
+            return count
+
+        data = self.file.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self.file.close()
+        super().close()
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from ExtractionEngine import ENTITY_NAME_PATTERN
+
+# orjson is used to decode the Entities JSON when it is installed as it is much faster, otherwise the standard library
+# decoder is used.
+try:
+    from orjson import loads as decode_json, JSONDecodeError
+except ImportError:
+    from json import loads as decode_json, JSONDecodeError
+
+# Stores the suffix added to a refined file's name (without its extension) for each entity table, and the table's
+# columns. Every table is in long format, with one record per entity and the position of its tweet in the refined file
+# as Row.
+ENTITY_TABLES = {"hashtags": ("_HASHTAGS.csv", ["Row", "Hashtag"]),
+                 "mentions": ("_MENTIONS.csv", ["Row", "Screen Name", "User ID"]),
+                 "urls": ("_URLS.csv", ["Row", "URL", "Expanded URL"])}
+
+# Stores the DTypes that have to be assigned on loading the tables to prevent loss of information in ID's
+SPECIFIED_DTYPE = {"Row": np.int64, "Hashtag": object, "Screen Name": object, "User ID": object, "URL": object,
+                   "Expanded URL": object}
+
+"""
+This file contains the methods used to parse the Entities column of a data set into normalised entity tables and to
+store them alongside the refined file.
+
+Each Entities value is decoded as JSON once, rather than being searched with a Regex for every kind of entity, and the
+tables can be loaded by the analysis classes instead of splitting the ; separated Hashtags and Mentions columns again.
+The hashtags and mentions kept follow the same rules as those columns, so the analysis gives the same results whether
+or not the tables were saved.
+"""
+
+
+# Parses a column of Entities values into a dictionary of entity tables. row_offset is added to each value's position
+# so the tables of a file refined in chunks line up with the rows of the whole refined file.
+# As in the Hashtags and Mentions columns, only names matching ENTITY_NAME_PATTERN are kept, and the text of each symbol
+# is kept as a hashtag after the record's hashtags, as the Hashtags column matches the text of every entity.
+def parse_entities(entities, row_offset=0):
+    records = {name: [] for name in ENTITY_TABLES}
+
+    for row, entity in enumerate(decode_entities(entities), row_offset):
+        # Values that could not be decoded are skipped, they have no entities to add
+        if not isinstance(entity, dict):
+            continue
+
+        for hashtag in (entity.get("hashtags") or []) + (entity.get("symbols") or []):
+            if is_entity_name(hashtag.get("text")):
+                records["hashtags"].append((row, hashtag.get("text")))
+
+        for mention in entity.get("user_mentions") or []:
+            if is_entity_name(mention.get("screen_name")):
+                records["mentions"].append((row, mention.get("screen_name"), mention.get("id_str")))
+
+        for url in entity.get("urls") or []:
+            records["urls"].append((row, url.get("url"), url.get("expanded_url")))
+
+    return {name: pd.DataFrame(records[name], columns=columns).astype({"Row": np.int64})
+            for name, (suffix, columns) in ENTITY_TABLES.items()}
+
+
+# Checks whether a hashtag or screen name is kept in the entity tables
+def is_entity_name(name):
+    return type(name) is str and ENTITY_NAME_PATTERN.fullmatch(name) is not None
+
+
+# Decodes a column of Entities values, giving None for any value that is missing or isn't valid JSON.
+def decode_entities(entities):
+    values = entities.tolist()
+    valid = [type(value) is str and value.startswith("{") for value in values]
+
+    # All valid values are joined into one JSON array so the decoder is only called once. If any of them turns out to be
+    # malformed, each value is decoded separately instead so only that value is lost.
+    try:
+        decoded = iter(decode_json("[" + ",".join(value for value, ok in zip(values, valid) if ok) + "]"))
+        return [next(decoded) if ok else None for ok in valid]
+    except (JSONDecodeError, ValueError):
+        return [decode_single(value) if ok else None for value, ok in zip(values, valid)]
+
+
+# Decodes a single Entities value, giving None if it isn't valid JSON.
+def decode_single(value):
+    try:
+        return decode_json(value)
+    except (JSONDecodeError, ValueError):
+        return None
+
+
+# Returns the path each entity table is stored at for a given refined file
+def entity_table_paths(refined_file_path):
+    return {name: os.path.splitext(refined_file_path)[0] + suffix for name, (suffix, columns) in ENTITY_TABLES.items()}
+
+
+# Writes each entity table to the file next to the refined file, appending to existing tables if requested.
+def write_entity_tables(tables, refined_file_path, append=False):
+    for name, path in entity_table_paths(refined_file_path).items():
+        tables[name].to_csv(path, mode="a" if append else "w", header=not append, index=False)
+
+
+# Removes any entity tables stored for a refined file, so tables from an older refinement aren't used with a new one.
+def remove_entity_tables(refined_file_path):
+    for path in entity_table_paths(refined_file_path).values():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Checks whether entity tables have been stored for a refined file
+def has_entity_tables(refined_file_path):
+    return all(os.path.exists(path) for path in entity_table_paths(refined_file_path).values())
+
+
+# Loads the entity tables stored for a refined file, returning None if they haven't been created.
+def read_entity_tables(refined_file_path):
+    if not has_entity_tables(refined_file_path):
+        return None
+
+    return {name: pd.read_csv(path, dtype=SPECIFIED_DTYPE, keep_default_na=False)
+            for name, path in entity_table_paths(refined_file_path).items()}
+
+
+"""
+This class is used to read a stored entity table alongside a refined file that is being read in chunks, returning the
+entities of each chunk's records in turn without loading the whole table.
+"""
+
+
+class EntityTableReader:
+
+    # Opens the stored entity table of the given name for a refined file, reading chunk_size entities at a time
+    def __init__(self, refined_file_path, name, chunk_size):
+        self.chunks = pd.read_csv(entity_table_paths(refined_file_path)[name], dtype=SPECIFIED_DTYPE,
+                                  keep_default_na=False, chunksize=chunk_size)
+        # Stores the entities read from the table but not yet returned
+        self.pending = pd.DataFrame(columns=ENTITY_TABLES[name][1]).astype({"Row": np.int64})
+        self.finished = False
+
+    # Returns the entities of the records before the given row in the refined file that haven't been returned yet.
+    # As the table is ordered by Row, entities are read until one belonging to a later record is found.
+    def read_until(self, end_row):
+        while not self.finished and (len(self.pending) == 0 or self.pending['Row'].iloc[-1] < end_row):
+            try:
+                self.pending = pd.concat([self.pending, next(self.chunks)], ignore_index=True)
+            except StopIteration:
+                self.finished = True
+
+        before = self.pending['Row'].to_numpy() < end_row
+        entities, self.pending = self.pending[before], self.pending[~before].reset_index(drop=True)
+
+        return entities.reset_index(drop=True)
+
+    def close(self):
+        self.chunks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
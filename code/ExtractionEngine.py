@@ -0,0 +1,97 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Stores the pattern a hashtag or screen name has to match to be extracted. Names with any other characters (such as _
+# or non-ASCII letters) are left out. The entity tables parsed from the Entities column follow the same rule, so the
+# hashtags and mentions of a record are the same whichever of them they are found from.
+ENTITY_NAME = r"[a-zA-Z0-9]+"
+ENTITY_NAME_PATTERN = re.compile(ENTITY_NAME)
+
+# Stores the precompiled patterns used to extract values from whole columns at a time.
+# These match the patterns used by the per-value helper methods in UnrefinedDataFrame so the results are the same.
+RETWEET_PATTERN = re.compile(r"RT @", re.IGNORECASE)
+RETWEETED_USER_PATTERN = re.compile(r"^RT @(\S*)", re.IGNORECASE)
+HASHTAG_PATTERN = re.compile(r"\"text\":\"(" + ENTITY_NAME + r")\",", re.IGNORECASE)
+MENTIONS_SECTION_PATTERN = re.compile(r"(\"user_mentions\":.*\",)", re.IGNORECASE)
+SCREEN_NAME_PATTERN = re.compile(r"\"screen_name\":\"(" + ENTITY_NAME + r")\",", re.IGNORECASE)
+APP_PATTERN = re.compile(r">(.*)</", re.IGNORECASE)
+
+"""
+This file contains the methods used to extract the calculated columns from a data set a column at a time.
+
+Each method takes a whole column (as read in with dtype=object, so values are either Strings or missing) and returns the
+new column, giving the same values as mapping the matching helper method in UnrefinedDataFrame over every row.
+Missing values give None, as the helper methods do, so they are later replaced by the placeholder.
+
+The work is done by pandas' vectorised string methods with the patterns above compiled once, rather than by compiling a
+pattern and building a String for every row. Columns with few distinct values (such as Source) are dictionary-encoded
+with map_unique, so the work is only done once for each distinct value.
+"""
+
+
+# Finds whether each Text value is a retweet. Missing values are not retweets.
+def extract_is_retweet(text):
+    return text.str.match(RETWEET_PATTERN, na=False).astype(bool)
+
+
+# Finds whether each Reply Username value exists, as only replies contain one.
+def extract_is_reply(reply_username):
+    return reply_username.notna()
+
+
+# Finds the user retweeted in each Text value. Text that isn't a retweet gives an empty String.
+def extract_rt_to(text):
+    users = text.str.extract(RETWEETED_USER_PATTERN, expand=False).str.replace(":", "", regex=False)
+
+    return fill_unmatched(users, text)
+
+
+# Finds the hashtags in each Entities value and returns them as a ; separated String.
+def extract_hashtags(entities):
+    hashtags = entities.str.findall(HASHTAG_PATTERN).str.join(";")
+
+    return fill_unmatched(hashtags, entities)
+
+
+# Finds the screen names in the user mentions section of each Entities value and returns them as a ; separated String.
+def extract_mentions(entities):
+    section = entities.str.extract(MENTIONS_SECTION_PATTERN, expand=False)
+    mentions = section.str.findall(SCREEN_NAME_PATTERN).str.join(";")
+
+    return fill_unmatched(mentions, entities)
+
+
+# Finds the name of the app in each Source value's HTML anchor. Only a handful of distinct anchors are repeated across
+# every row, so each distinct value is only searched once.
+def extract_apps(source):
+    return map_unique(source, extract_unique_apps)
+
+
+# Finds the name of the app in each value of a column of Source values.
+def extract_unique_apps(source):
+    apps = source.str.extract(APP_PATTERN, expand=False)
+
+    return fill_unmatched(apps, source)
+
+
+# Applies a method, which takes a whole column and returns a new one, to a column with few distinct values. The column is
+# dictionary-encoded so the method is only run on each distinct value (and on a single missing value), then the results
+# are spread back over every row using the codes. This gives the same values as running the method on the whole column.
+# per-value helper methods can be used too, by passing a method that maps the helper over the distinct values.
+def map_unique(values, method):
+    codes, uniques = pd.factorize(values)
+
+    # Missing values are given the code -1, so the result for the missing value is placed last
+    distinct = pd.Series(np.append(np.asarray(uniques, dtype=object), None), dtype=object)
+    results = np.asarray(method(distinct))
+
+    return pd.Series(results[codes], index=values.index, name=values.name)
+
+
+# Replaces values that had no match with an empty String and values that were missing in the original column with None
+def fill_unmatched(extracted, original):
+    extracted = extracted.where(extracted.notna(), "")
+
+    return extracted.astype(object).where(original.notna(), None)
@@ -5,6 +5,9 @@ import json
 from urllib.request import urlopen
 import time
 
+from Instrumentation import profiled
+from RefinedData import read_refined
+
 # Collect coords into list
 
 # Stores the default path for a CSV file
@@ -13,17 +16,31 @@ DEFAULT_FILE_PATH = "../data/CometLanding_REFINED.csv"
 # Stores the filepath to the images directory
 IMAGE_DIRECTORY = "../images/"
 
+# Returns the [latitude, longitude] of each tweet with coordinates from a column of "loc: latitude,longitude" values,
+# skipping the "n/a" placeholder of tweets without coordinates and any 0,0 coordinates
+@profiled
+def parse_coordinates(coordinates):
+    lister = []
+    for values in coordinates[coordinates != "n/a"]:
+        vals = values.replace("loc: ", "")
+        geoval = [float(vals.split(',')[0]), float(vals.split(',')[1])]
+        lister.append(geoval)
+
+    # Removing 0,0 coordinates
+    return list(filter(([0, 0]).__ne__, lister))
+
+
 class Geomap:
     # Loads in the data and runs the required analysis on it, storing the results. A default data filepath is provided.
+    @profiled
     def __init__(self, file_path=DEFAULT_FILE_PATH):
 
         # Credentials and urls used to obtain data from the Map API
         self.apiKey = "mHmaGDAV0NE69q6dVAmyfzV2AACpm1NT"
         mapUrl = 'http://{s}.api.tomtom.com/map/1/tile/basic/main/{z}/{x}/{y}.png?view=Unified&key='
 
-        df = pd.read_csv(DEFAULT_FILE_PATH, dtype=object, keep_default_na=False)
-
-        datas = df[df['Coordinates'] != "n/a"]
+        # Reading in only the coordinates from the data file, keeping the "n/a" placeholder for missing values.
+        df = read_refined(file_path, columns=['Coordinates'], keep_placeholders=True)
 
         # Creating the base map using the map provided by tom-tom API
         # The following section of code was inspired by the article found here:
@@ -42,15 +59,8 @@ class Geomap:
         # Section ends here
 
         # Reading the coordinates from the dataframe extracting the useful bits and storing it in a separate list
-        self.lister = []
+        self.lister = parse_coordinates(df['Coordinates'])
         self.map_data = {}
-        for index, values in datas.iterrows():
-            vals = values['Coordinates'].replace("loc: ", "")
-            geoval = [float(vals.split(',')[0]), float(vals.split(',')[1])]
-            self.lister.append(geoval)
-
-        # Removing 0,0 coordinates
-        self.lister = list(filter(([0, 0]).__ne__, self.lister))
 
         # Callback data used to modify the look of the markers on the map
         # The following section of code was inspired by the article found here:
@@ -91,6 +101,7 @@ class Geomap:
     def show_heat_map(self):
         return self.heat_map
 
+    @profiled
     def top_n_countries(self):
         # Url for coordinate decoder api
         revGeoUrl = 'https://api.tomtom.com/search/2/reverseGeocode/'
@@ -1,33 +1,36 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
 from urllib.error import HTTPError
 
 from pandas.errors import EmptyDataError
 
 from Geomap import Geomap
+from Instrumentation import add_profile_arguments, start_profiling
 
 """
-Takes an input filepath to a post-refinement CSV file and runs network analysis on it.
+Takes an input filepath to a post-refinement CSV file and runs geographical analysis on it.
 
+Using --profile writes the time taken and memory used by building the maps to a JSON report, and using --cprofile
+writes a cProfile dump of the run.
 """
 if __name__ == '__main__':
-    # Validates the number of arguments, outputting an error and exiting if they are incorrect
-    if len(sys.argv) != 2:
-        print("Incorrect number of arguments input.")
-        print("Usage: GeomapRun.py <file_path>")
-        sys.exit(0)
-    else:
-        try:
-            # Running the analysis on the CSV data
-            map_data = Geomap(sys.argv[1])
-        except FileNotFoundError:
-            print("File could not be found.")
-        except EmptyDataError:
-            print("Input file is missing data.")
-        except (KeyError, ValueError):
-            print("Input file is incorrectly formatted.")
-        except HTTPError:
-            print("API could not be accessed, please try again later.")
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Runs geographical analysis on a post-refinement file.")
+    parser.add_argument("file_path", help="path to the refined file to analyse")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
 
+    start_profiling(args)
 
+    try:
+        # Running the analysis on the CSV data
+        map_data = Geomap(args.file_path)
+    except FileNotFoundError:
+        print("File could not be found.")
+    except EmptyDataError:
+        print("Input file is missing data.")
+    except (KeyError, ValueError):
+        print("Input file is incorrectly formatted.")
+    except HTTPError:
+        print("API could not be accessed, please try again later.")
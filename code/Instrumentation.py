@@ -0,0 +1,218 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# The resource module is only available on Unix, where it is used to find the peak resident memory of the process
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+This file contains the instrumentation used to find where the time and memory of a run goes.
+
+The stages of refinement, the metric methods of the analysis, the figure builders and the network build are each
+measured by PROFILER while it is enabled, recording the time taken and the change in memory of every call. Measurements
+can be nested, with each recording how deep it was in the thread it was made in. While the profiler isn't enabled,
+measuring only checks whether it is, so the instrumentation can be left in place.
+
+Memory is measured as the resident memory of the process, unless allocations are traced with tracemalloc, which also
+finds the peak memory allocated during each call but makes the run several times slower. Only calls made in the process
+running the profiler are measured, so the work done by worker processes is measured as a whole by the call waiting for
+them.
+
+Each command line script has a --profile option, which writes the measurements and a summary of them to a JSON report,
+and a --cprofile option, which writes a cProfile dump of the run that can be read with pstats or snakeviz.
+"""
+
+
+# Returns the resident memory of the process in bytes, or None if it can't be found on this platform
+def resident_memory():
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Returns the peak resident memory of the process in bytes, or None if it can't be found on this platform
+def peak_resident_memory():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The peak is given in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+"""
+This class records the time taken and memory used by each measured call while it is enabled.
+"""
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.measurements = []
+        # Stores the measurements of the calls currently running in each thread, innermost last
+        self.threads = threading.local()
+        self.started = None
+        self.seconds = None
+
+    # Clears any previous measurements and starts measuring. If trace_memory is set, memory is measured from the
+    # allocations traced by tracemalloc rather than from the resident memory of the process.
+    def start(self, trace_memory=False):
+        self.measurements = []
+        self.threads = threading.local()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.started = time.perf_counter()
+        self.enabled = True
+
+    # Stops measuring, keeping the measurements made
+    def stop(self):
+        self.enabled = False
+        self.seconds = time.perf_counter() - self.started
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    # Stores the measurements of the calls currently running in the current thread
+    @property
+    def running(self):
+        if not hasattr(self.threads, "running"):
+            self.threads.running = []
+
+        return self.threads.running
+
+    # Returns the memory currently used, as measured by the profiler
+    def memory(self):
+        if self.trace_memory:
+            return tracemalloc.get_traced_memory()[0]
+
+        return resident_memory()
+
+    # Measures the code run inside the context under the given name, if the profiler is enabled
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        measurement = {"name": name, "thread": threading.current_thread().name, "depth": len(self.running),
+                       "seconds": None, "memory_delta": None, "memory_peak": None}
+        self.measurements.append(measurement)
+
+        # The peak of the call around this one is kept before the peak is reset for this call
+        if self.trace_memory:
+            self.record_peak()
+            tracemalloc.reset_peak()
+
+        self.running.append(measurement)
+        memory = self.memory()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            measurement["seconds"] = time.perf_counter() - began
+            if memory is not None:
+                measurement["memory_delta"] = self.memory() - memory
+
+            # The peak of this call is also a peak of the call around it
+            if self.trace_memory:
+                self.record_peak()
+                measurement["memory_peak"] = measurement.pop("peak")
+            self.running.pop()
+            if self.trace_memory and self.running:
+                self.running[-1]["peak"] = max(self.running[-1].get("peak", 0), measurement["memory_peak"])
+
+    # Stores the peak traced memory since the last reset against the innermost running call
+    def record_peak(self):
+        if self.running:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.running[-1]["peak"] = max(self.running[-1].get("peak", 0), peak)
+
+    # Returns a Dictionary of the total number of calls, time taken and change in memory of each name measured, in the
+    # order they were first measured
+    def summary(self):
+        summary = {}
+        for measurement in self.measurements:
+            totals = summary.setdefault(measurement["name"], {"calls": 0, "seconds": 0.0, "memory_delta": 0})
+            totals["calls"] += 1
+            totals["seconds"] += measurement["seconds"] or 0.0
+            totals["memory_delta"] += measurement["memory_delta"] or 0
+
+        return summary
+
+    # Returns the report of the run, with every measurement and the summary of them
+    def report(self):
+        return {"command": sys.argv, "seconds": self.seconds,
+                "memory": "tracemalloc" if self.trace_memory else "resident",
+                "peak_resident_memory": peak_resident_memory(), "summary": self.summary(),
+                "measurements": self.measurements}
+
+    # Writes the report of the run to a JSON file
+    def write_report(self, file_path):
+        with open(file_path, "w") as file:
+            json.dump(self.report(), file, indent=2, default=str)
+
+
+# Stores the profiler shared by every module
+PROFILER = Profiler()
+
+
+# Decorator measuring each call of a function with PROFILER, under the function's qualified name
+def profiled(function):
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def measured(*args, **kwargs):
+        with PROFILER.measure(name):
+            return function(*args, **kwargs)
+
+    return measured
+
+
+# Adds the --profile, --cprofile and --trace-memory options to a command line script's argument parser
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="write the time taken and memory used by each stage and metric to this JSON file")
+    parser.add_argument("--cprofile", metavar="DUMP",
+                        help="write a cProfile dump of the run to this file")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --profile, measure memory with tracemalloc, finding the peak of each call (slower)")
+
+
+# Starts profiling the run as requested by the options added by add_profile_arguments. The JSON report and the cProfile
+# dump are written when the script exits, however it exits.
+def start_profiling(args):
+    if args.cprofile:
+        profile = cProfile.Profile()
+        atexit.register(write_cprofile_dump, profile, args.cprofile)
+        profile.enable()
+
+    if args.profile:
+        PROFILER.start(args.trace_memory)
+        atexit.register(write_profile_report, args.profile)
+
+
+# Stops a cProfile profile and writes its dump to a file
+def write_cprofile_dump(profile, file_path):
+    profile.disable()
+    profile.dump_stats(file_path)
+
+
+# Stops PROFILER and writes its report to a JSON file
+def write_profile_report(file_path):
+    PROFILER.stop()
+    PROFILER.write_report(file_path)
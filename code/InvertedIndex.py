@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+"""
+This file contains the inverted index used to find the records a value (such as a hashtag or a user) occurs in, and the
+methods used to combine the positions of the records found.
+
+The positions of the records are stored as sorted integer arrays, so that combining the records of several values only
+takes time relative to the number of records found rather than the size of the data set.
+"""
+
+
+# Returns the positions found in every one of the given sorted arrays of positions. Each position in the smallest array
+# is searched for in the others, so this takes time relative to the size of the smallest array.
+def intersect(row_arrays):
+    row_arrays = sorted(row_arrays, key=len)
+    if not row_arrays:
+        return np.empty(0, dtype=np.int64)
+
+    rows = row_arrays[0]
+    for other in row_arrays[1:]:
+        if len(rows) == 0 or len(other) == 0:
+            return rows[:0]
+
+        found = np.minimum(np.searchsorted(other, rows), len(other) - 1)
+        rows = rows[other[found] == rows]
+
+    return rows
+
+
+# Returns the positions found in any of the given sorted arrays of positions, in order
+def union(row_arrays):
+    row_arrays = list(row_arrays)
+    if not row_arrays:
+        return np.empty(0, dtype=np.int64)
+
+    return np.unique(np.concatenate(row_arrays))
+
+
+"""
+This class is an inverted index from each value to the positions of the records it occurs in.
+
+The values are factorised once and the positions of the records of each value are stored together, sorted by value and
+then by position, with the offset each value's positions start at. Positions are stored as 32 bit integers unless the
+data set is too large for them.
+"""
+
+
+class InvertedIndex:
+
+    # Builds the index from pairs of a value and the position of the record it occurs in. Missing values aren't indexed,
+    # and a value occurring in a record more than once is only indexed once.
+    def __init__(self, values, rows):
+        codes, values = pd.factorize(values)
+        rows = np.asarray(rows, dtype=np.int64)
+        indexed = codes >= 0
+        codes, rows = codes[indexed], rows[indexed]
+
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        distinct = np.ones(len(rows), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+
+        # Stores the values in the order they first occur, the positions of the records of each, and where each value's
+        # positions start and end
+        self.values = pd.Index(values)
+        self.positions = rows[distinct]
+        if len(self.positions) == 0 or self.positions.max() < 2 ** 31:
+            self.positions = self.positions.astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[distinct], minlength=len(values)))])
+
+    # Returns the sorted positions of the records a value occurs in
+    def rows(self, value):
+        try:
+            code = self.values.get_loc(value)
+        except KeyError:
+            return self.positions[:0]
+
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    # Returns the sorted positions of the records every one of the given values occurs in
+    def all_of(self, values):
+        return intersect([self.rows(value) for value in values])
+
+    # Returns the sorted positions of the records any of the given values occurs in
+    def any_of(self, values):
+        return union([self.rows(value) for value in values])
+
+    # Returns a Dictionary matching each value to the number of records it occurs in, in the order the values first
+    # occur
+    def counts(self):
+        return dict(zip(self.values, np.diff(self.offsets).tolist()))
+
+    def __contains__(self, value):
+        return value in self.values
+
+    def __len__(self):
+        return len(self.values)
@@ -3,6 +3,10 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import os
 
+from EntityTables import read_entity_tables
+from Instrumentation import profiled
+from RefinedData import read_refined
+
 # Stores the default path for a CSV file
 DEFAULT_FILE_PATH = "../data/CometLanding_REFINED.csv"
 
@@ -12,21 +16,24 @@ IMAGE_DIRECTORY = "../images/"
 
 class Networks:
     # Loads in the data and runs the required analysis on it, storing the results. A default data filepath is provided.
+    @profiled
     def __init__(self, file_path=DEFAULT_FILE_PATH):
 
-        # Reading in the data file and assigning ID values to be Strings to prevent loss of data.
-        self.df = pd.read_csv(file_path, dtype=object, keep_default_na=False)
+        # Reading in only the columns needed from the data file, keeping the "n/a" placeholder for missing values.
+        self.df = read_refined(file_path, columns=['Reply Username', 'User', 'RT To', 'Mentions'],
+                               keep_placeholders=True)
 
         # Limiting the dataframe columns to the ones needed
         self.datas = self.df[['Reply Username', 'User', 'RT To', 'Mentions']]
 
-    # Saving the network to an image and showing it in jupyter notebook
-    def displayNetwork(self, size):
-
-        print("starting draw")
-        plt.figure(1, dpi=50, figsize=(200, 200))
-        plt.title("Network of User Interactions")
+        # Stores the mention entity table saved during refinement, if there is one, so each mentioned user can be
+        # linked separately rather than splitting the Mentions column.
+        entity_tables = read_entity_tables(file_path)
+        self.mention_table = entity_tables['mentions'] if entity_tables is not None else None
 
+    # Builds the graph of user interactions from a sample of size records, storing it
+    @profiled
+    def build_graph(self, size):
         # Sampling the data to a given size as the whole data cannot be illustrated in the graph
         samp_data = self.datas.sample(n=size)
 
@@ -36,6 +43,11 @@ class Networks:
         # Adding nodes where a single username is a single node
         self.G.add_nodes_from(self.datas['User'])
 
+        # Finding the users mentioned in each sampled record from the mention table, if there is one
+        if self.mention_table is not None:
+            sampled = self.mention_table[self.mention_table['Row'].isin(samp_data.index)]
+            mentions = sampled.groupby('Row')['Screen Name'].apply(list)
+
         i = 0
         # Adding edges to the graph
         # Where red represents replies
@@ -46,7 +58,11 @@ class Networks:
         for index, row in samp_data.iterrows():
             self.G.add_edge(row['User'], row['Reply Username'], color='r')
             self.G.add_edge(row['User'], row['RT To'], color='b')
-            self.G.add_edge(row['User'], row['Mentions'], color='g')
+            if self.mention_table is None:
+                self.G.add_edge(row['User'], row['Mentions'], color='g')
+            else:
+                for mention in mentions.get(index, []):
+                    self.G.add_edge(row['User'], mention, color='g')
             i += 1
         print(i, " nodes")
         # section ends here
@@ -60,6 +76,16 @@ class Networks:
                 self.G.remove_node(node)
         print("removed empty edges")
 
+    # Saving the network to an image and showing it in jupyter notebook
+    @profiled
+    def displayNetwork(self, size):
+
+        print("starting draw")
+        plt.figure(1, dpi=50, figsize=(200, 200))
+        plt.title("Network of User Interactions")
+
+        self.build_graph(size)
+
         edges = self.G.edges()
         colors = [self.G[u][v]['color'] for u, v in edges]
         nx.draw(self.G, node_size=120, edge_color=colors, font_size=12, with_labels=True, )
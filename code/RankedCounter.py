@@ -0,0 +1,81 @@
+import heapq
+from operator import itemgetter
+
+"""
+This class is used to store counts (or any other values) against keys, as a Dictionary that can also return its
+highest n values quickly.
+
+The top n pairs are selected with a heap, taking O(len log n) time rather than sorting every pair, and the ranked pairs
+are stored so that asking for the same or fewer pairs again (as the interactive visuals do on each change of their
+slider) doesn't rank them again. The stored ranking is cleared whenever the counter is changed.
+
+Pairs with equal values are ranked in the order they were added, the same as a stable sort of the Dictionary would.
+"""
+
+
+class RankedCounter(dict):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Stores the highest pairs found so far, in descending order of value, and whether they are every pair
+        self.ranked = []
+        self.fully_ranked = False
+
+    # Returns the pairs with the n highest values as a list of tuples in descending order of value.
+    # If n is greater than the number of pairs, every pair is returned.
+    def top(self, n):
+        n = max(n, 0)
+
+        if n > len(self.ranked) and not self.fully_ranked:
+            # Ranking at least twice as many pairs as before, so that a growing n doesn't rank the pairs every time
+            count = max(n, 2 * len(self.ranked))
+
+            if count >= len(self):
+                self.ranked = sorted(self.items(), key=itemgetter(1), reverse=True)
+                self.fully_ranked = True
+            else:
+                self.ranked = heapq.nlargest(count, self.items(), key=itemgetter(1))
+
+        return self.ranked[:n]
+
+    # Clears the stored ranking, as the counter has changed
+    def changed(self):
+        self.ranked = []
+        self.fully_ranked = False
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.changed()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self.changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self.changed()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self.changed()
+
+    # Stores only the pairs when pickled, as the ranking is found again when needed
+    def __reduce__(self):
+        return type(self), (dict(self),)
@@ -0,0 +1,290 @@
+import os
+
+import pandas as pd
+
+# Stores the file extension used for each format refined data can be saved in.
+REFINED_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+# Stores the suffix added to a file's name (without its extension) for a post-refinement file.
+REFINED_NAME_SUFFIX = "_REFINED"
+
+# Stores the columns that are given a specific type when refined data is saved in a columnar format.
+# Any other column is stored as a String, with the "n/a" placeholder (and empty values) stored as missing values.
+DATETIME_COLUMNS = ["Creation Time"]
+INTEGER_COLUMNS = ["Follower Count", "Friend Count"]
+BOOLEAN_COLUMNS = ["Is RT", "Is Reply"]
+
+# Stores the placeholder used for missing values in refined CSV files, which is loaded as a missing value.
+PLACEHOLDER = "n/a"
+
+# Stores the type used for String columns in memory. Arrow-backed Strings are used when pyarrow is installed as they are
+# much more compact than Python String objects, otherwise pandas' own String type is used.
+try:
+    import pyarrow
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = pd.StringDtype("python")
+
+# Stores the type of each refined column in memory, which every analysis class loads its data with:
+# Columns with few distinct values (usernames, apps and languages) are stored as categories, IDs and free text as
+# Strings (IDs are kept as Strings to prevent loss of data), the counts as nullable integers, the flags as booleans and
+# the Creation Time as a datetime.
+REFINED_SCHEMA = {"ID": TEXT_DTYPE, "User": "category", "Text": TEXT_DTYPE, "Creation Time w/ Timezone": TEXT_DTYPE,
+                  "Creation Time": "datetime64[ns]", "Coordinates": TEXT_DTYPE, "User Language": "category",
+                  "Reply User ID": TEXT_DTYPE, "Reply Username": "category", "User ID": TEXT_DTYPE,
+                  "Reply Status ID": TEXT_DTYPE, "Source": "category", "Profile Image": TEXT_DTYPE,
+                  "Follower Count": "Int64", "Friend Count": "Int64", "Status": TEXT_DTYPE, "Entities": TEXT_DTYPE,
+                  "Is RT": bool, "Is Reply": bool, "Hashtags": TEXT_DTYPE, "Mentions": TEXT_DTYPE, "RT To": TEXT_DTYPE}
+
+# Stores the types refined CSV files are read with. The String, category, integer and boolean columns are parsed straight
+# into their types. The datetimes are read as Strings and converted afterwards, so that invalid values become missing
+# rather than raising an error.
+CSV_DTYPES = {column: TEXT_DTYPE if column in DATETIME_COLUMNS else dtype for column, dtype in REFINED_SCHEMA.items()}
+
+"""
+This file contains the methods used to save refined data and to load it back in for analysis.
+
+Refined data can be saved as a CSV file, as it always has been, or in a columnar format (Parquet or Feather) where each
+column keeps its type. Columnar files let each analysis class load only the columns it uses, without parsing the rest of
+the file as text. The columnar formats need pyarrow to be installed.
+
+Whatever the format, data is loaded with the types in REFINED_SCHEMA so that it takes up far less memory than storing
+every value as a Python object, and so that grouping by the category columns is faster.
+"""
+
+
+# Returns the path a file's refined data is saved at in the given format
+def refined_file_path(file_path, file_format="csv"):
+    return os.path.splitext(file_path)[0] + REFINED_NAME_SUFFIX + REFINED_FORMATS[file_format]
+
+
+# Returns the format of a refined file from its extension, treating any unknown extension as a CSV file
+def file_format_of(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+
+    for file_format, format_extension in REFINED_FORMATS.items():
+        if extension == format_extension:
+            return file_format
+
+    return "csv"
+
+
+# Converts a refined data frame (either as refined, or as read back in from a CSV file) to the types stored in the
+# columnar formats. The data frame passed in is not changed.
+def to_typed_frame(df):
+    typed = pd.DataFrame(index=df.index)
+
+    for column in df.columns:
+        values = df[column]
+
+        if column in DATETIME_COLUMNS:
+            typed[column] = pd.to_datetime(values, errors='coerce')
+        elif column in INTEGER_COLUMNS:
+            typed[column] = pd.to_numeric(values, errors='coerce').round().astype("Int64")
+        elif column in BOOLEAN_COLUMNS:
+            typed[column] = values.map({True: True, False: False, "True": True, "False": False}).fillna(False) \
+                .astype(bool)
+        else:
+            values = values.astype(object)
+            typed[column] = values.where(values.notna() & (values != PLACEHOLDER) & (values != ""), None)
+
+    return typed
+
+
+# Returns the Arrow schema of a typed refined data frame, so every chunk of a file is written with the same types even
+# when a column happens to be empty within one chunk.
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for column in columns:
+        if column in DATETIME_COLUMNS:
+            fields.append(pa.field(column, pa.timestamp("ns")))
+        elif column in INTEGER_COLUMNS:
+            fields.append(pa.field(column, pa.int64()))
+        elif column in BOOLEAN_COLUMNS:
+            fields.append(pa.field(column, pa.bool_()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+
+    return pa.schema(fields)
+
+
+# Loads a refined file in any of the formats, reading only the given columns (or all of them if columns is None), with
+# each column given its type from REFINED_SCHEMA. The "n/a" placeholder and empty values are loaded as missing values,
+# unless keep_placeholders is set, in which case missing values in the String and category columns are replaced by
+# the placeholder.
+# filters are passed on to Parquet files so that only the matching rows are read, for other formats they are ignored.
+def read_refined(file_path, columns=None, keep_placeholders=False, filters=None):
+    file_format = file_format_of(file_path)
+
+    if file_format == "csv":
+        df = pd.read_csv(file_path, usecols=columns, dtype=CSV_DTYPES)
+    elif file_format == "parquet":
+        df = pd.read_parquet(file_path, columns=columns, filters=filters)
+    else:
+        df = pd.read_feather(file_path, columns=columns)
+
+    df = apply_schema(df)
+
+    if keep_placeholders:
+        df = fill_placeholders(df)
+
+    return df
+
+
+# Loads a refined file in any of the formats as read_refined, yielding data frames of up to chunk_size records in turn
+# so that the whole file is never held in memory. The index of each data frame carries on from the one before it, so
+# it is the position of each record in the file.
+def read_refined_chunks(file_path, chunk_size, columns=None):
+    file_format = file_format_of(file_path)
+
+    if file_format == "csv":
+        chunks = pd.read_csv(file_path, usecols=columns, dtype=CSV_DTYPES, chunksize=chunk_size)
+    else:
+        chunks = read_columnar_chunks(file_path, file_format, chunk_size, columns)
+
+    for df in chunks:
+        yield apply_schema(df)
+
+
+# Reads a Parquet or Feather file a batch of records at a time, yielding data frames of up to chunk_size records. If a
+# start or end position is given, only the records from start up to end are read, with the index of each data frame
+# still being the position of each record in the file.
+def read_columnar_chunks(file_path, file_format, chunk_size, columns=None, start=0, end=None):
+    import pyarrow as pa
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path)
+
+        # Only the row groups holding records in the range are read
+        row_groups, position, first_row = [], 0, None
+        for row_group in range(parquet_file.num_row_groups):
+            rows = parquet_file.metadata.row_group(row_group).num_rows
+            if position + rows > start and (end is None or position < end):
+                row_groups.append(row_group)
+                first_row = position if first_row is None else first_row
+            position += rows
+
+        batches = parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns) \
+            if row_groups else iter([])
+        position = first_row or 0
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(file_path))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        position = 0
+
+    for batch in batches:
+        batch_start = position
+        position += batch.num_rows
+        if end is not None and batch_start >= end:
+            break
+
+        if columns is not None:
+            batch = batch.select(columns)
+
+        # Batches written in one go can be larger than a chunk, so they are split up, leaving out records outside the
+        # range
+        low = max(start - batch_start, 0)
+        high = batch.num_rows if end is None else min(end - batch_start, batch.num_rows)
+        for offset in range(low, high, chunk_size):
+            df = batch.slice(offset, min(chunk_size, high - offset)).to_pandas()
+            df.index = pd.RangeIndex(batch_start + offset, batch_start + offset + len(df))
+            yield df
+
+
+# Returns the number of records in a Parquet or Feather file, found from its metadata without reading the records
+def count_columnar_records(file_path, file_format):
+    import pyarrow.dataset as ds
+
+    return ds.dataset(file_path, format="parquet" if file_format == "parquet" else "ipc").count_rows()
+
+
+# Converts each column of a data frame to its type from REFINED_SCHEMA. Columns that are already the right type are left
+# as they are, and columns that aren't in the schema are treated as Strings.
+def apply_schema(df):
+    for column in df.columns:
+        dtype = REFINED_SCHEMA.get(column, TEXT_DTYPE)
+
+        if column in DATETIME_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column].astype(object), errors='coerce')
+        elif df[column].dtype != dtype:
+            values = df[column]
+            if dtype is TEXT_DTYPE or dtype == "category":
+                # Placeholders are treated as missing values in every format
+                values = values.astype(object)
+                values = values.where(values.notna() & (values != PLACEHOLDER) & (values != ""), None)
+            df[column] = values.astype(dtype)
+
+    return df
+
+
+# Replaces the missing values in the String and category columns of a data frame with the "n/a" placeholder.
+def fill_placeholders(df):
+    for column in df.columns:
+        if pd.api.types.is_categorical_dtype(df[column]):
+            if PLACEHOLDER not in df[column].cat.categories:
+                df[column] = df[column].cat.add_categories(PLACEHOLDER)
+            df[column] = df[column].fillna(PLACEHOLDER)
+        elif pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].fillna(PLACEHOLDER)
+
+    return df
+
+
+"""
+This class is used to write refined data to a file in any of the formats, a data frame at a time, so that a file refined
+in chunks can be written without holding all of it in memory.
+"""
+
+
+class RefinedWriter:
+
+    # If append is set, data frames are added to the end of an existing CSV file (the columnar formats can't be appended
+    # to once they have been closed).
+    def __init__(self, file_path, file_format="csv", append=False):
+        if append and file_format != "csv":
+            raise ValueError("Only CSV files can be appended to")
+
+        self.file_path = file_path
+        self.file_format = file_format
+
+        # Stores the Arrow writer and schema for the columnar formats, created when the first data frame is written
+        self.writer = None
+        self.schema = None
+        self.rows_written = 0
+        self.started = append
+
+    # Appends a refined data frame to the file. The first data frame written sets the columns of the file.
+    def write(self, df):
+        if self.file_format == "csv":
+            df.to_csv(self.file_path, mode="a" if self.started else "w", header=not self.started, index=False)
+        else:
+            import pyarrow as pa
+
+            if self.writer is None:
+                self.schema = arrow_schema(df.columns)
+                if self.file_format == "parquet":
+                    import pyarrow.parquet as pq
+                    self.writer = pq.ParquetWriter(self.file_path, self.schema)
+                else:
+                    self.writer = pa.ipc.new_file(self.file_path, self.schema)
+
+            self.writer.write_table(pa.Table.from_pandas(to_typed_frame(df), schema=self.schema, preserve_index=False))
+
+        self.rows_written += len(df)
+        self.started = True
+
+    # Finishes writing the file
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
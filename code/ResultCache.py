@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+import zlib
+
+from StageCache import file_fingerprint
+
+# Stores the name of the directory, next to the input file, that results are cached in if no directory is given.
+CACHE_DIRECTORY_NAME = ".analysis_cache"
+
+# Stores the extension of each cached result file.
+RESULT_EXTENSION = ".results"
+
+# Stores the default most bytes the results in a cache directory can take up before the least recently used are removed
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+"""
+This class is used to store the results of analysing a file on disk, so that later runs (and notebook sessions) can load
+them rather than analysing the file again.
+
+Each result is stored under a key made from a signature of the input files, the version of the analysis code and the
+settings of the analysis, so a stored result is only used while none of these have changed. A file's signature is its
+size and modification time, or a hash of its contents if content hashes are requested.
+
+Results are pickled and compressed. As a cache directory may be shared, each result is written to a temporary file first
+and then moved into place, and once the results in the directory take up more than max_bytes the least recently used
+are removed.
+"""
+
+
+class ResultCache:
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, content_hashes=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.content_hashes = content_hashes
+
+    # Returns the key of the results of analysing the given files with the given code version and settings
+    def key(self, file_paths, version, settings=""):
+        digest = hashlib.sha1((version + settings).encode("utf-8"))
+
+        for file_path in file_paths:
+            digest.update(self.file_signature(file_path).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    # Returns a signature of a file which changes whenever the file is changed
+    def file_signature(self, file_path):
+        if self.content_hashes:
+            return file_fingerprint(file_path)
+
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path) + ":" + str(stat.st_size) + ":" + str(stat.st_mtime_ns)
+
+    # Returns the path the results with the given key are stored at
+    def path(self, key):
+        return os.path.join(self.directory, key + RESULT_EXTENSION)
+
+    # Loads the results stored with the given key, returning None if there aren't any. Loading results marks them as
+    # recently used.
+    def load(self, key):
+        path = self.path(key)
+
+        try:
+            with open(path, "rb") as file:
+                results = pickle.loads(zlib.decompress(file.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (zlib.error, pickle.UnpicklingError, EOFError):
+            # A result that can't be read is removed so that it is stored again
+            self.remove(path)
+            return None
+
+        return results
+
+    # Stores results with the given key, then removes the least recently used results if the cache is too large
+    def save(self, key, results):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temporary_path = path + "." + str(os.getpid()) + ".tmp"
+
+        with open(temporary_path, "wb") as file:
+            file.write(zlib.compress(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(temporary_path, path)
+
+        self.evict()
+
+    # Removes the least recently used results until the cache takes up at most max_bytes
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(RESULT_EXTENSION):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(self.directory, name)))
+                except FileNotFoundError:
+                    pass
+
+        total = sum(size for modified, size, path in entries)
+        for modified, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            self.remove(path)
+            total -= size
+
+    # Removes a stored result, ignoring it if another process has already removed it
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
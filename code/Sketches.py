@@ -0,0 +1,123 @@
+import heapq
+import math
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# Stores the range of precisions (the number of bits of each hash used to pick a register) a HyperLogLog can use.
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+"""
+This file contains the sketches used to analyse a data set approximately, in an amount of memory that depends on the
+requested error rather than on the number of distinct values in the data.
+
+Every sketch can be merged with another sketch of the same size, so sketches of consecutive parts of a data set (such as
+chunks or partitions of a file) can be combined into a sketch of the whole.
+"""
+
+
+"""
+This class is a HyperLogLog sketch, used to estimate the number of distinct values in a data set.
+
+Each value is hashed, with the first bits of the hash picking one of the registers and the register storing the largest
+number of leading zeros seen in the rest of the hashes picked for it. The relative standard error of the estimate is
+about 1.04 / sqrt(number of registers).
+"""
+
+
+class HyperLogLog:
+
+    # The number of registers is chosen to give at most the requested relative standard error
+    def __init__(self, error=0.01):
+        self.precision = min(max(math.ceil(math.log2((1.04 / error) ** 2)), MIN_PRECISION), MAX_PRECISION)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    # Adds a column of values to the sketch. Missing values aren't counted. Each distinct value is only hashed once.
+    def update(self, values):
+        values = pd.unique(pd.Series(np.asarray(values, dtype=object)).dropna().to_numpy(dtype=object))
+        if len(values) == 0:
+            return
+
+        # The same hash key is used in every process, so sketches from worker processes can be merged
+        hashes = pd.util.hash_array(values.astype(str))
+        registers = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+
+        # The rest of each hash is shifted to the top, with a 1 bit after it so the number of leading zeros is bounded.
+        # The position of the first 1 bit is found from the exponent of the value as a float.
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        ranks = 65 - np.frexp(rest.astype(np.float64))[1]
+
+        np.maximum.at(self.registers, registers, ranks.astype(np.uint8))
+
+    # Adds the values of another sketch of the same precision to this sketch
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    # Returns the estimated number of distinct values added. Linear counting is used while many registers are empty,
+    # as it is more accurate for small numbers of values.
+    def count(self):
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / np.sum(np.exp2(-self.registers.astype(np.float64)))
+
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and empty > 0:
+            estimate = size * math.log(size / empty)
+
+        return int(round(estimate))
+
+
+"""
+This class is a Space-Saving summary, used to find the most frequent values of a data set and their counts.
+
+Only the counts of the capacity most frequent values found so far are stored. Any value that isn't stored has occurred at
+most floor times, and each stored count is at most error[value] above the true count. Every value occurring more than
+(number of values counted / capacity) times is always stored.
+"""
+
+
+class SpaceSaving:
+
+    # If a Dictionary of exact counts is given, the summary starts with the capacity most frequent values from it
+    def __init__(self, capacity, counts=None):
+        self.capacity = capacity
+
+        # Stores the estimated count of each stored value, the most each is over its true count, and the most any value
+        # that isn't stored can have occurred
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+        if counts:
+            kept = heapq.nlargest(capacity + 1, counts.items(), key=itemgetter(1))
+            self.counts = dict(kept[:capacity])
+            self.errors = dict.fromkeys(self.counts, 0)
+            self.floor = kept[capacity][1] if len(kept) > capacity else 0
+
+    # Combines another summary of the same capacity with this summary. A value that isn't stored in one of them is given
+    # that summary's floor, the most it can have occurred there, and the capacity most frequent values are kept.
+    def merge(self, other):
+        counts, errors = {}, {}
+        for value in list(self.counts) + [value for value in other.counts if value not in self.counts]:
+            counts[value] = self.counts.get(value, self.floor) + other.counts.get(value, other.floor)
+            errors[value] = self.errors.get(value, self.floor) + other.errors.get(value, other.floor)
+
+        kept = heapq.nlargest(self.capacity + 1, counts.items(), key=itemgetter(1))
+        floor = self.floor + other.floor
+        if len(kept) > self.capacity:
+            floor = max(floor, kept[self.capacity][1])
+
+        self.counts = dict(kept[:self.capacity])
+        self.errors = {value: errors[value] for value in self.counts}
+        self.floor = floor
+
+        return self
+
+    # Returns the lowest and highest the true count of a value can be
+    def bounds(self, value):
+        if value in self.counts:
+            return self.counts[value] - self.errors[value], self.counts[value]
+
+        return 0, self.floor
@@ -0,0 +1,95 @@
+import hashlib
+import inspect
+import os
+import pickle
+
+from Instrumentation import profiled
+
+# Stores the name of the directory, next to the input file, that the cached stage outputs are stored in.
+CACHE_DIRECTORY_NAME = ".refine_cache"
+
+# Stores the number of bytes read at a time while fingerprinting a file.
+BLOCK_SIZE = 1 << 20
+
+"""
+This file contains the methods used to fingerprint the input and code of each refinement stage.
+
+A stage's key is a hash of the previous stage's key, the source code of the stage (and of the methods it uses) and any
+settings it is run with. The first stage's key starts from a hash of the input file's contents, so a key only matches
+when the input file and the code of every stage up to and including that one are unchanged.
+"""
+
+
+# Returns a hash of the contents of a file
+def file_fingerprint(file_path):
+    digest = hashlib.sha1()
+
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+# Returns a hash of the source code of the given methods, classes and modules, or the value of any constants given
+def code_version(code_objects):
+    digest = hashlib.sha1()
+
+    for code_object in code_objects:
+        if inspect.isroutine(code_object) or inspect.isclass(code_object) or inspect.ismodule(code_object):
+            digest.update(inspect.getsource(code_object).encode("utf-8"))
+        else:
+            digest.update(repr(code_object).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+# Returns the key of a stage from the key of the stage before it, the stage's code version and its settings
+def stage_key(previous_key, version, settings=""):
+    return hashlib.sha1((previous_key + version + settings).encode("utf-8")).hexdigest()
+
+
+"""
+This class is used to store the output of each refinement stage of an input file on disk, so that stages whose input
+and code are unchanged can be skipped when the file is refined again.
+
+Only the latest output of each stage is kept for each input file.
+"""
+
+
+class StageCache:
+
+    # The cache is stored in the given directory, or in a directory next to the input file if none is given
+    def __init__(self, file_path, directory=None):
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRECTORY_NAME)
+        self.file_name = os.path.basename(file_path)
+
+    # Returns the path a stage's output with the given key is stored at
+    def path(self, stage, key):
+        return os.path.join(self.directory, self.file_name + "." + stage + "." + key + ".pkl")
+
+    # Checks if a stage's output with the given key is stored
+    def contains(self, stage, key):
+        return os.path.exists(self.path(stage, key))
+
+    # Loads a stored stage output
+    @profiled
+    def load(self, stage, key):
+        with open(self.path(stage, key), "rb") as file:
+            return pickle.load(file)
+
+    # Stores a stage's output, removing any older output of the same stage for the input file
+    @profiled
+    def save(self, stage, key, output):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(stage, key)
+
+        # Writing to a temporary file first so an interrupted run never leaves a partly written output behind
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(output, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+        prefix = self.file_name + "." + stage + "."
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".pkl") and os.path.join(self.directory, name) != path:
+                os.remove(os.path.join(self.directory, name))
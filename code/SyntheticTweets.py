@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+from UnrefinedDataFrame import DEFAULT_COLUMN_HEADERS
+
+# Stores the number of rows generated at a time. Each chunk is generated from its own random generator, seeded from the
+# seed and the chunk's position, so large files are generated without holding every row in memory.
+CHUNK_SIZE = 100000
+
+# Stores the ID of the first tweet and the largest gap between the IDs of consecutive tweets
+FIRST_ID = 532000000000000000
+MAX_ID_GAP = 2000
+
+# Stores the range of times the tweets are created in
+START_TIME = pd.Timestamp("2014-11-01")
+END_TIME = pd.Timestamp("2015-02-01")
+
+# Stores the number of users tweeting and the Zipf exponent of how often each tweets, so a few users tweet a lot
+USER_COUNT = 2000000
+USER_EXPONENT = 1.1
+
+# Stores the popular hashtags, the number of other hashtags and the Zipf exponent of how often each is used
+HASHTAGS = ["CometLanding", "Rosetta", "Philae", "67P", "ESA", "CometWatch", "WishesForPhilae", "Comet", "Space",
+            "Science"]
+OTHER_HASHTAG_COUNT = 100000
+HASHTAG_EXPONENT = 1.8
+
+# Stores each language with the share of tweets in it
+LANGUAGES = {"en": 0.6, "es": 0.1, "fr": 0.08, "de": 0.07, "it": 0.05, "ja": 0.05, "pt": 0.05}
+
+# Stores each app's name and link with the share of tweets sent from it
+APPS = {("Twitter Web Client", "http://twitter.com"): 0.3,
+        ("Twitter for iPhone", "http://twitter.com/download/iphone"): 0.25,
+        ("Twitter for Android", "http://twitter.com/download/android"): 0.2,
+        ("TweetDeck", "https://about.twitter.com/products/tweetdeck"): 0.1,
+        ("Hootsuite", "http://www.hootsuite.com"): 0.05,
+        ("Twitter for iPad", "http://twitter.com/#!/download/ipad"): 0.05,
+        ("IFTTT", "https://ifttt.com"): 0.05}
+
+# Stores the share of tweets that are retweets, replies, have coordinates, contain a line break or a url, repeat the
+# row before them (to be removed as duplicates) and have a Creation Time that can't be parsed
+RETWEET_RATE = 0.45
+REPLY_RATE = 0.15
+COORDINATE_RATE = 0.05
+LINE_BREAK_RATE = 0.05
+URL_RATE = 0.3
+DUPLICATE_RATE = 0.01
+INVALID_TIME_RATE = 0.001
+
+# Stores the chance of replying to each earlier tweet in the chunk, as a geometric distribution of how far back it is,
+# so most replies are to recent tweets and replies to replies form chains
+REPLY_DISTANCE = 0.01
+
+# Stores the words the text of the tweets is made from
+WORDS = ["the", "lander", "comet", "has", "landed", "on", "surface", "amazing", "news", "from", "mission", "team",
+         "congratulations", "to", "first", "images", "of", "historic", "day", "for", "science", "space", "watch", "live"]
+
+"""
+This file contains the generator of synthetic tweet data sets, used to benchmark refinement and analysis at scale.
+
+The tweets are written to a raw CSV file with the DEFAULT_COLUMN_HEADERS, as collected tweets are before refinement,
+with the Entities stored as JSON and the Source as an HTML anchor. A few users send many of the tweets and a few
+hashtags are used most, as in collected data sets. Retweets name the user retweeted at the start of their text, replies reply to
+earlier tweets in the data set (including other replies, forming chains), and some tweets have coordinates. A few rows
+repeat the row before them, and a few have a Creation Time that can't be parsed, so refinement has some work to do.
+
+The same number of rows and seed always give the same file.
+"""
+
+
+# Writes a synthetic raw data set of the given number of rows to a CSV file
+def write_synthetic_tweets(file_path, rows, seed=0):
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        for index, start in enumerate(range(0, rows, CHUNK_SIZE)):
+            generate_chunk(start, min(CHUNK_SIZE, rows - start), seed, index).to_csv(file, header=index == 0,
+                                                                                     index=False)
+
+        if rows == 0:
+            pd.DataFrame(columns=DEFAULT_COLUMN_HEADERS).to_csv(file, index=False)
+
+
+# Generates a chunk of rows starting at the given row of the data set, returning a data frame of raw String values
+def generate_chunk(start, rows, seed, index):
+    rng = np.random.default_rng([seed, index])
+
+    ids = FIRST_ID + (start + np.arange(rows)) * MAX_ID_GAP + rng.integers(0, MAX_ID_GAP, rows)
+    users = zipf_choice(rng, USER_COUNT, USER_EXPONENT, rows)
+    times = START_TIME + pd.to_timedelta(rng.random(rows) * (END_TIME - START_TIME).total_seconds(), unit="s")
+
+    # Some rows repeat the row before them, as rows collected twice do. Each is a copy of the last row before it that
+    # isn't a repeat.
+    is_duplicate = rng.random(rows) < DUPLICATE_RATE
+    is_duplicate[:1] = False
+    original_rows = np.maximum.accumulate(np.where(is_duplicate, 0, np.arange(rows)))
+
+    is_retweet = rng.random(rows) < RETWEET_RATE
+    retweeted = zipf_choice(rng, USER_COUNT, USER_EXPONENT, rows)
+
+    # Each reply is to an earlier tweet in the chunk that isn't a repeat, so its ID and user are known
+    replied_rows = np.arange(rows) - rng.geometric(REPLY_DISTANCE, rows)
+    is_reply = ~is_retweet & (rng.random(rows) < REPLY_RATE) & (replied_rows >= 0)
+    replied_rows = original_rows[np.where(is_reply, replied_rows, 0)]
+
+    hashtag_counts = rng.choice(4, rows, p=[0.35, 0.35, 0.2, 0.1])
+    hashtags = zipf_choice(rng, len(HASHTAGS) + OTHER_HASHTAG_COUNT, HASHTAG_EXPONENT, int(hashtag_counts.sum()))
+    mention_counts = rng.choice(3, rows, p=[0.6, 0.3, 0.1])
+    mentions = zipf_choice(rng, USER_COUNT, USER_EXPONENT, int(mention_counts.sum()))
+    words = rng.integers(0, len(WORDS), (rows, 8))
+    word_counts = rng.integers(3, 9, rows)
+    has_line_break = rng.random(rows) < LINE_BREAK_RATE
+    has_url = rng.random(rows) < URL_RATE
+
+    texts, entities = [], []
+    hashtag_start = mention_start = 0
+    for row in range(rows):
+        text, entity = tweet_text(users[replied_rows[row]] if is_reply[row] else None,
+                                  retweeted[row] if is_retweet[row] else None,
+                                  hashtags[hashtag_start:hashtag_start + hashtag_counts[row]],
+                                  mentions[mention_start:mention_start + mention_counts[row]],
+                                  words[row, :word_counts[row]], has_line_break[row], ids[row] if has_url[row] else None)
+        hashtag_start += hashtag_counts[row]
+        mention_start += mention_counts[row]
+        texts.append(text)
+        entities.append(entity)
+
+    creation_times = times.strftime("%d/%m/%Y %H:%M:%S").to_numpy(dtype=object)
+    creation_times[rng.random(rows) < INVALID_TIME_RATE] = "not a time"
+
+    has_coordinates = rng.random(rows) < COORDINATE_RATE
+    latitudes, longitudes = rng.uniform(-60, 70, rows), rng.uniform(-180, 180, rows)
+    coordinates = np.where(has_coordinates, ["loc: %.6f,%.6f" % pair for pair in zip(latitudes, longitudes)], "")
+
+    app_names = list(APPS)
+    apps = rng.choice(len(app_names), rows, p=list(APPS.values()))
+    languages = rng.choice(list(LANGUAGES), rows, p=list(LANGUAGES.values()))
+
+    id_strings = ids.astype(str)
+    user_names = user_name(users)
+    df = pd.DataFrame({
+        "ID": id_strings,
+        "User": user_names,
+        "Text": texts,
+        "Creation Time w/ Timezone": times.strftime("%a %b %d %H:%M:%S +0000 %Y"),
+        "Creation Time": creation_times,
+        "Coordinates": coordinates,
+        "User Language": languages,
+        "Reply User ID": np.where(is_reply, user_id(users[replied_rows]), ""),
+        "Reply Username": np.where(is_reply, user_names[replied_rows], ""),
+        "User ID": user_id(users),
+        "Reply Status ID": np.where(is_reply, id_strings[replied_rows], ""),
+        "Source": ['<a href="%s" rel="nofollow">%s</a>' % (app_names[app][1], app_names[app][0]) for app in apps],
+        "Profile Image": ["http://pbs.twimg.com/profile_images/%d/photo_normal.jpg" % user for user in users],
+        "Follower Count": (users * 2654435761 % 100000).astype(str),
+        "Friend Count": (users * 40503 % 5000).astype(str),
+        "Status": ["http://twitter.com/%s/statuses/%s" % pair for pair in zip(user_names, id_strings)],
+        "Entities": entities,
+    }, columns=DEFAULT_COLUMN_HEADERS)
+
+    duplicates = np.flatnonzero(is_duplicate)
+    df.iloc[duplicates] = df.iloc[original_rows[duplicates]].to_numpy()
+
+    return df
+
+
+# Returns the text of a tweet and its Entities as JSON, with the position of each hashtag, mention and url in the text
+def tweet_text(replied_user, retweeted_user, hashtags, mentions, words, line_break, url_id):
+    parts = []
+    mention_entities, hashtag_entities, url_entities = [], [], []
+
+    def add(text):
+        position = sum(len(part) for part in parts)
+        parts.append(text)
+        return position, position + len(text)
+
+    def add_mention(user):
+        start, end = add("@" + user_name(user))
+        mention_entities.append('{"screen_name":"%s","name":"%s","id":%d,"id_str":"%d","indices":[%d,%d]}'
+                                % (user_name(user), user_name(user).upper(), user_id(user), user_id(user), start, end))
+
+    if retweeted_user is not None:
+        add("RT ")
+        add_mention(retweeted_user)
+        add(": ")
+    if replied_user is not None:
+        add_mention(replied_user)
+        add(" ")
+
+    add(" ".join(WORDS[word] for word in words))
+    if line_break:
+        add("\n")
+    for user in mentions:
+        add(" ")
+        add_mention(user)
+    for hashtag in hashtags:
+        add(" ")
+        start, end = add("#" + hashtag_name(hashtag))
+        hashtag_entities.append('{"text":"%s","indices":[%d,%d]}' % (hashtag_name(hashtag), start, end))
+    if url_id is not None:
+        add(" ")
+        start, end = add("http://t.co/%x" % url_id)
+        url_entities.append('{"url":"http://t.co/%x","expanded_url":"http://example.com/%d","display_url":'
+                            '"example.com/%d","indices":[%d,%d]}' % (url_id, url_id, url_id, start, end))
+
+    entities = '{"hashtags":[%s],"symbols":[],"user_mentions":[%s],"urls":[%s]}' \
+               % (",".join(hashtag_entities), ",".join(mention_entities), ",".join(url_entities))
+
+    return "".join(parts), entities
+
+
+# Draws values from 0 to count - 1, with the chance of each falling with its rank as a Zipf distribution
+def zipf_choice(rng, count, exponent, size):
+    values = rng.zipf(exponent, size) - 1
+    return np.where(values < count, values, rng.integers(0, count, size))
+
+
+# Returns the screen name of a user (or an array of them)
+def user_name(user):
+    if isinstance(user, np.ndarray):
+        return np.char.add("user", user.astype(str)).astype(object)
+
+    return "user%d" % user
+
+
+# Returns the ID of a user (or an array of them as Strings)
+def user_id(user):
+    if isinstance(user, np.ndarray):
+        return (user + 1000).astype(str)
+
+    return int(user) + 1000
+
+
+# Returns the text of a hashtag
+def hashtag_name(hashtag):
+    if hashtag < len(HASHTAGS):
+        return HASHTAGS[hashtag]
+
+    return "tag%d" % (hashtag - len(HASHTAGS))
@@ -1,5 +1,29 @@
+import os
+import tempfile
 import unittest
 from UnrefinedDataFrame import *
+from ExtractionEngine import *
+from EntityTables import parse_entities
+from CsvShards import count_rows, find_row_boundaries, header_end, last_row_boundary, open_byte_range
+from RefinedData import RefinedWriter, apply_schema, read_refined, refined_file_path, to_typed_frame
+from StageCache import StageCache
+from AggregationEngine import ReplyIndex, TimeIndex, aggregate, count_hashtags_replied_to, join_keyed, keyed_ratio, \
+    merge_counts
+from AnalysedDataSet import AnalysedDataSet, ApproximateDataSet, CombinedDataSet, StreamedDataSet, analyse_cached
+from ResultCache import ResultCache
+from Sketches import HyperLogLog, SpaceSaving
+from RankedCounter import RankedCounter
+from InvertedIndex import InvertedIndex, intersect, union
+from Instrumentation import PROFILER, profiled
+from SyntheticTweets import write_synthetic_tweets
+from Benchmarks import commit_results, compare_results, run_benchmark
+
+# Checks whether pyarrow is installed, as it is needed for the columnar formats
+try:
+    import pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
 
 # Stores the file path and start of file name for each CSV file
@@ -66,6 +90,106 @@ class RefinementTest(unittest.TestCase):
 
         pd.testing.assert_frame_equal(df1, df2)
 
+    # Testing that refining in chunks gives the same result as refining the whole file at once
+    def test_chunked_refinement(self):
+        # A small chunk size is used so duplicates have to be removed across chunks
+        refine_in_chunks(BASE_TEST_DATA_FILE_PATH + "_Unrefined.csv", chunk_size=2)
+
+        df1 = pd.read_csv(BASE_TEST_DATA_FILE_PATH + "_Unrefined_REFINED.csv", dtype=object)
+        df2 = pd.read_csv(BASE_TEST_DATA_FILE_PATH + "_Refined.csv", dtype=object)
+
+        pd.testing.assert_frame_equal(df1, df2)
+
+    # Testing that refining in shards with several processes gives the same result as refining the whole file at once
+    def test_sharded_refinement(self):
+        refine_in_shards(BASE_TEST_DATA_FILE_PATH + "_Unrefined.csv", workers=3)
+
+        df1 = pd.read_csv(BASE_TEST_DATA_FILE_PATH + "_Unrefined_REFINED.csv", dtype=object)
+        df2 = pd.read_csv(BASE_TEST_DATA_FILE_PATH + "_Refined.csv", dtype=object)
+
+        pd.testing.assert_frame_equal(df1, df2)
+
+    # Testing that refining a file incrementally as rows are appended gives the same result as refining it all at once
+    def test_incremental_refinement(self):
+        with open(BASE_TEST_DATA_FILE_PATH + "_Unrefined.csv", "rb") as file:
+            data = file.read()
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "Incremental.csv")
+
+            # The file is written in two halves, with the first run ending part way through a row
+            with open(file_path, "wb") as file:
+                file.write(data[:len(data) // 2])
+            refine_incrementally(file_path)
+
+            with open(file_path, "ab") as file:
+                file.write(data[len(data) // 2:])
+            refine_incrementally(file_path)
+
+            df1 = pd.read_csv(os.path.join(directory, "Incremental_REFINED.csv"), dtype=object)
+            df2 = pd.read_csv(BASE_TEST_DATA_FILE_PATH + "_Refined.csv", dtype=object)
+
+            pd.testing.assert_frame_equal(df1, df2)
+
+    # Testing that a cached refinement gives the same result as an uncached one, and that a re-run loads each stage
+    def test_cached_refinement(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for run in range(2):
+                frame = load_test_data()
+                frame.refine(StageCache(frame.file_path, directory))
+
+                self.assertEqual(all(report["cached"] for report in frame.stage_reports), run == 1)
+
+            uncached_frame = load_test_data()
+            uncached_frame.refine()
+
+            pd.testing.assert_frame_equal(frame.df, uncached_frame.df)
+
+    # Testing the id_keys helper method converts valid IDs to integers and marks invalid ones
+    def test_id_keys(self):
+        keys, valid = id_keys(pd.Series(["540925056533413888", "n/a", "12"], dtype=object))
+
+        self.assertEqual(keys.tolist(), [540925056533413888, 12])
+        self.assertEqual(valid.tolist(), [True, False, True])
+
+    # Testing the SeenKeys helper class used to remove duplicates across chunks
+    def test_seen_keys(self):
+        seen_keys = SeenKeys()
+
+        self.assertEqual(list(seen_keys.filter_new([5, 3, 5])), [True, True, False])
+        self.assertEqual(list(seen_keys.filter_new([3, 7, 1, 7])), [False, True, True, False])
+        self.assertEqual(len(seen_keys), 4)
+
+    # Testing keys are still found once the keys of many chunks have been stored in runs and merged
+    def test_seen_keys_runs(self):
+        seen_keys = SeenKeys()
+        seen = set()
+        rng = np.random.default_rng(0)
+
+        for size in rng.integers(0, 300, 40):
+            keys = rng.integers(0, 2000, size)
+            expected = []
+            for key in keys.tolist():
+                expected.append(key not in seen)
+                seen.add(key)
+
+            self.assertEqual(seen_keys.filter_new(keys).tolist(), expected)
+        self.assertEqual(len(seen_keys), len(seen))
+        self.assertLess(len(seen_keys.runs), 12)
+
+    # Testing duplicates are detected by ID, with rows without a valid ID kept or compared as a whole row
+    def test_id_duplicate_filter(self):
+        df = pd.DataFrame({"ID": ["1", "2", "1", "n/a", "n/a"], "Text": ["a", "b", "edited", "c", "c"]})
+
+        mask, found = DuplicateFilter("id").filter_new(*DuplicateFilter("id").row_keys(df))
+        self.assertEqual(mask.tolist(), [True, True, False, True, True])
+        self.assertEqual(found["repeated ID"], 1)
+
+        duplicate_filter = DuplicateFilter("id", row_fallback=True)
+        mask, found = duplicate_filter.filter_new(*duplicate_filter.row_keys(df))
+        self.assertEqual(mask.tolist(), [True, True, False, True, False])
+        self.assertEqual(found["repeated row without a valid ID"], 1)
+
     # Testing the is_retweet helper method
     def test_is_retweet(self):
         test_string1 = "RT @ Test, text"
@@ -119,6 +243,635 @@ class RefinementTest(unittest.TestCase):
         self.assertFalse(compare_headers(test1, test4))
 
 
+"""
+This class contains the unit tests for the column-at-a-time extraction engine.
+
+Each extraction is compared against mapping the matching per-row helper method over the same column.
+"""
+
+
+class ExtractionEngineTest(unittest.TestCase):
+
+    # Testing each extraction gives the same values as its helper method, including for missing values
+    def test_matches_helpers(self):
+        text = pd.Series(["RT @JohnnyTest: text", "rt @lower text", "Test no RT", "RT @ Test, text", None],
+                         dtype=object)
+        entities = pd.Series(["{\"hashtags\":[{\"text\":\"CometLanding\",\"indices\":[1,2]}],\"user_mentions\":["
+                              "{\"screen_name\":\"EUCouncil\",\"name\":\"EU\",\"id\":1}],\"urls\":[]}",
+                              "{\"hashtags\":[],\"user_mentions\":[]}", None], dtype=object)
+        source = pd.Series(["<a href=\"http://twitter.com\" rel=\"nofollow\">Twitter Web Client</a>", "No app",
+                            None], dtype=object)
+
+        pd.testing.assert_series_equal(extract_is_retweet(text), text.map(is_retweet))
+        pd.testing.assert_series_equal(extract_is_reply(text), text.map(is_reply))
+        pd.testing.assert_series_equal(extract_rt_to(text), text.map(who_to))
+        pd.testing.assert_series_equal(extract_hashtags(entities), entities.map(find_hashtags))
+        pd.testing.assert_series_equal(extract_mentions(entities), entities.map(find_mentions))
+        pd.testing.assert_series_equal(extract_apps(source), source.map(find_apps))
+
+    # Testing dictionary-encoded columns give the same values as running the method on every row, with a custom index
+    def test_map_unique(self):
+        usernames = pd.Series(["ESA", None, "ESA", "Rosetta", None], index=[5, 3, 8, 1, 0], dtype=object)
+
+        pd.testing.assert_series_equal(map_unique(usernames, lambda values: values.map(is_reply)),
+                                       usernames.map(is_reply))
+        pd.testing.assert_series_equal(map_unique(usernames, lambda values: values.str.lower()),
+                                       usernames.str.lower())
+
+    # Testing the Entities column is parsed into entity tables, keeping the names the Regex helpers match
+    def test_parse_entities(self):
+        entities = pd.Series(["{\"hashtags\":[{\"text\":\"CometLanding\"},{\"text\":\"67P_Rosetta\"}],\"user_mentions\":["
+                              "{\"screen_name\":\"EUCouncil\",\"id_str\":\"206717989\"},{\"screen_name\":\"astro_luca\","
+                              "\"id_str\":\"290876018\"}],\"urls\":[{\"url\":\"http://t.co/x\",\"expanded_url\":\"http://ow.ly/x\"}]}",
+                              "n/a", "{\"hashtags\":[{\"text\":\"navcam\"}],\"user_mentions\":[],\"urls\":[]}"], dtype=object)
+
+        tables = parse_entities(entities, row_offset=10)
+
+        # Names with characters the Hashtags and Mentions columns don't extract, such as _, are left out as they are
+        self.assertEqual(tables["hashtags"].values.tolist(), [[10, "CometLanding"], [12, "navcam"]])
+        self.assertEqual(tables["mentions"].values.tolist(), [[10, "EUCouncil", "206717989"]])
+        self.assertEqual(tables["urls"].values.tolist(), [[10, "http://t.co/x", "http://ow.ly/x"]])
+
+
+"""
+This class contains the unit tests for splitting a CSV file into shards of rows.
+"""
+
+
+class CsvShardsTest(unittest.TestCase):
+
+    # Testing that shards split on row boundaries, including around newlines and quotes inside quoted values
+    def test_shards_split_on_rows(self):
+        rows = ["ID,Text"] + [str(i) + ",\"line one\nline \"\"two\"\",\nthree\"" for i in range(20)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "shards.csv")
+            with open(file_path, "w", newline="") as file:
+                file.write("\n".join(rows) + "\n")
+
+            whole = pd.read_csv(file_path, dtype=object)
+
+            for shard_count in [1, 2, 3, 7, 40]:
+                boundaries = find_row_boundaries(file_path, shard_count)
+                shards = []
+                for start, end in zip(boundaries, boundaries[1:]):
+                    with open_byte_range(file_path, start, end) as shard:
+                        shards.append(pd.read_csv(shard, dtype=object))
+
+                self.assertLessEqual(len(shards), shard_count)
+                pd.testing.assert_frame_equal(pd.concat(shards, ignore_index=True), whole)
+                self.assertEqual([count_rows(file_path, start, end) for start, end in zip(boundaries, boundaries[1:])],
+                                 [len(shard) for shard in shards])
+
+            # Checking the last complete row is found when the file ends part way through a quoted value
+            size = os.path.getsize(file_path)
+            boundary = last_row_boundary(file_path, header_end(file_path), size - 10)
+            with open_byte_range(file_path, header_end(file_path), boundary) as shard:
+                pd.testing.assert_frame_equal(pd.read_csv(shard, dtype=object), whole.iloc[:-1])
+
+
+"""
+This class contains the unit tests for saving and loading refined data in each of the formats.
+"""
+
+
+class RefinedDataTest(unittest.TestCase):
+
+    # Creates a small refined data frame, as it would be after refinement, to use in each test
+    def setUp(self):
+        self.df = pd.DataFrame({"ID": ["1", "2"], "Creation Time": [pd.Timestamp("2014-11-12 16:03:00"), "n/a"],
+                                "Follower Count": [10, "n/a"], "Is RT": [True, False], "Hashtags": ["Rosetta", "n/a"]})
+
+    # Testing refined columns are converted to their types, with placeholders becoming missing values
+    def test_typed_frame(self):
+        typed = to_typed_frame(self.df)
+
+        self.assertEqual(str(typed["Creation Time"].dtype), "datetime64[ns]")
+        self.assertEqual(str(typed["Follower Count"].dtype), "Int64")
+        self.assertEqual(str(typed["Is RT"].dtype), "bool")
+        self.assertTrue(typed["Creation Time"].isna()[1])
+        self.assertIsNone(typed["Hashtags"][1])
+
+    # Testing data frames written in parts to a columnar file can be loaded back a column at a time
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_columnar_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_format in ["parquet", "feather"]:
+                file_path = os.path.join(directory, "data_REFINED." + file_format)
+
+                with RefinedWriter(file_path, file_format) as writer:
+                    writer.write(self.df.iloc[:1])
+                    writer.write(self.df.iloc[1:])
+
+                loaded = read_refined(file_path, columns=["ID", "Hashtags"], keep_placeholders=True)
+
+                self.assertEqual(loaded.values.tolist(), [["1", "Rosetta"], ["2", "n/a"]])
+
+    # Testing refined CSV files are loaded with the shared schema, keeping long IDs and placeholders as requested
+    def test_refined_schema(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "data_REFINED.csv")
+            self.df.assign(ID=["1234567890123456789", "n/a"], User=["ESA", "ESA"]).to_csv(file_path, index=False)
+
+            loaded = read_refined(file_path)
+            self.assertEqual(str(loaded["User"].dtype), "category")
+            self.assertEqual(str(loaded["Creation Time"].dtype), "datetime64[ns]")
+            self.assertEqual(str(loaded["Is RT"].dtype), "bool")
+            self.assertEqual(loaded["ID"][0], "1234567890123456789")
+            self.assertTrue(loaded["Hashtags"].isna()[1])
+
+            loaded = read_refined(file_path, columns=["ID", "User"], keep_placeholders=True)
+            self.assertEqual(loaded.values.tolist(), [["1234567890123456789", "ESA"], ["n/a", "ESA"]])
+
+
+"""
+This class contains the unit tests for the aggregation engine used to analyse refined data.
+"""
+
+
+class AggregationEngineTest(unittest.TestCase):
+
+    # Creates a small typed data frame of refined records, and its table of hashtags, to use in each test
+    def setUp(self):
+        self.df = apply_schema(pd.DataFrame({
+            "User": ["ESA", "Rosetta", "ESA", None],
+            "Creation Time": ["2014-11-12 16:03:00", "2014-11-12 16:03:00", "2014-12-01 09:00:00", "n/a"],
+            "Reply Username": [None, "ESA", "Rosetta", None], "Reply Status ID": [None, "5", "5", None],
+            "Source": ["Web", "Web", None, "iPhone"],
+            "Is RT": [True, False, False, False], "Is Reply": [False, True, True, False],
+            "Mentions": ["Philae;: ESA", None, "Philae", None], "RT To": ["Philae", None, None, None]}))
+        self.hashtag_table = pd.DataFrame({"Row": [0, 0, 2, 3], "Hashtag": ["comet", "esa", "comet", "comet"]})
+
+    # Testing the counts are in the order values first occur, with interactions in the order they were counted
+    def test_aggregate(self):
+        aggregates = aggregate(self.df, self.hashtag_table)
+
+        self.assertEqual(aggregates.hashtags, {"comet": 3, "esa": 1})
+        self.assertEqual(aggregates.timeline, {"2014-11-12 16:03:00": 2, "2014-12-01 09:00:00": 1})
+        self.assertEqual(aggregates.hashtags_by_month, {pd.Period("2014-11", "M"): {"comet": 1, "esa": 1},
+                                                        pd.Period("2014-12", "M"): {"comet": 1}})
+        november, december = pd.Period("2014-11", "M"), pd.Period("2014-12", "M")
+        self.assertEqual(list(aggregates.users_by_month[november].items()), [("Philae", 2), ("ESA", 2)])
+        self.assertEqual(aggregates.users_by_month[december], {"Philae": 1, "Rosetta": 1})
+        self.assertEqual(aggregates.replying_users, {"Rosetta": 1, "ESA": 1})
+        self.assertTrue(aggregates.missing_user and aggregates.missing_app)
+        self.assertEqual(aggregates.hashtags_replied_to(), {"comet": 2})
+        self.assertEqual(aggregates.last_time, pd.Timestamp("2014-12-01 09:00:00"))
+
+    # Testing the counts of consecutive parts of a data set merge to give the counts of the whole
+    def test_merge(self):
+        whole = aggregate(self.df, self.hashtag_table)
+
+        first = aggregate(self.df.iloc[:2].reset_index(drop=True), self.hashtag_table[self.hashtag_table["Row"] < 2])
+        second_table = self.hashtag_table[self.hashtag_table["Row"] >= 2].assign(Row=lambda table: table["Row"] - 2)
+        merged = first.merge(aggregate(self.df.iloc[2:].reset_index(drop=True), second_table))
+
+        self.assertEqual(vars(merged), vars(whole))
+        self.assertEqual(list(merge_counts({"a": 1}, {"b": 2, "a": 1}).items()), [("a", 2), ("b", 2)])
+
+    # Testing values are paired by key rather than by position, keeping only the keys in both Dictionaries
+    def test_keyed_ratio(self):
+        self.assertEqual(list(keyed_ratio({"ESA": 4, "Philae": 1, "Rosetta": 3}, {"Rosetta": 2, "ESA": 2}).items()),
+                         [("ESA", 2.0), ("Rosetta", 1.5)])
+        self.assertEqual(keyed_ratio({"ESA": 1}, {"ESA": 0}), {})
+
+        keys, values = join_keyed({"a": 1, "b": 2}, {"b": 5}, {"b": 7, "a": 3})
+        self.assertEqual(list(keys), ["b"])
+        self.assertEqual([value.tolist() for value in values], [[2.0], [5.0], [7.0]])
+
+    # Testing records are grouped into time buckets of each size, with the same month in different years kept apart
+    def test_time_index(self):
+        time_index = TimeIndex(pd.to_datetime(pd.Series(["2015-11-02 10:30:00", "2014-11-12 16:03:00", None,
+                                                         "2014-11-12 16:45:00"])))
+
+        self.assertEqual(list(time_index.count_records("month").items()),
+                         [(pd.Period("2014-11", "M"), 2), (pd.Period("2015-11", "M"), 1)])
+        self.assertEqual(time_index.count_records("hour")[pd.Period("2014-11-12 16:00", "h")], 2)
+        self.assertEqual(time_index.count_by_bucket(["b", "a", "c", "a"], [3, 1, 2, 3], "day"),
+                         {pd.Period("2014-11-12", "D"): {"a": 2, "b": 1}, pd.Period("2015-11-02", "D"): {}})
+
+    # Testing the index of replies to each status, and the hashtags replied to counted from it
+    def test_reply_index(self):
+        reply_index = ReplyIndex(pd.Series(["7", None, "5", "7"], dtype="string"))
+
+        self.assertEqual(reply_index.rows("7").tolist(), [0, 3])
+        self.assertEqual(reply_index.rows("6").tolist(), [])
+        self.assertEqual(len(reply_index), 2)
+
+        # The hashtags of both replies to status 7 are counted once for each of them
+        hashtag_table = pd.DataFrame({"Row": [1, 2, 3, 3], "Hashtag": ["esa", "comet", "philae", "comet"]})
+        hashtags = count_hashtags_replied_to(reply_index, [True, True, True, True], hashtag_table)
+
+        self.assertEqual(list(hashtags.items()), [("philae", 2), ("comet", 3)])
+
+    # Testing no hashtags are counted when no record replies to a status
+    def test_no_replies(self):
+        reply_index = ReplyIndex(pd.Series([np.nan, np.nan]))
+        hashtag_table = pd.DataFrame({"Row": [0, 1], "Hashtag": ["esa", "comet"]})
+
+        self.assertEqual(count_hashtags_replied_to(reply_index, [False, False], hashtag_table), {})
+
+
+
+"""
+This class contains the unit tests for the ranked counter used to find the top n values of each result.
+"""
+
+
+class RankedCounterTest(unittest.TestCase):
+
+    # Testing the top n pairs are ranked like a stable sort, with n clamped to the number of pairs
+    def test_top(self):
+        counter = RankedCounter({"esa": 2, "comet": 5, "philae": 2, "rosetta": 1})
+
+        self.assertEqual(counter.top(2), [("comet", 5), ("esa", 2)])
+        self.assertEqual(counter.top(4), [("comet", 5), ("esa", 2), ("philae", 2), ("rosetta", 1)])
+        self.assertEqual(counter.top(10), counter.top(4))
+        self.assertEqual(counter.top(0), [])
+
+    # Testing the stored ranking is cleared when the counter changes
+    def test_changes(self):
+        counter = RankedCounter({"esa": 2, "comet": 5})
+        self.assertEqual(counter.top(1), [("comet", 5)])
+
+        counter["philae"] = 7
+        self.assertEqual(counter.top(1), [("philae", 7)])
+        counter.update({"esa": 9})
+        self.assertEqual(counter.top(1), [("esa", 9)])
+        del counter["esa"]
+        self.assertEqual(counter.top(3), [("philae", 7), ("comet", 5)])
+
+"""
+This class contains the unit tests for the inverted index used to find the records matching a query.
+"""
+
+
+class InvertedIndexTest(unittest.TestCase):
+
+    # Testing each value's records are stored once each in order, and combined by intersection and union
+    def test_queries(self):
+        index = InvertedIndex(["comet", "esa", None, "comet", "comet", "esa"], [3, 1, 2, 0, 3, 3])
+
+        self.assertEqual(index.rows("comet").tolist(), [0, 3])
+        self.assertEqual(index.rows("philae").tolist(), [])
+        self.assertEqual(index.counts(), {"comet": 2, "esa": 2})
+        self.assertEqual(index.all_of(["comet", "esa"]).tolist(), [3])
+        self.assertEqual(index.any_of(["comet", "esa"]).tolist(), [0, 1, 3])
+        self.assertEqual(intersect([np.array([1, 4, 9]), np.array([0, 4, 9, 12]), np.array([9])]).tolist(), [9])
+        self.assertEqual(union([np.array([1, 4]), np.array([0, 4])]).tolist(), [0, 1, 4])
+
+"""
+This class contains the unit tests for the sketches used to analyse a data set approximately.
+"""
+
+
+class SketchesTest(unittest.TestCase):
+
+    # Testing the number of distinct values is estimated within the error, and sketches of parts of the values merge
+    def test_hyper_log_log(self):
+        values = np.array(["user" + str(i) for i in range(20000)], dtype=object)
+        first, second = HyperLogLog(0.01), HyperLogLog(0.01)
+        first.update(values[:12000])
+        second.update(np.concatenate([values[8000:], [None]]))
+
+        self.assertAlmostEqual(first.merge(second).count(), 20000, delta=20000 * 0.03)
+        self.assertEqual(HyperLogLog(0.01).count(), 0)
+
+    # Testing the most frequent values are kept, with bounds around their true counts, when summaries are merged
+    def test_space_saving(self):
+        summary = SpaceSaving(2, {"comet": 5, "esa": 3, "philae": 1})
+        summary.merge(SpaceSaving(2, {"philae": 4, "rosetta": 2, "esa": 1}))
+
+        self.assertEqual(list(summary.counts), ["comet", "philae"])
+        self.assertEqual(summary.bounds("comet"), (5, 6))
+        self.assertEqual(summary.bounds("esa"), (0, summary.floor))
+        self.assertGreaterEqual(summary.floor, 4)
+
+"""
+This class contains the unit tests for the instrumentation used to profile runs.
+"""
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def tearDown(self):
+        if PROFILER.enabled:
+            PROFILER.stop()
+
+    # Testing calls are only measured while the profiler is enabled, with nested calls recording their depth
+    def test_profiled(self):
+        @profiled
+        def inner():
+            return [0] * 1000
+
+        @profiled
+        def outer():
+            return inner() + inner()
+
+        PROFILER.measurements = []
+        self.assertEqual(len(outer()), 2000)
+        self.assertEqual(PROFILER.measurements, [])
+
+        PROFILER.start(trace_memory=True)
+        outer()
+        PROFILER.stop()
+
+        names = [measurement["name"].rsplit(".", 1)[-1] for measurement in PROFILER.measurements]
+        self.assertEqual(names, ["outer", "inner", "inner"])
+        self.assertEqual([measurement["depth"] for measurement in PROFILER.measurements], [0, 1, 1])
+        self.assertGreaterEqual(PROFILER.measurements[0]["memory_peak"], PROFILER.measurements[1]["memory_peak"])
+        self.assertEqual([totals["calls"] for totals in PROFILER.summary().values()], [1, 2])
+        self.assertEqual(PROFILER.report()["memory"], "tracemalloc")
+
+
+"""
+This class contains the unit tests for the result cache used to store analysis results between runs.
+"""
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name, max_bytes=2000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Testing results are loaded by their key, and unreadable results are removed rather than loaded
+    def test_save_and_load(self):
+        self.assertIsNone(self.cache.load("a"))
+        self.cache.save("a", {"record_count": 2})
+        self.assertEqual(self.cache.load("a"), {"record_count": 2})
+
+        with open(self.cache.path("a"), "wb") as file:
+            file.write(b"not results")
+        self.assertIsNone(self.cache.load("a"))
+        self.assertFalse(os.path.exists(self.cache.path("a")))
+
+    # Testing the key changes with the file and the code version
+    def test_key(self):
+        file_path = os.path.join(self.directory.name, "data.csv")
+        with open(file_path, "w") as file:
+            file.write("a")
+
+        key = self.cache.key([file_path], "1")
+        self.assertEqual(self.cache.key([file_path], "1"), key)
+        self.assertNotEqual(self.cache.key([file_path], "2"), key)
+
+        with open(file_path, "w") as file:
+            file.write("ab")
+        self.assertNotEqual(self.cache.key([file_path], "1"), key)
+
+    # Testing the least recently used results are removed once the cache is over its size cap
+    def test_eviction(self):
+        for time, key in enumerate(["a", "b", "c"]):
+            self.cache.save(key, os.urandom(800))
+            os.utime(self.cache.path(key), (time, time))
+        self.assertIsNone(self.cache.load("a"))
+        self.assertIsNotNone(self.cache.load("b"))
+        self.assertIsNotNone(self.cache.load("c"))
+
+
+"""
+This class contains the unit tests for the synthetic tweet data sets used in benchmarks.
+"""
+
+
+class SyntheticTweetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "synthetic.csv")
+        write_synthetic_tweets(self.file_path, 2000, seed=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Testing the same rows and seed give the same file, and a different seed gives a different one
+    def test_deterministic(self):
+        other_path = os.path.join(self.directory.name, "other.csv")
+        write_synthetic_tweets(other_path, 2000, seed=1)
+        with open(self.file_path) as file, open(other_path) as other:
+            self.assertEqual(file.read(), other.read())
+
+        write_synthetic_tweets(other_path, 2000, seed=2)
+        with open(self.file_path) as file, open(other_path) as other:
+            self.assertNotEqual(file.read(), other.read())
+
+    # Testing the file is in the raw format, with every reply to a tweet in the file
+    def test_format(self):
+        df = pd.read_csv(self.file_path, dtype=object)
+        self.assertEqual(list(df.columns), DEFAULT_COLUMN_HEADERS)
+        self.assertEqual(len(df), 2000)
+
+        replies = df.dropna(subset=["Reply Status ID"])
+        self.assertGreater(len(replies), 0)
+        self.assertTrue(replies["Reply Status ID"].isin(df["ID"]).all())
+        self.assertTrue(df["Text"].str.startswith("RT @").any())
+
+    # Testing the file can be refined, with the repeated rows removed and the entities extracted
+    def test_refinement(self):
+        data = UnrefinedDataFrame(self.file_path)
+        data.refine()
+
+        self.assertLess(len(data.df), 2000)
+        self.assertFalse(data.df.duplicated().any())
+        self.assertTrue((data.df["Hashtags"] != "n/a").any())
+        self.assertEqual(data.df["Is RT"].sum(), data.df["Text"].str.startswith("RT @").sum())
+
+
+"""
+This class contains the unit tests for the benchmark suite.
+"""
+
+
+class BenchmarksTest(unittest.TestCase):
+
+    # Testing a benchmark run reports its time and memory and the steps measured
+    def test_run_benchmark(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw_path = os.path.join(directory, "synthetic.csv")
+            write_synthetic_tweets(raw_path, 500)
+            run_benchmark("refinement", raw_path, None)
+            result = run_benchmark("analysis", raw_path, refined_file_path(raw_path))
+
+        self.assertGreater(result["seconds"], 0)
+        self.assertIn("AnalysedDataSet.__init__", result["stages"])
+        self.assertFalse(PROFILER.enabled)
+
+    # Testing results are compared with the latest results of an earlier commit
+    def test_compare_results(self):
+        stored = [{"commit": "abc1", "benchmark": "analysis", "rows": 10, "seconds": 4.0, "peak_memory": 1},
+                  {"commit": "abc1", "benchmark": "analysis", "rows": 10, "seconds": 2.0, "peak_memory": 1},
+                  {"commit": "def2", "benchmark": "analysis", "rows": 10, "seconds": 9.0, "peak_memory": 1},
+                  {"commit": "abc1", "benchmark": "geomap", "rows": 10, "skipped": "folium"}]
+        earlier = commit_results(stored, "abc")
+        self.assertEqual(set(earlier), {("analysis", 10)})
+
+        results = [{"commit": "def2", "benchmark": "analysis", "rows": 10, "seconds": 1.0, "peak_memory": 2},
+                   {"commit": "def2", "benchmark": "networks", "rows": 10, "seconds": 1.0, "peak_memory": 2}]
+        self.assertEqual(compare_results(results, earlier), [("analysis", 10, 2.0, 1.0, 1, 2, 0.5)])
+
+
+"""
+This class contains the unit tests for analysing a refined data set.
+"""
+
+
+class AnalysedDataSetTest(unittest.TestCase):
+
+    # Saves a small refined data set to a temporary file and loads it for analysis in each test
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "data_REFINED.csv")
+        pd.DataFrame({"User": ["ESA", "Rosetta", "ESA"],
+                      "Creation Time": ["2014-11-12 16:03:00", "2014-11-12 16:03:00", "2014-12-01 09:00:00"],
+                      "Reply Username": ["n/a", "ESA", "Rosetta"], "Reply Status ID": ["n/a", "1", "2"],
+                      "Source": ["Web", "Web", "iPhone"], "Is RT": [False, False, False],
+                      "Is Reply": [False, True, True], "Hashtags": ["Comet", "n/a", "comet;ESA"],
+                      "Mentions": ["n/a", "n/a", "n/a"], "RT To": ["n/a", "n/a", "n/a"],
+                      "User Language": ["en", "fr", "en"], "ID": ["1", "2", "3"]}) \
+            .to_csv(self.file_path, index=False)
+        self.data = AnalysedDataSet(self.file_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    # Testing results are only found when first used, and are found again from the filtered data after invalidate
+    def test_lazy_metrics(self):
+        self.assertNotIn("hashtags_data", vars(self.data))
+        self.assertEqual(self.data.hashtags_data, {"comet": 2, "esa": 1})
+        self.assertIn("hashtags_data", vars(self.data))
+        self.assertNotIn("users_trend", vars(self.data))
+
+        self.data.df = self.data.df[self.data.df["Creation Time"] >= "2014-12-01"]
+        self.assertEqual(self.data.hashtags_data, {"comet": 2, "esa": 1})
+
+        self.data.invalidate()
+        self.assertEqual(self.data.hashtags_data, {"comet": 1, "esa": 1})
+        self.assertEqual(self.data.app_count, 1)
+        self.assertEqual(self.data.get_months(), [pd.Period("2014-12", "M")])
+
+    # Testing a data set streamed a record at a time gives the same results as analysing it all at once
+    def test_streamed_data_set(self):
+        streamed = StreamedDataSet(self.file_path, chunk_size=1)
+
+        for name in ["hashtags_data", "user_inter_data", "hashtags_trend", "users_trend", "hashtag_repl", "user_ratio",
+                     "timeline_data", "app_data", "record_count", "user_count", "app_count", "reply_count"]:
+            self.assertEqual(getattr(streamed, name), getattr(self.data, name))
+        self.assertEqual(streamed.time_range(), self.data.time_range())
+        self.assertEqual(streamed.tweets_per_bucket("day"), self.data.tweets_per_bucket("day"))
+
+        partitioned = StreamedDataSet(self.file_path, chunk_size=1, workers=2)
+        self.assertEqual(list(partitioned.hashtags_data.items()), list(self.data.hashtags_data.items()))
+        self.assertEqual(partitioned.hashtag_repl, self.data.hashtag_repl)
+        self.assertEqual(partitioned.timeline_data, self.data.timeline_data)
+
+    # Testing the approximate results match the exact ones on a data set smaller than the sketches
+    def test_approximate_data_set(self):
+        approximate = ApproximateDataSet(self.file_path, chunk_size=2)
+
+        self.assertEqual(approximate.user_count, self.data.user_count)
+        self.assertEqual(approximate.top_n_hashtags(2), self.data.top_n_hashtags(2))
+        self.assertEqual(approximate.hashtags_trend, self.data.hashtags_trend)
+        self.assertEqual(approximate.tweets_per_bucket("day"), self.data.tweets_per_bucket("day"))
+        self.assertRaises(ValueError, approximate.analyse_top_n_hashtags_replied_to)
+
+    # Testing the records matching a query are found from the inverted indexes
+    def test_find_rows(self):
+        self.assertEqual(self.data.find_rows(hashtags=["#Comet"]).tolist(), [0, 2])
+        self.assertEqual(self.data.find_rows(hashtags=["comet", "esa"], match_all=True).tolist(), [2])
+        self.assertEqual(self.data.find_rows(hashtags=["comet"], bucket="2014-11").tolist(), [0])
+        self.assertEqual(len(self.data.find_tweets(hashtags=["philae"])), 0)
+
+    # Testing a filtered view is analysed from only the matching records, and is stored for the same filters
+    def test_where(self):
+        english = self.data.where(language="en")
+        self.assertEqual(english.record_count, 1)
+        self.assertEqual(english.hashtags_data, {"comet": 2, "esa": 1})
+        self.assertEqual(english.app_data, {"Web": 1, "iPhone": 1})
+        self.assertEqual(english.hashtag_repl, {"comet": 1, "esa": 1})
+        self.assertIs(self.data.where(language=["en"]), english)
+        self.assertEqual(len(english.find_tweets(hashtags=["esa"])), 1)
+
+        november = self.data.where(since="2014-11-01", until="2014-12-01")
+        self.assertEqual(list(november.tweets_per_bucket("month")), [pd.Period("2014-11", "M")])
+        self.assertEqual(november.user_inter_data, {"ESA": 1})
+        self.assertEqual(english.where(app="Web").df.index.tolist(),
+                         self.data.where(language="en", app="Web").df.index.tolist())
+        self.assertEqual(english.where(app="Web").hashtags_data, {"comet": 1})
+
+    # Testing several files are analysed on their own and together, with records in more than one file counted once
+    def test_combined_data_set(self):
+        other_path = os.path.join(self.directory.name, "other_REFINED.csv")
+        pd.read_csv(self.file_path, dtype=str).iloc[[2, 0, 0]].assign(ID=["3", "4", "4"]) \
+            .to_csv(other_path, index=False)
+        combined = CombinedDataSet([self.file_path, other_path], workers=2)
+
+        self.assertEqual(combined.duplicate_count, 2)
+        self.assertEqual(combined.record_count, 3)
+        self.assertEqual(combined.hashtags_data, {"comet": 3, "esa": 1})
+        self.assertEqual(combined.data_sets[1].hashtags_data, {"comet": 3, "esa": 1})
+        self.assertEqual(combined.data_sets[0].hashtags_data, self.data.hashtags_data)
+        self.assertEqual(combined.hashtag_repl, self.data.hashtag_repl)
+
+    # Testing results are loaded from the result cache without reading the file, until the file changes
+    def test_analyse_cached(self):
+        cache = ResultCache(os.path.join(self.directory.name, "cache"))
+        analysed = analyse_cached(self.file_path, cache)
+        cached = analyse_cached(self.file_path, cache)
+
+        self.assertIsNotNone(analysed.df)
+        self.assertIsNone(cached.df)
+        for name in ["hashtags_data", "hashtags_trend", "user_ratio", "timeline_data", "record_count", "reply_per_avg"]:
+            self.assertEqual(getattr(cached, name), getattr(self.data, name))
+        self.assertEqual(cached.top_n_hashtags(1), [("comet", 2)])
+
+        approximate = analyse_cached(self.file_path, cache, ApproximateDataSet, error=0.1, chunk_size=2)
+        self.assertEqual(analyse_cached(self.file_path, cache, ApproximateDataSet, error=0.1).error, 0.1)
+        self.assertEqual(approximate.results()["hashtags_data"], self.data.hashtags_data)
+
+        self.data.df.iloc[:1].to_csv(self.file_path, index=False)
+        os.utime(self.file_path, ns=(0, 0))
+        self.assertIsNotNone(analyse_cached(self.file_path, cache).df)
+
+    # Testing a file refined with entity tables is analysed the same as when it is refined without them, including
+    # hashtags and mentions with names the Hashtags and Mentions columns don't extract
+    def test_entity_tables_analysis(self):
+        raw_paths = [os.path.join(self.directory.name, name, "raw.csv") for name in ["columns", "tables"]]
+        raw_path = raw_paths[0]
+        os.makedirs(os.path.dirname(raw_path))
+        os.makedirs(os.path.dirname(raw_paths[1]))
+        write_synthetic_tweets(raw_path, 300, seed=3)
+
+        df = pd.read_csv(raw_path, dtype=object)
+        df.loc[:2, "Entities"] = \
+            '{"hashtags":[{"text":"Comet_Landing","indices":[0,14]},{"text":"Kométa","indices":[15,22]},' \
+            '{"text":"Rosetta","indices":[23,31]}],"symbols":[{"text":"ESA","indices":[32,36]}],"user_mentions":' \
+            '[{"screen_name":"esa_ops","name":"ESA Operations","id":1,"id_str":"1","indices":[37,45]},' \
+            '{"screen_name":"user0","name":"USER0","id":1000,"id_str":"1000","indices":[46,52]}],"urls":[]}'
+        for path in raw_paths:
+            df.to_csv(path, index=False)
+
+        UnrefinedDataFrame(raw_paths[0]).clean_data()
+        UnrefinedDataFrame(raw_paths[1]).clean_data(entity_tables=True)
+        columns, tables = [AnalysedDataSet(refined_file_path(path)) for path in raw_paths]
+
+        self.assertIsNone(columns.entity_tables)
+        self.assertIsNotNone(tables.entity_tables)
+        self.assertEqual(tables.results(), columns.results())
+        for mentions in [["user0"], ["esa_ops"]]:
+            self.assertEqual(tables.find_rows(mentions=mentions).tolist(),
+                             columns.find_rows(mentions=mentions).tolist())
+        self.assertEqual(len(tables.find_rows(hashtags=["Comet_Landing"])), 0)
+
+        streamed = [StreamedDataSet(refined_file_path(path), chunk_size=50) for path in raw_paths]
+        self.assertEqual(streamed[1].results(), streamed[0].results())
+        self.assertEqual(streamed[1].user_inter_data, columns.user_inter_data)
+        partitioned = StreamedDataSet(refined_file_path(raw_paths[1]), chunk_size=50, workers=2)
+        self.assertEqual(partitioned.user_inter_data, columns.user_inter_data)
+
 # Helper method to create an instance of UnrefinedDataFrame from the base test data
 def load_test_data():
     return UnrefinedDataFrame(BASE_TEST_DATA_FILE_PATH + "_Unrefined.csv")
@@ -1,12 +1,51 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
 import pandas as pd
 import re
 
+import ExtractionEngine
+from CsvShards import find_row_boundaries, header_end, last_row_boundary, open_byte_range
+from EntityTables import parse_entities, remove_entity_tables, write_entity_tables
+from Instrumentation import PROFILER, profiled
+from RefinedData import RefinedWriter, refined_file_path
+from StageCache import StageCache, code_version, file_fingerprint, stage_key
+from ExtractionEngine import extract_apps, extract_hashtags, extract_is_reply, extract_is_retweet, extract_mentions, \
+    extract_rt_to, map_unique
+
 # Stores the default path for a CSV file
 DEFAULT_FILE_PATH = "../data/CometLanding.csv"
 
 # Stores the suffix to add for a post-refinement CSV file.
 REFINED_SUFFIX = "_REFINED.csv"
 
+# Stores the default number of rows read in at once when refining a file in chunks.
+DEFAULT_CHUNK_SIZE = 100000
+
+# Stores the suffix added to a refined file's path for the watermark recording how much of the raw file it covers.
+WATERMARK_SUFFIX = ".watermark"
+
+# Stores the number of bytes before the watermark's offset that are fingerprinted, to check the raw file has only been
+# appended to
+WATERMARK_CHECK_SIZE = 4096
+
+# Stores the ways duplicates can be detected: by comparing whole rows, or by comparing tweet IDs.
+DEDUPE_MODES = ["row", "id"]
+
+# Stores the kinds of key a row can be given when detecting duplicates: a hash of the whole row, its tweet ID, or no key
+# at all (a row without a valid ID when duplicates are detected by ID without falling back to the whole row).
+ROW_KEY = 0
+ID_KEY = 1
+NO_KEY = 2
+
 # Stores the column headers to be used before adding new headers.
 DEFAULT_COLUMN_HEADERS = ["ID", "User", "Text", "Creation Time w/ Timezone", "Creation Time", "Coordinates",
                           "User Language", "Reply User ID", "Reply Username", "User ID", "Reply Status ID", "Source",
@@ -16,6 +55,15 @@ DEFAULT_COLUMN_HEADERS = ["ID", "User", "Text", "Creation Time w/ Timezone", "Cr
 REFINED_COLUMN_HEADERS = DEFAULT_COLUMN_HEADERS.copy()
 REFINED_COLUMN_HEADERS.extend(["Is RT", "Is Reply", "Hashtags", "Mentions", "RT To"])
 
+# Stores the refinement stages in the order they are run, each with the names of the methods, classes, modules and
+# constants it uses besides its own method. A stage's cached output is only reused while all of these are unchanged.
+REFINEMENT_STAGES = [("clean_duplicates", ["DuplicateFilter", "SeenKeys", "row_hashes", "id_keys"]),
+                     ("set_headers", ["compare_headers", "DEFAULT_COLUMN_HEADERS", "REFINED_COLUMN_HEADERS"]),
+                     ("clean_format", ["ExtractionEngine"]),
+                     ("add_headers", ["compare_headers", "REFINED_COLUMN_HEADERS", "ExtractionEngine"]),
+                     ("encode_data", ["encode_text", "ExtractionEngine"]),
+                     ("replace_empty_with_holder", [])]
+
 """
 This class is used to encapsulate the process of reading in a CSV data set and running required refinement on it.
 
@@ -28,9 +76,29 @@ There are helper methods used to assist in refinement and saving the data if any
 class UnrefinedDataFrame:
 
     # Loads in the data and runs any required refinement on it, storing any updates. A default data filepath is provided
-    def __init__(self, file_path=DEFAULT_FILE_PATH):
-        # Reading in the data file and assigning all values to be Strings to prevent loss of data (specifically in IDs).
-        self.df = pd.read_csv(file_path, dtype=object)
+    # An already loaded data frame (such as one chunk of a larger file) can be passed in to be refined instead.
+    # A DuplicateFilter can be passed in to detect duplicates with, which remembers the rows of earlier chunks so
+    # duplicates can be removed across the whole file. Otherwise duplicates are found by comparing whole rows.
+    @profiled
+    def __init__(self, file_path=DEFAULT_FILE_PATH, data_frame=None, duplicate_filter=None):
+        if data_frame is None:
+            # Reading in the data file and assigning all values to be Strings to prevent loss of data (specifically in IDs).
+            self.df = pd.read_csv(file_path, dtype=object)
+        else:
+            self.df = data_frame
+
+        # Stores whether the data frame holds the whole file, which is needed for its refinement to be cached.
+        self.is_whole_file = data_frame is None
+
+        # Stores the filter used to detect duplicates, if one was given.
+        self.duplicate_filter = duplicate_filter
+
+        # Stores the key and kind of key of each row kept when removing duplicates with a filter, in the same order as
+        # the rows.
+        self.row_keys = None
+
+        # Stores the number of duplicates removed for each reason.
+        self.dedupe_report = Counter()
 
         # Stores whether any changes have been made to the data set during refinement checks.
         self.has_changed = False
@@ -38,43 +106,149 @@ class UnrefinedDataFrame:
         # Stores the data set's filepath so any updated files can be saved in the same location with a similar name.
         self.file_path = file_path
 
-    # Writes the stored data frame to a CSV file with an updated name
-    def write_data_frame(self, file_path):
-        # Creates the file path to use to store the new file by combining the original's with the stored suffix.
-        # The substring is used to remove the .csv before adding the suffix.
-        new_file_path = file_path[:-4] + REFINED_SUFFIX
+        # Stores the tables of hashtags, mentions and urls parsed from the Entities column, if they have been built.
+        self.entity_tables = None
+
+        # Stores the time taken, row count and change in rows and memory of each stage of the last refinement.
+        self.stage_reports = []
+
+    # Writes the stored data frame to a file with an updated name, as a CSV file unless another format is given
+    @profiled
+    def write_data_frame(self, file_path, file_format="csv"):
+        # Creates the file path to use to store the new file by combining the original's (without its extension) with
+        # the suffix and the format's extension.
+        new_file_path = refined_file_path(file_path, file_format)
 
         # Storing the data in the calculated location and outputting appropriate feedback
-        self.df.to_csv(new_file_path, index=False)
+        with RefinedWriter(new_file_path, file_format) as writer:
+            writer.write(self.df)
         print("Refined data saved to", new_file_path)
 
+        # The entity tables are stored alongside the new file if they were built. Otherwise any tables left from an
+        # earlier refinement are removed as they would no longer match the new file's rows.
+        if self.entity_tables is not None:
+            write_entity_tables(self.entity_tables, new_file_path)
+            print("Entity tables saved alongside", new_file_path)
+        else:
+            remove_entity_tables(new_file_path)
+
+    # Parses the Entities column into tables of hashtags, mentions and urls keyed by each tweet's row in the data frame.
+    # row_offset is added to the rows, for when the data frame is a chunk of a larger file.
+    @profiled
+    def build_entity_tables(self, row_offset=0):
+        self.entity_tables = parse_entities(self.df['Entities'], row_offset)
+
+    # Runs the stages in REFINEMENT_STAGES in order on the stored data frame, reporting each in stage_reports.
+    # If a StageCache is given, each stage's output is stored in it, and the stages whose input and code are unchanged
+    # since they were stored are skipped by loading the output of the last of them instead.
+    # If measure_memory is set, the change in the data frame's memory use is reported too, which is slow on large data.
+    def refine(self, cache=None, measure_memory=False):
+        self.stage_reports = []
+        keys = self.stage_keys() if cache is not None else None
+
+        # Finding the last stage with a stored output, if any
+        start = 0
+        if cache is not None:
+            for index in reversed(range(len(REFINEMENT_STAGES))):
+                if cache.contains(REFINEMENT_STAGES[index][0], keys[index]):
+                    start = index + 1
+                    break
+
+        if start:
+            began = time.perf_counter()
+            self.df, self.has_changed, self.dedupe_report = cache.load(REFINEMENT_STAGES[start - 1][0], keys[start - 1])
+            loaded_in = time.perf_counter() - began
+
+            # The time taken to load the output is reported against the stage it was loaded for
+            for index, (name, dependencies) in enumerate(REFINEMENT_STAGES[:start]):
+                self.stage_reports.append({"stage": name, "cached": True,
+                                           "seconds": loaded_in if index == start - 1 else 0, "rows": len(self.df),
+                                           "row_delta": None, "memory_delta": None})
+
+        for index, (name, dependencies) in enumerate(REFINEMENT_STAGES[start:], start):
+            rows = len(self.df)
+            memory = self.df.memory_usage(deep=True).sum() if measure_memory else None
+
+            began = time.perf_counter()
+            with PROFILER.measure("UnrefinedDataFrame." + name):
+                getattr(self, name)()
+            seconds = time.perf_counter() - began
+
+            self.stage_reports.append({"stage": name, "cached": False, "seconds": seconds, "rows": len(self.df),
+                                       "row_delta": len(self.df) - rows,
+                                       "memory_delta": int(self.df.memory_usage(deep=True).sum() - memory)
+                                       if measure_memory else None})
+
+            if cache is not None:
+                cache.save(name, keys[index], (self.df, self.has_changed, self.dedupe_report))
+
+    # Returns the key of each refinement stage's output, from a hash of the input file, the code of each stage up to and
+    # including it and the settings it is run with.
+    def stage_keys(self):
+        key = file_fingerprint(self.file_path)
+        keys = []
+
+        for name, dependencies in REFINEMENT_STAGES:
+            version = code_version([getattr(UnrefinedDataFrame, name)] + [globals()[dependency]
+                                                                         for dependency in dependencies])
+            key = stage_key(key, version, self.stage_settings(name))
+            keys.append(key)
+
+        return keys
+
+    # Returns the settings a refinement stage is run with, as a String to include in its key
+    def stage_settings(self, name):
+        if name == "clean_duplicates" and self.duplicate_filter is not None:
+            return self.duplicate_filter.mode + "," + str(self.duplicate_filter.row_fallback)
+        return ""
+
     # Runs the refinement methods in order, checks if any changes were made and calls the write method if so.
-    def clean_data(self):
-        self.clean_duplicates()
-        self.set_headers()
-        self.clean_format()
-        self.add_headers()
-        self.encode_data()
-        self.replace_empty_with_holder()
+    # If entity_tables is set, the Entities column is also parsed into entity tables which are saved with the new file.
+    # The new file is saved as a CSV file unless another file_format (parquet or feather) is given.
+    # If cache is set, the output of each stage is cached next to the file so unchanged stages are skipped when it is
+    # refined again. If stage_report is set, the time taken and change in rows and memory of each stage is output.
+    def clean_data(self, entity_tables=False, file_format="csv", cache=False, stage_report=False):
+        if cache and not self.is_whole_file:
+            raise ValueError("Only the refinement of a whole file can be cached")
+
+        self.refine(StageCache(self.file_path) if cache else None, measure_memory=stage_report)
+
+        if stage_report:
+            print_stage_reports(self.stage_reports)
+        print_dedupe_report(self.dedupe_report)
+
+        if entity_tables:
+            self.build_entity_tables()
 
         # Checking if changes were made and if so, calling the write method.
         if self.has_changed:
-            self.write_data_frame(self.file_path)
+            self.write_data_frame(self.file_path, file_format)
 
     # Removes duplicates from the data frame and uses length comparisons to check if changes have been made.
     def clean_duplicates(self):
         # Storing the length before dropping duplicates to use for later comparison.
         original_length = len(self.df)
 
-        self.df.drop_duplicates(inplace=True)
+        if self.duplicate_filter is None:
+            self.df.drop_duplicates(inplace=True)
+            self.dedupe_report = Counter({"repeated row": original_length - len(self.df)})
+        else:
+            # Rows are compared by an integer key (a hash of their values or their ID) so that duplicates of rows kept
+            # in earlier chunks are dropped too, without holding those chunks in memory.
+            keys, kinds = self.duplicate_filter.row_keys(self.df)
+            mask, self.dedupe_report = self.duplicate_filter.filter_new(keys, kinds)
+
+            self.df = self.df[mask].copy()
+            self.row_keys = keys[mask], kinds[mask]
 
         # If the length is lower, then the has_changed flag is updated to match
         if len(self.df) < original_length:
             self.has_changed = True
 
     def encode_data(self):
-        self.df['Text'] = self.df['Text'].str.encode('utf-8').str.decode('utf-8-sig', 'ignore')
-        self.df['Source'] = self.df['Source'].str.encode('utf-8').str.decode('utf-8-sig', 'ignore')
+        self.df['Text'] = encode_text(self.df['Text'])
+        # Source only has a handful of distinct values, so each is only re-encoded once
+        self.df['Source'] = map_unique(self.df['Source'], encode_text)
 
     def replace_empty_with_holder(self):
         self.df.fillna(value="n/a", inplace=True)
@@ -96,7 +270,7 @@ class UnrefinedDataFrame:
         self.df['Creation Time'] = pd.to_datetime(self.df['Creation Time'], dayfirst=True, errors='coerce')
         self.df['Follower Count'] = pd.to_numeric(self.df['Follower Count'], errors='coerce', downcast='integer')
         self.df['Friend Count'] = pd.to_numeric(self.df['Friend Count'], errors='coerce', downcast='integer')
-        self.df['Source'] = self.df['Source'].map(find_apps)
+        self.df['Source'] = extract_apps(self.df['Source'])
 
         # Drops any rows that now have a NaN in any of the 3 columns
         self.df.dropna(subset=['Creation Time', 'Follower Count', 'Friend Count'])
@@ -106,26 +280,410 @@ class UnrefinedDataFrame:
             self.has_changed = True
 
     # Adds the calculated columns to the data set if they don't already exist.
+    # Each column is extracted a whole column at a time (see ExtractionEngine) rather than row by row.
     def add_headers(self):
         if not compare_headers(self.df.columns, REFINED_COLUMN_HEADERS):
             # Creates the Is RT column by checking each row's Text to see if it is a retweet
-            self.df['Is RT'] = self.df['Text'].map(is_retweet)
+            self.df['Is RT'] = extract_is_retweet(self.df['Text'])
 
             # Creates the Is Reply column by checking each row's Reply Username to see if it is a reply
-            self.df['Is Reply'] = self.df['Reply Username'].map(is_reply)
+            self.df['Is Reply'] = extract_is_reply(self.df['Reply Username'])
 
             # Creates the Hashtags column by parsing each row's Entities to find Hashtags
-            self.df['Hashtags'] = self.df['Entities'].map(find_hashtags)
-            self.df['Mentions'] = self.df['Entities'].map(find_mentions)
+            self.df['Hashtags'] = extract_hashtags(self.df['Entities'])
+            self.df['Mentions'] = extract_mentions(self.df['Entities'])
 
-            self.df['RT To'] = self.df['Text'].map(who_to)
+            self.df['RT To'] = extract_rt_to(self.df['Text'])
 
             # Updating the has_changed flag appropriately
             self.has_changed = True
 
 
+"""
+This class stores the keys of rows that have already been kept while refining a file in chunks.
+
+Keys are 64-bit integers (row hashes) held in sorted arrays, so they cost 8 bytes per unique row and can be searched
+without going back over earlier chunks. The new keys of each chunk are stored as a run of their own, and a run is only
+merged into the run before it once it is as large, so the runs roughly halve in size from the first and each key is
+copied a logarithmic number of times rather than once for every later chunk.
+"""
+
+
+class SeenKeys:
+
+    def __init__(self):
+        self.runs = []
+
+    # Returns a mask of the given keys that have not been seen before, either in earlier calls or earlier in the same
+    # array, and records them as seen.
+    def filter_new(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+
+        # Sorting the keys once, as sorted keys are much faster to search for. The sort is stable, so the first
+        # occurrence of a key within the array comes first and only it is kept.
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        sorted_mask = np.ones(len(keys), dtype=bool)
+        sorted_mask[1:] = sorted_keys[1:] != sorted_keys[:-1]
+
+        # Binary searching each sorted run of stored keys to find those that have been seen already
+        for run in self.runs:
+            positions = np.searchsorted(run, sorted_keys)
+            found = positions < len(run)
+            found[found] = run[positions[found]] == sorted_keys[found]
+            sorted_mask &= ~found
+
+        mask = np.empty(len(keys), dtype=bool)
+        mask[order] = sorted_mask
+
+        # Storing the new keys as a run, then merging the last runs while the last is at least as large as the one
+        # before it
+        new_keys = sorted_keys[sorted_mask]
+        if len(new_keys):
+            self.runs.append(new_keys)
+        while len(self.runs) > 1 and len(self.runs[-1]) >= len(self.runs[-2]):
+            last = self.runs.pop()
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind="stable")
+
+        return mask
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+
+"""
+This class is used to detect duplicate rows across one or more data frames, keeping the first occurrence of each.
+
+Rows are either compared as a whole, using a hash of all of their values, or by their tweet ID. Comparing IDs avoids
+hashing the long Text, Entities and Profile Image values of every row, as the IDs are converted straight to integers.
+When comparing by ID, rows without a valid ID are kept unless row_fallback is set, in which case they are compared as
+a whole instead.
+
+The number of duplicates found for each reason is kept in report.
+"""
+
+
+class DuplicateFilter:
+
+    def __init__(self, mode="row", row_fallback=False):
+        if mode not in DEDUPE_MODES:
+            raise ValueError("Unknown duplicate detection mode: " + str(mode))
+
+        self.mode = mode
+        self.row_fallback = row_fallback
+
+        # Stores the IDs and row hashes seen so far separately, so an ID can't match the hash of a different row
+        self.seen_keys = {ROW_KEY: SeenKeys(), ID_KEY: SeenKeys()}
+
+        self.reasons = {ROW_KEY: "repeated row" if mode == "row" else "repeated row without a valid ID",
+                        ID_KEY: "repeated ID"}
+        self.report = Counter()
+
+    # Returns the key of each row of a data frame and the kind of each key. The ID is taken from the first column, so
+    # this can be used before or after the headers are set.
+    def row_keys(self, df):
+        if self.mode == "row":
+            return row_hashes(df), np.full(len(df), ROW_KEY, dtype=np.int8)
+
+        keys = np.zeros(len(df), dtype=np.uint64)
+        kinds = np.full(len(df), NO_KEY, dtype=np.int8)
+
+        id_values, valid = id_keys(df.iloc[:, 0])
+        keys[valid] = id_values
+        kinds[valid] = ID_KEY
+
+        # Only the rows without a valid ID are hashed
+        if self.row_fallback and not valid.all():
+            keys[~valid] = row_hashes(df[~valid])
+            kinds[~valid] = ROW_KEY
+
+        return keys, kinds
+
+    # Returns a mask of the given rows that are not duplicates of rows seen before, either in earlier calls or earlier
+    # in the same arrays, and records them as seen. Also returns the number of duplicates found for each reason, which
+    # is added to the report too.
+    def filter_new(self, keys, kinds):
+        mask = np.ones(len(keys), dtype=bool)
+        found = Counter()
+
+        for kind, seen_keys in self.seen_keys.items():
+            rows = kinds == kind
+            if rows.any():
+                mask[rows] = seen_keys.filter_new(keys[rows])
+                found[self.reasons[kind]] = int(rows.sum() - mask[rows].sum())
+
+        self.report.update(found)
+        return mask, found
+
+
+# Refines a CSV file one chunk at a time, appending each refined chunk to the _REFINED.csv file as it goes.
+# Duplicates are removed across chunks as well as within them, so peak memory depends on the chunk size rather than on
+# the size of the file. If entity_tables is set, each chunk's entity tables are appended alongside it too.
+# Duplicates are detected by comparing whole rows, or by comparing IDs if dedupe is "id" (see DuplicateFilter).
+@profiled
+def refine_in_chunks(file_path=DEFAULT_FILE_PATH, chunk_size=DEFAULT_CHUNK_SIZE, entity_tables=False,
+                     file_format="csv", dedupe="row", row_fallback=False):
+    new_file_path = refined_file_path(file_path, file_format)
+    duplicate_filter = DuplicateFilter(dedupe, row_fallback)
+
+    if not entity_tables:
+        remove_entity_tables(new_file_path)
+
+    with RefinedWriter(new_file_path, file_format) as writer:
+        for chunk in pd.read_csv(file_path, dtype=object, chunksize=chunk_size):
+            frame = UnrefinedDataFrame(file_path, chunk, duplicate_filter)
+            frame.refine()
+
+            if entity_tables:
+                frame.build_entity_tables(row_offset=writer.rows_written)
+                write_entity_tables(frame.entity_tables, new_file_path, append=writer.started)
+
+            # The first chunk creates the file and writes the headers, the rest are appended underneath it.
+            writer.write(frame.df)
+
+    print_dedupe_report(duplicate_filter.report)
+    print("Refined data saved to", new_file_path)
+
+    return writer.rows_written
+
+
+# Refines only the rows appended to a CSV file since it was last refined, appending them to the _REFINED.csv file.
+# A watermark saved next to the refined file records the byte offset of the raw file refined up to (always the end of
+# a complete row, so a row the collector is part way through writing is left for the next run) and the last ID refined.
+# New rows are refined in chunks, and any whose ID has already been refined are dropped. If there is no watermark, or
+# the raw file no longer matches it (e.g. it was replaced rather than appended to), the whole file is refined instead.
+# Duplicates within the new rows are detected as in refine_in_chunks.
+@profiled
+def refine_incrementally(file_path=DEFAULT_FILE_PATH, chunk_size=DEFAULT_CHUNK_SIZE, entity_tables=False,
+                         dedupe="row", row_fallback=False):
+    new_file_path = refined_file_path(file_path)
+    watermark = read_watermark(new_file_path)
+    end = last_row_boundary(file_path, header_end(file_path), os.path.getsize(file_path))
+
+    seen_ids = SeenKeys()
+    if is_valid_watermark(watermark, file_path, new_file_path, end, entity_tables):
+        start = watermark["offset"]
+        rows_refined = watermark["rows"]
+
+        # Loading only the IDs of the records already refined, to check the new records against
+        refined_ids = pd.read_csv(new_file_path, usecols=["ID"], dtype=object, keep_default_na=False)["ID"]
+        seen_ids.filter_new(id_keys(refined_ids)[0])
+    else:
+        start = header_end(file_path)
+        rows_refined = 0
+
+    if not entity_tables:
+        remove_entity_tables(new_file_path)
+
+    last_id = watermark["last_id"] if rows_refined else None
+    duplicate_filter = DuplicateFilter(dedupe, row_fallback)
+
+    with RefinedWriter(new_file_path, append=rows_refined > 0) as writer, \
+            open_byte_range(file_path, start, end) as new_rows:
+        for chunk in pd.read_csv(new_rows, dtype=object, chunksize=chunk_size):
+            frame = UnrefinedDataFrame(file_path, chunk, duplicate_filter)
+            frame.refine()
+
+            # Removing records whose ID has already been refined. Records without a valid ID are always kept.
+            keys, valid = id_keys(frame.df['ID'])
+            keep = np.ones(len(frame.df), dtype=bool)
+            keep[valid] = seen_ids.filter_new(keys)
+            frame.df = frame.df[keep]
+            duplicate_filter.report["already refined ID"] += int(len(keep) - keep.sum())
+
+            if entity_tables:
+                frame.build_entity_tables(row_offset=rows_refined + writer.rows_written)
+                write_entity_tables(frame.entity_tables, new_file_path, append=rows_refined + writer.rows_written > 0)
+
+            writer.write(frame.df)
+
+            if len(frame.df):
+                last_id = frame.df['ID'].iloc[-1]
+
+        # If the refined file is being created from scratch, the header is still written when there are no rows
+        if not writer.started:
+            writer.write(pd.DataFrame(columns=REFINED_COLUMN_HEADERS))
+
+    write_watermark(new_file_path, file_path, end, rows_refined + writer.rows_written, last_id, entity_tables)
+    print_dedupe_report(duplicate_filter.report)
+    print(writer.rows_written, "new records refined and saved to", new_file_path)
+
+    return writer.rows_written
+
+
+# Loads the watermark saved next to a refined file, returning None if there isn't one.
+def read_watermark(refined_path):
+    try:
+        with open(refined_path + WATERMARK_SUFFIX) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# Saves the watermark for a refined file, recording the offset of the raw file refined up to, a fingerprint of the bytes
+# before that offset, the number of records in the refined file, the last ID refined and whether entity tables are kept.
+def write_watermark(refined_path, file_path, offset, rows, last_id, entity_tables):
+    watermark = {"offset": offset, "check": raw_file_check(file_path, offset), "rows": rows, "last_id": last_id,
+                 "entity_tables": entity_tables}
+
+    with open(refined_path + WATERMARK_SUFFIX, "w") as file:
+        json.dump(watermark, file)
+
+
+# Checks that a watermark can be used to carry on refining a raw file: the refined file must still exist, the raw file
+# must still contain the same bytes up to the watermark, and entity tables must be kept the same way as before.
+def is_valid_watermark(watermark, file_path, refined_path, end, entity_tables):
+    return watermark is not None and os.path.exists(refined_path) and watermark["offset"] <= end \
+        and watermark["check"] == raw_file_check(file_path, watermark["offset"]) \
+        and watermark["entity_tables"] == entity_tables
+
+
+# Fingerprints the bytes just before an offset of a raw file, so that a file which was replaced rather than appended to
+# can be detected.
+def raw_file_check(file_path, offset):
+    with open(file_path, "rb") as file:
+        file.seek(max(0, offset - WATERMARK_CHECK_SIZE))
+        return hashlib.sha1(file.read(min(offset, WATERMARK_CHECK_SIZE))).hexdigest()
+
+
+# Refines a CSV file using a pool of processes. The file is split into one shard of rows per worker, each shard is
+# refined in its own process and the refined shards are then joined into the _REFINED.csv file in their original order.
+# Duplicates are removed across shards as well as within them, detected as in refine_in_chunks. If entity_tables is set,
+# the entity tables of each shard are joined and saved alongside the file too.
+@profiled
+def refine_in_shards(file_path=DEFAULT_FILE_PATH, workers=os.cpu_count(), entity_tables=False, file_format="csv",
+                     dedupe="row", row_fallback=False):
+    new_file_path = refined_file_path(file_path, file_format)
+    boundaries = find_row_boundaries(file_path, workers)
+
+    # The refined shards are stored in a temporary directory next to the new file until they have been joined.
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(new_file_path))) as directory:
+        shard_paths = [os.path.join(directory, "shard_" + str(shard) + ".csv") for shard in range(len(boundaries) - 1)]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(refine_shard, repeat(file_path), boundaries[:-1], boundaries[1:], shard_paths,
+                                    repeat(entity_tables), repeat(dedupe), repeat(row_fallback)))
+
+        duplicate_filter = DuplicateFilter(dedupe, row_fallback)
+        rows_written = 0
+        tables = []
+
+        with RefinedWriter(new_file_path, file_format) as writer:
+            for shard, (shard_path, (row_keys, shard_tables, shard_report)) in enumerate(zip(shard_paths, results)):
+                # Removing the rows that duplicate a row kept from an earlier shard
+                mask = duplicate_filter.filter_new(*row_keys)[0]
+                duplicate_filter.report.update(shard_report)
+                write_shard(shard_path, mask, writer, header=shard == 0)
+
+                if entity_tables:
+                    tables.append(renumber_entity_tables(shard_tables, mask, rows_written))
+
+                rows_written += int(mask.sum())
+
+    if entity_tables:
+        write_entity_tables({name: pd.concat([shard[name] for shard in tables], ignore_index=True)
+                             for name in tables[0]}, new_file_path)
+    else:
+        remove_entity_tables(new_file_path)
+
+    print_dedupe_report(duplicate_filter.report)
+    print("Refined data saved to", new_file_path)
+
+    return rows_written
+
+
+# Refines the rows between two offsets of a CSV file, storing the result in a shard file. This is run in each worker
+# process by refine_in_shards. Returns the keys of each refined row, so duplicates can be removed across shards, the
+# shard's entity tables if they were requested and the number of duplicates removed from the shard for each reason.
+def refine_shard(file_path, start, end, shard_path, entity_tables=False, dedupe="row", row_fallback=False):
+    with open_byte_range(file_path, start, end) as shard:
+        frame = UnrefinedDataFrame(file_path, pd.read_csv(shard, dtype=object), DuplicateFilter(dedupe, row_fallback))
+
+    frame.refine()
+    frame.df.to_csv(shard_path, index=False)
+
+    if entity_tables:
+        frame.build_entity_tables()
+
+    return frame.row_keys, frame.entity_tables, frame.dedupe_report
+
+
+# Appends the rows of a refined shard file that are set in the mask using a RefinedWriter. If every row is kept and the
+# output is a CSV file, the shard file is copied over as it is rather than being read in and written out again.
+def write_shard(shard_path, mask, writer, header):
+    if mask.all() and writer.file_format == "csv":
+        with open(shard_path, encoding="utf-8", newline="") as shard, \
+                open(writer.file_path, "w" if header else "a", encoding="utf-8", newline="") as output:
+            header_row = shard.readline()
+            if header:
+                output.write(header_row)
+            shutil.copyfileobj(shard, output)
+
+        writer.rows_written += len(mask)
+        writer.started = True
+    else:
+        shard = pd.read_csv(shard_path, dtype=object, keep_default_na=False)
+        writer.write(shard[mask])
+
+
+# Updates the rows of a shard's entity tables to match the rows of the joined file, dropping the entities of any rows
+# that were removed as duplicates.
+def renumber_entity_tables(tables, mask, row_offset):
+    new_rows = row_offset + np.cumsum(mask) - 1
+
+    renumbered = {}
+    for name, table in tables.items():
+        table = table[mask[table['Row'].to_numpy()]].copy()
+        table['Row'] = new_rows[table['Row'].to_numpy()]
+        renumbered[name] = table
+
+    return renumbered
+
+
 # These are a set of helper methods used when refining the data
 
+# Re-encodes a column of Strings, removing any byte order marks
+def encode_text(values):
+    return values.str.encode('utf-8').str.decode('utf-8-sig', 'ignore')
+
+
+# Outputs the report of each refinement stage as a table
+def print_stage_reports(stage_reports):
+    print("{:<28}{:>10}{:>10}{:>11}{:>14}".format("Stage", "Time (s)", "Rows", "Row delta", "Memory (MB)"))
+
+    for report in stage_reports:
+        if report["cached"]:
+            print("{:<28}{:>10.4f}{:>10}{:>11}{:>14}".format(report["stage"], report["seconds"], report["rows"],
+                                                            "cached", ""))
+        else:
+            memory = "" if report["memory_delta"] is None else "{:+.1f}".format(report["memory_delta"] / 1e6)
+            print("{:<28}{:>10.4f}{:>10}{:>+11}{:>14}".format(report["stage"], report["seconds"], report["rows"],
+                                                             report["row_delta"], memory))
+
+
+# Outputs the number of duplicates removed for each reason, if any were removed
+def print_dedupe_report(report):
+    removed = sum(report.values())
+
+    if removed:
+        print("Removed", removed, "duplicate records:",
+              ", ".join(str(count) + " " + reason for reason, count in report.items() if count))
+
+
+# Hashes each row of a data frame to a 64-bit integer so rows can be compared for duplicates without storing them
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+# Converts a column of tweet IDs to integer keys, returning the keys of the valid IDs and a mask of which were valid.
+# Tweet IDs are numbers of up to 19 digits, so they fit in a 64-bit integer without being hashed.
+def id_keys(ids):
+    ids = ids.astype(object)
+    valid = ids.str.fullmatch(r"\d{1,19}").fillna(False).to_numpy(dtype=bool)
+
+    return ids[valid].astype(np.uint64).to_numpy(), valid
+
+
 # Parses a value to see if it matches the format of a retweet and returns a boolean to match.
 def is_retweet(s):
     # Validates against the value's type to avoid non-String cases causing errors
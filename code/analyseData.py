@@ -1,30 +1,107 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
+import os
 
 from pandas.errors import EmptyDataError
 
-from AnalysedDataSet import AnalysedDataSet
+from AnalysedDataSet import DEFAULT_CHUNK_SIZE, DEFAULT_ERROR, AnalysedDataSet, ApproximateDataSet, CombinedDataSet, \
+    StreamedDataSet, analyse_cached
+from Instrumentation import add_profile_arguments, start_profiling
+from ResultCache import CACHE_DIRECTORY_NAME, DEFAULT_MAX_BYTES, ResultCache
 
 """
-Takes an input filepath to a post-refinement CSV file and runs analysis on it.
+Takes input filepaths to post-refinement CSV files and runs analysis on them.
+
+Using --chunk-size streams the file, analysing this many records at a time and merging their counts, so files too large
+to be held in memory can be analysed. Using --workers splits the file into a partition for each worker process, which
+are analysed in parallel and have their counts merged in order. The results are the same as analysing the whole file at
+once.
+Using --approximate summarises the counts with sketches instead, so the memory used depends on --error rather than on
+the number of distinct hashtags, users and apps. Only the results that can be found from the sketches are output.
+Using --cache stores the results on disk (in --cache-dir, or a directory next to the input file), so later runs on the
+same unchanged file load them instead of analysing it again. The least recently used results are removed once the cache
+is larger than --cache-size megabytes.
+
+Given several files, they are loaded concurrently (by up to --workers threads) and the results of each file are output,
+followed by the combined results of the union of their records, with records whose ID occurs in more than one file only
+counted once.
+Using --profile writes the time taken and memory used by loading the file and each metric to a JSON report, and using
+--cprofile writes a cProfile dump of the run.
 
 The results are output and stored so they can be used in further methods.
 """
 if __name__ == '__main__':
-    # Validates the number of arguments, outputting an error and exiting if they are incorrect
-    if len(sys.argv) != 2:
-        print("Incorrect number of arguments input.")
-        print("Usage: ./analyseData.py <file_path>")
-        sys.exit(0)
-    else:
-        try:
-            # Running the analysis on the CSV data, outputting the results and storing an instance of AnalysedDataSet
-            data = AnalysedDataSet(sys.argv[1])
-            data.output_results()
-        except FileNotFoundError:
-            print("File could not be found.")
-        except EmptyDataError:
-            print("Input file is missing data.")
-        except (KeyError, ValueError):
-            print("Input file is incorrectly formatted.")
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Runs analysis on a post-refinement file.")
+    parser.add_argument("file_paths", nargs="+", metavar="file_path",
+                        help="path to a refined CSV, Parquet or Feather file to analyse; given several, they are also "
+                             "analysed together")
+    parser.add_argument("--chunk-size", type=int, metavar="ROWS",
+                        help="stream the file, analysing this many records at a time instead of loading it all at once")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="analyse partitions of the file in parallel using this many worker processes, or given "
+                             "several files, load this many files at once")
+    parser.add_argument("--approximate", action="store_true",
+                        help="estimate the counts with sketches, using a bounded amount of memory")
+    parser.add_argument("--error", type=float, default=DEFAULT_ERROR,
+                        help="with --approximate, the relative error of the estimated counts (default: %(default)s)")
+    parser.add_argument("--cache", action="store_true",
+                        help="load the results from the result cache if the file is unchanged, storing them otherwise")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="with --cache, the directory to cache results in (default: %s next to the input file)"
+                        % CACHE_DIRECTORY_NAME)
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / (1 << 20), metavar="MB",
+                        help="with --cache, the most megabytes of results to keep cached (default: %(default)s)")
+    parser.add_argument("--content-hash", action="store_true",
+                        help="with --cache, identify the file by a hash of its contents rather than its size and "
+                             "modification time")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size must be a positive number of rows")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be a positive number of processes")
+    if not 0 < args.error < 1:
+        parser.error("--error must be between 0 and 1")
+    if args.cache_size <= 0:
+        parser.error("--cache-size must be a positive number of megabytes")
+    if len(args.file_paths) > 1 and (args.chunk_size is not None or args.approximate or args.cache):
+        parser.error("--chunk-size, --approximate and --cache can only be used with a single file")
+
+    start_profiling(args)
+
+    try:
+        # Running the analysis on the data, outputting the results and storing an instance of AnalysedDataSet
+        file_path = args.file_paths[0]
+
+        if len(args.file_paths) > 1:
+            data_set_class = CombinedDataSet
+            settings = {"workers": args.workers}
+            file_path = args.file_paths
+        elif args.approximate:
+            data_set_class = ApproximateDataSet
+            settings = {"error": args.error, "chunk_size": args.chunk_size or DEFAULT_CHUNK_SIZE,
+                        "workers": args.workers}
+        elif args.chunk_size is not None or args.workers is not None:
+            data_set_class = StreamedDataSet
+            settings = {"chunk_size": args.chunk_size or DEFAULT_CHUNK_SIZE, "workers": args.workers}
+        else:
+            data_set_class = AnalysedDataSet
+            settings = {}
+
+        if args.cache:
+            cache_dir = args.cache_dir or os.path.join(os.path.dirname(os.path.abspath(file_path)),
+                                                       CACHE_DIRECTORY_NAME)
+            cache = ResultCache(cache_dir, int(args.cache_size * (1 << 20)), args.content_hash)
+            data = analyse_cached(file_path, cache, data_set_class, **settings)
+        else:
+            data = data_set_class(file_path, **settings)
+        data.output_results()
+    except FileNotFoundError:
+        print("File could not be found.")
+    except EmptyDataError:
+        print("Input file is missing data.")
+    except (KeyError, ValueError):
+        print("Input file is incorrectly formatted.")
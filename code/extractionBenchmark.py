@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+import argparse
+import timeit
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+from ExtractionEngine import extract_apps, extract_hashtags, extract_is_reply, extract_is_retweet, extract_mentions, \
+    extract_rt_to
+from UnrefinedDataFrame import UnrefinedDataFrame, find_apps, find_hashtags, find_mentions, is_reply, is_retweet, \
+    who_to
+
+# Stores each extracted column alongside the column it is extracted from, its per-row helper method and its
+# column-at-a-time equivalent
+EXTRACTIONS = [("Is RT", "Text", is_retweet, extract_is_retweet),
+               ("Is Reply", "Reply Username", is_reply, extract_is_reply),
+               ("RT To", "Text", who_to, extract_rt_to),
+               ("Hashtags", "Entities", find_hashtags, extract_hashtags),
+               ("Mentions", "Entities", find_mentions, extract_mentions),
+               ("Source", "Source", find_apps, extract_apps)]
+
+"""
+Takes an input filepath to an unrefined CSV file and times extracting each calculated column with the per-row helper
+methods against the column-at-a-time extraction engine.
+
+Both results are checked to be the same before their timings are output.
+"""
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the extraction engine against the per-row helpers.")
+    parser.add_argument("file_path", help="path to the unrefined CSV file to extract from")
+    parser.add_argument("--repeat", type=int, default=3, help="number of times to time each extraction (default: 3)")
+    args = parser.parse_args()
+
+    try:
+        # Only the headers are set, so the columns are as they would be when the extraction runs during refinement.
+        data = UnrefinedDataFrame(args.file_path)
+        data.set_headers()
+    except FileNotFoundError:
+        print("File could not be found.")
+    except EmptyDataError:
+        print("Input file is missing data.")
+    else:
+        print("Rows:", len(data.df))
+        print("\n{:<10}{:>14}{:>14}{:>10}".format("Column", "Helpers (s)", "Engine (s)", "Speedup"))
+
+        for name, column, helper, extractor in EXTRACTIONS:
+            values = data.df[column]
+
+            # Checking the engine gives the same values as the helper before timing either
+            pd.testing.assert_series_equal(extractor(values), values.map(helper), check_dtype=False,
+                                           check_names=False)
+
+            helper_time = min(timeit.repeat(lambda: values.map(helper), number=1, repeat=args.repeat))
+            engine_time = min(timeit.repeat(lambda: extractor(values), number=1, repeat=args.repeat))
+
+            print("{:<10}{:>14.4f}{:>14.4f}{:>9.1f}x".format(name, helper_time, engine_time, helper_time / engine_time))
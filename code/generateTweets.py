@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+import argparse
+
+from Instrumentation import add_profile_arguments, start_profiling
+from SyntheticTweets import write_synthetic_tweets
+
+"""
+Takes an output filepath and writes a synthetic raw data set of tweets to it, in the same format as collected data sets
+before refinement.
+
+Using --rows sets the number of tweets written and --seed the seed they are generated from. The same rows and seed
+always give the same file, so the data sets used to benchmark different commits can be regenerated rather than stored.
+Using --profile writes the time taken and memory used by the generation to a JSON report, and using --cprofile writes a
+cProfile dump of the run.
+"""
+
+if __name__ == '__main__':
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Writes a synthetic raw data set of tweets.")
+    parser.add_argument("file_path", help="path to write the CSV file to")
+    parser.add_argument("--rows", type=int, default=10000, help="number of tweets to write (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed to generate the tweets from (default: %(default)s)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.rows < 0:
+        parser.error("--rows can't be negative")
+    if args.seed < 0:
+        parser.error("--seed can't be negative")
+
+    start_profiling(args)
+
+    try:
+        write_synthetic_tweets(args.file_path, args.rows, args.seed)
+        print(args.rows, "synthetic tweets saved to", args.file_path)
+    except FileNotFoundError:
+        print("Output directory could not be found.")
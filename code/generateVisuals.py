@@ -5,6 +5,8 @@ from wordcloud import WordCloud
 import os
 from ipywidgets import fixed, interactive
 
+from Instrumentation import profiled
+
 # Stores the filepath to the images directory
 IMAGE_DIRECTORY = "../images/"
 
@@ -18,6 +20,7 @@ It also contains a method to create and save all visuals in the images directory
 
 
 # Plots a bar chart with the counts for the Top N users replied to.
+@profiled
 def plot_top_user_replies(data, n):
     reply_data = data.top_n_user_interactions(n)
 
@@ -36,6 +39,7 @@ def plot_top_user_replies(data, n):
     return fig
 
 # Plots a bar chart with the counts for the Top N users retweeted to.
+@profiled
 def plot_top_user_retweeted(data, n):
     rt_data = data.top_n_user_rt(n)
 
@@ -54,6 +58,7 @@ def plot_top_user_retweeted(data, n):
     return fig
 
 # Plots a word cloud of the hashtags outside of the Top N
+@profiled
 def hashtags_wordcloud(data, n=10):
     # Finds the data for the Top N Hashtags from the AnalysedDataSet.
     top_n_hashtags = data.top_n_hashtags(n)
@@ -82,8 +87,10 @@ def hashtags_wordcloud(data, n=10):
     return fig
 
 
-# Plots a line chart of the tweet activity across time
-def activity_timeline(data):
+# Plots a line chart of the tweet activity across time. If a time bucket size ("hour", "day", "week" or "month") is
+# given, the number of tweets in each bucket is plotted rather than the number at each time.
+@profiled
+def activity_timeline(data, size=None):
     # Setting up the figure and its axes
     fig = plt.figure(figsize=(20, 8))
     ax = fig.add_axes([0, 0, 1, 1])
@@ -91,13 +98,19 @@ def activity_timeline(data):
     # Setting an appropriate subtitle and harvesting the relevant data from the AnalysedDataSet.
     fig.suptitle('Timeline of Activity')
 
-    # The key values are parsed to datetime to allow for automatic handling of x-axis labels
-    dates = [datetime.strptime(date, "%Y-%m-%d %H:%M:%S") for date in data.timeline_data.keys()]
-    counts = list(data.timeline_data.values())
+    if size is not None:
+        # The buckets are already in chronological order, and are plotted at the time each starts
+        buckets = data.tweets_per_bucket(size)
+        dates = [bucket.start_time for bucket in buckets]
+        counts = list(buckets.values())
+    else:
+        # The key values are parsed to datetime to allow for automatic handling of x-axis labels
+        dates = [datetime.strptime(date, "%Y-%m-%d %H:%M:%S") for date in data.timeline_data.keys()]
+        counts = list(data.timeline_data.values())
 
-    # Reversing the order of the dates and counts so they go in chronological order.
-    dates.reverse()
-    counts.reverse()
+        # Reversing the order of the dates and counts so they go in chronological order.
+        dates.reverse()
+        counts.reverse()
 
     # Plotting the line chart and returning its figure
     ax.plot(dates, counts)
@@ -106,6 +119,7 @@ def activity_timeline(data):
 
 
 # Plots a bar chart with the counts for the Top N Hashtags.
+@profiled
 def plot_top_n_bar_chart(func, text, n=10):
     # Finds the data for the Top N Hashtags from the AnalysedDataSet.
     relevant_data = func(n)
@@ -124,6 +138,7 @@ def plot_top_n_bar_chart(func, text, n=10):
     return fig
 
 # Plots a pie chart with the share percentage for the Top N Apps.
+@profiled
 def app_pie_chart(data, n=10):
     # Setting up the figure
     fig = plt.figure(figsize=(20, 8))
@@ -142,41 +157,49 @@ def app_pie_chart(data, n=10):
     return fig
 
 # Plots a bar chart with the counts for the Top N Hashtags.
+@profiled
 def plot_top_hashtags(data, n=10):
     return plot_top_n_bar_chart(data.top_n_hashtags, 'Most Frequent Hashtags', n)
 
 
 # Plots a bar chart with the counts for the Top N Most Frequent Apps.
+@profiled
 def plot_top_apps(data, n=10):
     return plot_top_n_bar_chart(data.top_n_apps, 'Most Frequent Apps', n)
 
 
 # Plots a bar chart with the counts for the Top N Most Replied to Users.
+@profiled
 def plot_top_interactions(data, n=10):
     return plot_top_n_bar_chart(data.top_n_user_interactions, 'Most Frequently Replied to Users', n)
 
 
 # Plots a bar chart with the counts for the Top N Most Retweeted Users.
+@profiled
 def plot_top_rt_users(data, n=10):
     return plot_top_n_bar_chart(data.top_n_user_rt, 'Most Frequently Retweeted Users', n)
 
 
 # Plots a bar chart with the counts for the Top N Users based on Reply vs Replied to Ratio.
+@profiled
 def plot_top_replied_ratios(data, n=10):
     return plot_top_n_bar_chart(data.top_n_users_ratioed_to, 'Users with Highest Reply vs Replied To Ratio', n)
 
 
 # Plots a bar chart with the counts for the Top N Replied to Hashtags.
+@profiled
 def plot_top_replied_hashtags(data, n=10):
     return plot_top_n_bar_chart(data.top_n_hashtags_replied_to, 'Most Frequently Replied to Hashtags', n)
 
 
 # Takes a figure generator method and creates an interactive visual from it.
+# The slider can select every hashtag, as the top n methods return every value when n is greater than their number.
 def create_interactive_visual(data, generator):
-    return interactive(generator, data=fixed(data), n=(1, len(data.hashtags_data) -1))
+    return interactive(generator, data=fixed(data), n=(1, max(len(data.hashtags_data), 1)))
 
 
 # Runs the helper method to create each visual, creates the image directory if it doesn't exist and saves each visual
+@profiled
 def save_visuals(data, n):
     # Creating the visuals and storing them in a list of figures to be saved
     completed_figures = [plot_top_hashtags(data, n),
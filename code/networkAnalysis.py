@@ -1,33 +1,33 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
 
 from pandas.errors import EmptyDataError
 
+from Instrumentation import add_profile_arguments, start_profiling
 from Networks import Networks
 
 """
 Takes an input filepath to a post-refinement CSV file and runs network analysis on it.
 
+Using --profile writes the time taken and memory used by loading the data and building the network to a JSON report,
+and using --cprofile writes a cProfile dump of the run.
 """
 if __name__ == '__main__':
-    # Validates the number of arguments, outputting an error and exiting if they are incorrect
-    if len(sys.argv) != 2:
-        print("Incorrect number of arguments input.")
-        print("Usage: ./networkAnalysis.py <file_path>")
-        sys.exit(0)
-    else:
-        try:
-            # Running the analysis on the CSV data
-            network_data = Networks(sys.argv[1])
-        except ValueError:
-            print("Sample size must be an integer value.")
-            print("Usage: ./networkAnalysis.py <file_path>")
-            sys.exit(0)
-        except FileNotFoundError:
-            print("File could not be found.")
-        except EmptyDataError:
-            print("Input file is missing data.")
-        except (KeyError, ValueError):
-            print("Input file is incorrectly formatted.")
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Runs network analysis on a post-refinement file.")
+    parser.add_argument("file_path", help="path to the refined file to analyse")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
 
+    start_profiling(args)
+
+    try:
+        # Running the analysis on the CSV data
+        network_data = Networks(args.file_path)
+    except FileNotFoundError:
+        print("File could not be found.")
+    except EmptyDataError:
+        print("Input file is missing data.")
+    except (KeyError, ValueError):
+        print("Input file is incorrectly formatted.")
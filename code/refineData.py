@@ -1,33 +1,100 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
 
 from pandas.errors import EmptyDataError
 
-from UnrefinedDataFrame import UnrefinedDataFrame
+from Instrumentation import add_profile_arguments, start_profiling
+from RefinedData import REFINED_FORMATS
+from UnrefinedDataFrame import DEDUPE_MODES, DEFAULT_CHUNK_SIZE, DuplicateFilter, UnrefinedDataFrame, refine_in_chunks, \
+    refine_in_shards, refine_incrementally
 
 """
 Takes an input filepath to a CSV file and refines the data in it if necessary.
 If any refinement takes place, a new file is output.
 
+Large files can be refined in chunks using --chunk-size, which keeps memory use bounded by the size of each chunk.
+Using --workers refines the file in parallel, splitting it into one shard of rows for each worker process.
+Using --incremental only refines the rows appended to the file since it was last refined with --incremental, appending
+them to the refined file. This is only available for CSV output.
+Using --format parquet or --format feather saves the refined data in a columnar format with typed columns, which the
+analysis classes can load a column at a time. These formats need pyarrow to be installed.
+Using --entity-tables also saves tables of the hashtags, mentions and urls in each tweet for use in analysis.
+Using --dedupe id detects duplicate records by their tweet ID rather than by comparing every value, which is much faster.
+Records without a valid ID are kept, or compared by every value if --row-fallback is also used.
+Using --cache stores the output of each refinement stage next to the file, so running the refinement again skips the
+stages whose input and code haven't changed. Using --stage-report outputs the time taken and the change in rows and
+memory of each stage. These are only available when the file is refined all at once.
+Using --profile writes the time taken and memory used by each stage to a JSON report, however the file is refined, and
+using --cprofile writes a cProfile dump of the run.
+
 The results are output and stored so they can be used in further methods.
 """
 if __name__ == '__main__':
-    # Validates the number of arguments, outputting an error and exiting if they are incorrect
-    if len(sys.argv) != 2:
-        print("Incorrect number of arguments input.")
-        print("Usage: ./refineData.py <file_path>")
-        sys.exit(0)
-    else:
-        try:
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Runs data refinement on an input file.")
+    parser.add_argument("file_path", help="path to the CSV file to refine")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--chunk-size", type=int, metavar="ROWS",
+                      help="refine the file this many rows at a time instead of loading it all at once")
+    mode.add_argument("--workers", type=int, metavar="N",
+                      help="refine the file in parallel using this many worker processes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refine only the rows added since the last incremental run")
+    parser.add_argument("--entity-tables", action="store_true",
+                        help="also parse the Entities column into hashtag, mention and url tables saved with the file")
+    parser.add_argument("--format", choices=list(REFINED_FORMATS), default="csv", dest="file_format",
+                        help="format to save the refined data in (default: csv)")
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, default="row",
+                        help="detect duplicate records by comparing whole rows or tweet IDs (default: row)")
+    parser.add_argument("--row-fallback", action="store_true",
+                        help="with --dedupe id, compare whole rows for records without a valid ID")
+    parser.add_argument("--cache", action="store_true",
+                        help="cache the output of each refinement stage to skip unchanged stages on later runs")
+    parser.add_argument("--stage-report", action="store_true",
+                        help="output the time taken and change in rows and memory of each refinement stage")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size must be a positive number of rows")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be a positive number of processes")
+    if args.incremental and (args.workers is not None or args.file_format != "csv"):
+        parser.error("--incremental can't be used with --workers or a columnar --format")
+    if (args.cache or args.stage_report) and (args.incremental or args.chunk_size is not None or args.workers is not None):
+        parser.error("--cache and --stage-report can't be used with --incremental, --chunk-size or --workers")
+    if args.row_fallback and args.dedupe != "id":
+        parser.error("--row-fallback can only be used with --dedupe id")
+
+    start_profiling(args)
+
+    try:
+        if args.incremental:
+            # Running the refinement on the rows added since the last run, appending them to the refined file.
+            refine_incrementally(args.file_path, args.chunk_size or DEFAULT_CHUNK_SIZE, args.entity_tables,
+                                 args.dedupe, args.row_fallback)
+        elif args.chunk_size is not None:
+            # Running the refinement a chunk at a time, appending each refined chunk to the new file.
+            refine_in_chunks(args.file_path, args.chunk_size, args.entity_tables, args.file_format, args.dedupe,
+                             args.row_fallback)
+        elif args.workers is not None:
+            # Running the refinement on shards of the file in parallel, joining the refined shards in order.
+            refine_in_shards(args.file_path, args.workers, args.entity_tables, args.file_format, args.dedupe,
+                             args.row_fallback)
+        else:
             # Running the refinement on the CSV data, outputting if changes are made and storing the new data if so.
-            data = UnrefinedDataFrame(sys.argv[1])
-            data.clean_data()
-
-            print("Data refinement completed.")
-        except FileNotFoundError:
-            print("File could not be found.")
-        except EmptyDataError:
-            print("Input file is missing data.")
-        except ValueError:
-            print("Input file is of incorrect format.")
+            # Duplicates are detected by comparing whole rows unless another mode was requested.
+            duplicate_filter = DuplicateFilter(args.dedupe, args.row_fallback) if args.dedupe != "row" else None
+            data = UnrefinedDataFrame(args.file_path, duplicate_filter=duplicate_filter)
+            data.clean_data(args.entity_tables, args.file_format, args.cache, args.stage_report)
+
+        print("Data refinement completed.")
+    except FileNotFoundError:
+        print("File could not be found.")
+    except EmptyDataError:
+        print("Input file is missing data.")
+    except ValueError:
+        print("Input file is of incorrect format.")
+    except ImportError:
+        print("pyarrow must be installed to save refined data as", args.file_format)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import argparse
+
+from Benchmarks import BENCHMARKS, DEFAULT_DATA_DIRECTORY, DEFAULT_REPEAT, DEFAULT_RESULTS_PATH, DEFAULT_ROWS, \
+    DEFAULT_SEED, commit_results, compare_results, load_results, print_comparison, run_benchmarks, save_results
+
+"""
+Runs the benchmarks of refinement and analysis on synthetic data sets and stores their results.
+
+Using --rows sets the sizes of the data sets benchmarked, which are generated in --data-dir the first time each size is
+used. Each benchmark is run --repeat times in a new process, keeping the fastest time and the highest peak memory.
+Using --benchmark runs only the named benchmarks. The Geomap benchmark is skipped if folium isn't installed.
+
+The results are appended to --results with the commit they were measured at. Using --compare outputs how the time and
+memory of each benchmark have changed since the latest results stored for the given commit.
+"""
+
+if __name__ == '__main__':
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Benchmarks refinement and analysis on synthetic data sets.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[DEFAULT_ROWS], metavar="ROWS",
+                        help="sizes of the data sets to benchmark (default: %(default)s)")
+    parser.add_argument("--benchmark", choices=list(BENCHMARKS), nargs="+", default=list(BENCHMARKS), dest="names",
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="seed to generate the data sets from (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="number of times to run each benchmark (default: %(default)s)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIRECTORY, metavar="DIR",
+                        help="directory to generate the data sets in (default: %(default)s)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, metavar="FILE",
+                        help="JSON lines file to append the results to (default: %(default)s)")
+    parser.add_argument("--compare", metavar="COMMIT",
+                        help="compare the results with the latest stored results of this commit")
+    args = parser.parse_args()
+
+    if any(rows < 1 for rows in args.rows):
+        parser.error("--rows must be positive numbers of rows")
+    if args.seed < 0:
+        parser.error("--seed can't be negative")
+    if args.repeat < 1:
+        parser.error("--repeat must be a positive number of runs")
+
+    # The stored results are loaded first, so the results of this run aren't compared with themselves
+    earlier_results = commit_results(load_results(args.results), args.compare) if args.compare else None
+
+    results = run_benchmarks(args.names, args.rows, args.seed, args.repeat, args.data_dir)
+    save_results(results, args.results)
+    print("Results saved to", args.results)
+
+    if args.compare:
+        if earlier_results:
+            print_comparison(compare_results(results, earlier_results), args.compare)
+        else:
+            print("No results are stored for commit", args.compare)
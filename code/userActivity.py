@@ -1,34 +1,39 @@
 #!/usr/bin/env python
 
-import sys
+import argparse
 
 from pandas.errors import EmptyDataError
 
 from AnalyseUserActivity import AnalyseUserActivity
+from Instrumentation import add_profile_arguments, start_profiling
 
 """
 Takes as input the filepath and the username to analyse patterns of user activity.
 
 The results that are output consists of calculations and graphs.
+Using --profile writes the time taken and memory used by each step of the analysis to a JSON report, and using
+--cprofile writes a cProfile dump of the run.
 """
 
 if __name__ == '__main__':
-    
-    # Validates the number of arguments, outputting an error and exiting if they are incorrect
-    if len(sys.argv) != 3:
-        print("Incorrect number of arguments input.")
-        print("Usage: ./userActivity.py <file_path> <username>")
-        sys.exit(0)
-    else:
-        try:
-            user_data = AnalyseUserActivity(sys.argv[1], sys.argv[2])
-            print("User activity analysed.")
-        except FileNotFoundError:
-            # Error message if the file is missing 
-            print("File could not be found.")
-        except EmptyDataError:
-            # Error message if the input file doesn't have data
-            print("Input file is missing data.")
-        except (KeyError, ValueError):
-            # Error message if the format of the input file is incorrect
-            print("Input file is incorrectly formatted.")
+    # Parses the arguments, outputting an error and the usage if they are incorrect
+    parser = argparse.ArgumentParser(description="Analyses the patterns of activity of a user.")
+    parser.add_argument("file_path", help="path to the refined file to analyse")
+    parser.add_argument("username", help="the user whose activity is analysed")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    start_profiling(args)
+
+    try:
+        user_data = AnalyseUserActivity(args.file_path, args.username)
+        print("User activity analysed.")
+    except FileNotFoundError:
+        # Error message if the file is missing 
+        print("File could not be found.")
+    except EmptyDataError:
+        # Error message if the input file doesn't have data
+        print("Input file is missing data.")
+    except (KeyError, ValueError):
+        # Error message if the format of the input file is incorrect
+        print("Input file is incorrectly formatted.")